@@ -0,0 +1,146 @@
+"""Send the read-only listings to the read replicas
+
+Every query goes to the primary unless it runs inside `replica_reads()`,
+which only wraps handlers that never write: the slot and appointment
+listings and the availability views. Bookings, holds and slot writes, and
+the reads they make inside their transactions, stay on the primary. With
+no DATABASE_REPLICAS configured the router routes nothing.
+
+Replicas lag behind the primary, so a client that just wrote reads from the
+primary for REPLICA_PIN_SECONDS afterwards and sees its own booking. The
+pin is kept in a cookie, and under the user in the REPLICA_PIN_CACHE_ALIAS
+cache for token clients that drop cookies.
+
+Data read from a lagging replica must not be cached under the current
+version stamps, so the router marks the requests it sent to a replica and
+the caches only store what was read from the primary. Pinned clients skip
+the caches too, since a page cached before their write may still be there.
+"""
+
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+
+PIN_COOKIE = "primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+use_replicas = ContextVar("use_replicas", default=False)
+current_request = ContextVar("current_request", default=None)
+
+
+def pin_key(user):
+    return f"replica-pin:{user.pk}"
+
+
+def primary_pinned():
+    """Whether the current request must read its own recent writes
+
+    Checked once per request, on its first replica read, when the view has
+    authenticated the user.
+    """
+    request = current_request.get()
+    if request is None:
+        return False
+    pinned = getattr(request, "primary_pinned", None)
+    if pinned is None:
+        until = request.COOKIES.get(PIN_COOKIE)
+        user = getattr(request, "user", None)
+        if not until and user is not None and user.is_authenticated:
+            until = caches[settings.REPLICA_PIN_CACHE_ALIAS].get(pin_key(user))
+        try:
+            pinned = float(until or 0) > time.time()
+        except ValueError:
+            pinned = False
+        request.primary_pinned = pinned
+    return pinned
+
+
+def read_from_replica():
+    """Whether a read of the current request was routed to a replica"""
+    return getattr(current_request.get(), "read_from_replica", False)
+
+
+@contextmanager
+def replica_reads():
+    """Route the reads of the block, or decorated function, to a replica"""
+    token = use_replicas.set(True)
+    try:
+        yield
+    finally:
+        use_replicas.reset(token)
+
+
+class ReplicaRouter:
+    """Pick a random replica for reads in `replica_reads`, the primary otherwise"""
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and use_replicas.get() and not primary_pinned():
+            request = current_request.get()
+            if request is not None:
+                request.read_from_replica = True
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReadYourWritesMiddleware:
+    """Pin clients to the primary for a while after they write
+
+    Sync and async capable, like RequestTimingMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = current_request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            self.pin(request, response)
+        return response
+
+    def pin(self, request, response):
+        seconds = settings.REPLICA_PIN_SECONDS
+        until = time.time() + seconds
+        response.set_cookie(PIN_COOKIE, f"{until:.3f}", max_age=seconds, httponly=True)
+        # DRF sets the user it authenticated on the Django request
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            caches[settings.REPLICA_PIN_CACHE_ALIAS].set(pin_key(user), until, seconds)
@@ -40,15 +40,17 @@ INSTALLED_APPS = [
     "rest_framework",
     "rest_framework.authtoken",
     "core",
-    "service",
+    "service.apps.ServiceConfig",
 ]
 
 MIDDLEWARE = [
+    "service.instrumentation.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "appointment_app.routers.ReadYourWritesMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -85,9 +87,75 @@ DATABASES = {
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
         "PORT": "5432",
+        # Keep connections open between requests instead of paying a new
+        # handshake per request, checking they still work before reuse
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        # pgbouncer in transaction pooling mode cannot keep server-side
+        # cursors open between transactions
+        "DISABLE_SERVER_SIDE_CURSORS": (
+            os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS") == "1"
+        ),
     }
 }
 
+# Seconds a persistent connection may sit idle before it is pinged again
+DB_HEALTH_CHECK_IDLE = int(os.environ.get("DB_HEALTH_CHECK_IDLE", 10))
+
+# Read replicas, comma separated hosts, for the listings in `replica_reads`
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    host.strip()
+    for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",")
+    if host.strip()
+):
+    DATABASES[f"replica_{index}"] = dict(
+        DATABASES["default"], HOST=host, TEST={"MIRROR": "default"}
+    )
+    DATABASE_REPLICAS.append(f"replica_{index}")
+
+DATABASE_ROUTERS = ["appointment_app.routers.ReplicaRouter"]
+
+# Seconds a client reads from the primary after writing, and where the pins
+# of token clients are kept, shared between processes like the page cache
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
+REPLICA_PIN_CACHE_ALIAS = "default"
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# Cache alias and lifetime of the available slot listing pages
+AVAILABILITY_CACHE_ALIAS = "default"
+AVAILABILITY_CACHE_TIMEOUT = 60
+
+# Cache alias of the per-user version stamps, and lifetime of the data cached
+# under each ETag of the user's appointments and profile
+USER_CACHE_ALIAS = "default"
+USER_CACHE_TIMEOUT = 300
+
+# Resolved API tokens kept per process, and optionally in a shared cache
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TIMEOUT = 30
+AUTH_TOKEN_CACHE_ALIAS = None
+
+# Per-request query and timing report, Server-Timing header and log line
+REQUEST_TIMING_ENABLED = os.environ.get("REQUEST_TIMING_ENABLED") == "1"
+REQUEST_TIMING_QUERY_BUDGET = 20
+REQUEST_TIMING_LATENCY_BUDGET_MS = 500
+
+# Threads, and so database connections, the async views run queries on
+ASYNC_DB_THREADS = int(os.environ.get("ASYNC_DB_THREADS", 20))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -96,9 +164,15 @@ AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
     },
-    {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",},
-    {"NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",},
-    {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",},
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
 ]
 
 
@@ -122,6 +196,42 @@ USE_TZ = True
 STATIC_URL = "/static/"
 AUTH_USER_MODEL = "core.User"
 
+# The models keep the integer primary keys their migrations created
+DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
+
+# Keyset pagination of the service list endpoints, clients may ask for
+# up to PAGINATION_MAX_PAGE_SIZE rows with ?page_size=
+
+PAGINATION_PAGE_SIZE = 50
+PAGINATION_MAX_PAGE_SIZE = 1000
+
+# Rows per INSERT when slots are generated in bulk
+SLOT_BULK_CHUNK_SIZE = 1000
+
+# Rows fetched per round trip by the server-side cursor of streamed exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Longest period the availability heatmap covers in one request
+AVAILABILITY_MAX_DAYS = 90
+
+# Default and longest time a client may hold a slot before booking it
+SLOT_HOLD_SECONDS = 120
+SLOT_HOLD_MAX_SECONDS = 600
+
+# Most appointments booked by one bulk booking request
+BULK_BOOKING_MAX_SIZE = 20
+
+# Slots finished this many days ago are moved to the archive tables, in
+# transactions of ARCHIVE_BATCH_SIZE slots
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_BATCH_SIZE = 1000
+
+# Rows validated and written together by the CSV/NDJSON importer
+IMPORT_BATCH_SIZE = 5000
+
+# Longest slot allowed, it bounds the index range scanned by overlap checks
+SLOT_MAX_MINUTES = 480
+
 # Email Configurations
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
@@ -130,3 +240,15 @@ EMAIL_USE_TLS = True
 EMAIL_PORT = 587
 EMAIL_HOST_USER = "yemaecommerce@gmail.com"
 EMAIL_HOST_PASSWORD = "#Yema2020"
+
+# Confirmation emails are queued in core.EmailOutbox and delivered by
+# `python manage.py send_emails`
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 3600
+EMAIL_OUTBOX_FLUSH_INTERVAL = 1
+# Seconds a worker's batch is hidden from the other workers while it sends
+EMAIL_OUTBOX_LEASE = 300
+EMAIL_POOL_SIZE = 2
+EMAIL_POOL_MAX_IDLE = 60
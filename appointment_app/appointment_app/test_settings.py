@@ -0,0 +1,12 @@
+"""
+Django settings for the appointment_app test suite.
+
+Run the tests with `python manage.py test --settings=appointment_app.test_settings`.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# A second connection to the test database stands in for a lagging replica
+# in the tests: it never sees the rows of the test's open transaction
+DATABASES["stale_replica"] = dict(DATABASES["default"])
@@ -0,0 +1,166 @@
+"""Seed data and concurrent client scenarios for the booking API benchmark"""
+
+import datetime
+import itertools
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.models import Appointment, AppointmentScheduling, Pediatrician, SlotListing
+from .harness import percentile, rate
+
+PASSWORD = "benchpass"
+
+SCENARIOS = ("token", "availability", "book", "my_appointments")
+
+
+def seed(pediatricians, slots, users, appointments):
+    """Bulk insert the benchmark data set
+
+    Returns the users with their token keys and the ids of the free slots.
+    """
+    Pediatrician.objects.bulk_create(
+        Pediatrician(name=f"Pediatra {index}", genre="MF"[index % 2])
+        for index in range(pediatricians)
+    )
+    pediatrician_ids = list(Pediatrician.objects.values_list("id", flat=True))
+
+    start = timezone.now().replace(second=0, microsecond=0)
+    length = datetime.timedelta(minutes=15)
+    AppointmentScheduling.objects.bulk_create(
+        (
+            AppointmentScheduling(
+                pediatrician_id=pediatrician_ids[index % len(pediatrician_ids)],
+                time_start=start + length * (index // len(pediatrician_ids)),
+                time_finish=start + length * (index // len(pediatrician_ids) + 1),
+            )
+            for index in range(slots)
+        ),
+        batch_size=1000,
+    )
+
+    # Hashing once keeps seeding fast, every user shares the password
+    password = make_password(PASSWORD)
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(email=f"bench{index}@example.com", password=password)
+        for index in range(users)
+    )
+    accounts = list(User.objects.order_by("id"))
+    Token.objects.bulk_create(
+        Token(user=user, key=Token.generate_key()) for user in accounts
+    )
+    tokens = dict(Token.objects.values_list("user_id", "key"))
+
+    slot_ids = list(
+        AppointmentScheduling.objects.order_by("id").values_list("id", flat=True)
+    )
+    booked = slot_ids[:appointments]
+    Appointment.objects.bulk_create(
+        (
+            Appointment(
+                user=accounts[index % len(accounts)], appointment_scheduling_id=pk
+            )
+            for index, pk in enumerate(booked)
+        ),
+        batch_size=1000,
+    )
+    AppointmentScheduling.objects.filter(id__in=booked).update(is_available=False)
+    SlotListing.objects.refresh()
+
+    return {
+        "users": [(user, tokens[user.id]) for user in accounts],
+        # Shared by every run so each booking takes a slot nobody booked yet
+        "free_slots": iter(slot_ids[appointments:]),
+    }
+
+
+class Scenario:
+    """One endpoint driven by concurrent clients"""
+
+    def __init__(self, name, fixture):
+        self.name = name
+        self.fixture = fixture
+        self._lock = threading.Lock()
+
+    def client(self, index):
+        user, key = self.fixture["users"][index % len(self.fixture["users"])]
+        client = APIClient()
+        if self.name != "token":
+            client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        return user, client
+
+    def next_free_slot(self):
+        with self._lock:
+            return next(self.fixture["free_slots"])
+
+    def request(self, user, client):
+        if self.name == "token":
+            return client.post(
+                reverse("service:token"), {"email": user.email, "password": PASSWORD}
+            )
+        if self.name == "availability":
+            return client.get(reverse("service:appointmentscheduling-list"))
+        if self.name == "book":
+            payload = {
+                "user": user.id,
+                "appointment_scheduling": self.next_free_slot(),
+                "comments": "Benchmark",
+            }
+            return client.post(reverse("service:appointment-list"), payload)
+        return client.get(reverse("service:appointment-list"))
+
+
+def run_scenario(name, fixture, requests, clients):
+    """Send `requests` requests from `clients` threads, return the statistics"""
+    scenario = Scenario(name, fixture)
+    counter = itertools.count()
+    latencies, query_counts, errors = [], [], []
+
+    def worker(index):
+        user, client = scenario.client(index)
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                while next(counter) < requests:
+                    started = time.perf_counter()
+                    try:
+                        response = scenario.request(user, client)
+                    except Exception as error:
+                        errors.append(repr(error))
+                        continue
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    if response.status_code >= 400:
+                        errors.append(response.status_code)
+            query_counts.append(len(queries))
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(worker, range(clients)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": rate(len(latencies), elapsed),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "queries_per_request": sum(query_counts) / max(len(latencies), 1),
+    }
+
+
+def median_result(runs):
+    """Combine repeated runs of a scenario, errors are summed"""
+    result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    result["errors"] = sum(run["errors"] for run in runs)
+    return result
@@ -0,0 +1,111 @@
+"""Closed-loop concurrency benchmark of the WSGI and ASGI request paths
+
+Both stacks are driven in process by the same asyncio client loop: each of
+`clients` coroutines sends its next request as soon as the previous one
+answers. WSGI requests queue for a fixed pool of `workers` threads, like a
+threaded WSGI server; ASGI requests run on the event loop.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from .harness import percentile, rate
+
+
+@contextmanager
+def simulated_latency(milliseconds):
+    """Delay every query, standing in for a remote database"""
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(milliseconds / 1000)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # A wrapper outlives its connections, reconnecting must not add
+        # the delay again
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    if not milliseconds:
+        yield
+        return
+    connection_created.connect(install, weak=False)
+    for connection in connections.all():
+        install(None, connection)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for connection in connections.all():
+            if delay in connection.execute_wrappers:
+                connection.execute_wrappers.remove(delay)
+
+
+async def drive(send, clients, requests):
+    counter = itertools.count()
+    latencies, errors = [], []
+
+    async def client():
+        while next(counter) < requests:
+            started = time.perf_counter()
+            status = await send()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors.append(status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": rate(len(latencies), elapsed),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def run_wsgi(url, token, clients, requests, workers):
+    local = threading.local()
+
+    def get():
+        if not hasattr(local, "client"):
+            local.client = Client(HTTP_AUTHORIZATION=f"Token {token}")
+        # The test client skips this, a server expires connections per request
+        close_old_connections()
+        try:
+            return local.client.get(url).status_code
+        finally:
+            close_old_connections()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+
+            async def send():
+                return await loop.run_in_executor(executor, get)
+
+            return await drive(send, clients, requests)
+
+    return asyncio.run(main())
+
+
+def run_asgi(url, token, clients, requests):
+    async def main():
+        client = AsyncClient()
+
+        async def send():
+            # Extra keyword arguments become request headers
+            response = await client.get(url, authorization=f"Token {token}")
+            return response.status_code
+
+        return await drive(send, clients, requests)
+
+    return asyncio.run(main())
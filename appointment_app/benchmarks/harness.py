@@ -0,0 +1,75 @@
+"""Helpers shared by the benchmark management commands"""
+
+import math
+import time
+from contextlib import contextmanager
+from django.test.utils import setup_databases, teardown_databases
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """Run the block against freshly created test databases
+
+    Benchmarks seed and drop data freely, so they never touch the
+    configured databases themselves.
+    """
+    old_config = setup_databases(verbosity=verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
+
+
+class Timer:
+    """Context manager measuring wall clock seconds in `elapsed`"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def rate(count, seconds):
+    return count / seconds if seconds else float("inf")
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of `values`, e.g. fraction=0.95 for p95"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def compare_baseline(results, baseline, tolerance):
+    """Return a message for each metric that regressed against `baseline`
+
+    Queries per request may only move by the fraction that cache warm-up
+    spreads over a run, so any extra query per request is a regression.
+    p95 latency may grow and throughput may shrink by `tolerance` (0.2 is
+    20%) to absorb noise between runs; p99 is too noisy to gate on.
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        measured = results.get(name)
+        if measured is None:
+            continue
+        if measured["queries_per_request"] > expected["queries_per_request"] + 0.5:
+            regressions.append(
+                f"{name}: {measured['queries_per_request']:.2f} queries/request, "
+                f"baseline {expected['queries_per_request']:.2f}"
+            )
+        if measured["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {measured['p95_ms']:.1f}ms, "
+                f"baseline {expected['p95_ms']:.1f}ms"
+            )
+        if measured["throughput"] < expected["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {measured['throughput']:.0f} requests/s, "
+                f"baseline {expected['throughput']:.0f}"
+            )
+    return regressions
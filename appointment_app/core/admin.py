@@ -1,6 +1,14 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Pediatrician, AppointmentScheduling, Appointment
+from .models import (
+    User,
+    Pediatrician,
+    AppointmentScheduling,
+    Appointment,
+    ArchivedAppointmentScheduling,
+    ArchivedAppointment,
+    EmailOutbox,
+)
 from django.utils.translation import gettext as _
 
 
@@ -24,3 +32,6 @@ admin.site.register(User, UserAdmin)
 admin.site.register(Pediatrician)
 admin.site.register(AppointmentScheduling)
 admin.site.register(Appointment)
+admin.site.register(ArchivedAppointmentScheduling)
+admin.site.register(ArchivedAppointment)
+admin.site.register(EmailOutbox)
@@ -0,0 +1,120 @@
+"""Move finished slots and their appointments to the archive tables
+
+Each batch is its own short transaction: the slots are locked with
+`SKIP LOCKED` where supported, copied with their appointments and deleted,
+so the hot tables stay writable while history is being archived. The rows
+are deleted with one DELETE statement per table, which skips the per-row
+delete signals, and the receivers are told once per batch instead.
+"""
+
+import time
+from typing import NamedTuple
+from django.conf import settings
+from django.db import connection, transaction
+from .models import (
+    Appointment,
+    AppointmentScheduling,
+    ArchivedAppointment,
+    ArchivedAppointmentScheduling,
+    SlotListing,
+)
+from .signals import appointments_changed, slots_changed
+
+SLOT_FIELDS = (
+    "id",
+    "created",
+    "updated",
+    "pediatrician_id",
+    "time_start",
+    "time_finish",
+    "is_available",
+)
+APPOINTMENT_FIELDS = (
+    "id",
+    "created",
+    "updated",
+    "user_id",
+    "appointment_scheduling_id",
+    "comments",
+)
+
+
+class ArchiveResult(NamedTuple):
+    slots: int
+    appointments: int
+    seconds: float
+
+
+def delete_rows(model, field, values):
+    """Delete the rows of `model` whose `field` is in `values`, in one statement
+
+    Unlike `QuerySet.delete`, this neither loads the rows nor sends their
+    delete signals, and leaves the cascades to the caller.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field(field).column)
+    placeholders = ", ".join(["%s"] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {column} IN ({placeholders})", values
+        )
+
+
+def archive_batch(cutoff, batch_size):
+    """Archive up to `batch_size` slots finished before `cutoff`
+
+    Return how many slots and appointments were moved.
+    """
+    with transaction.atomic():
+        slots = list(
+            AppointmentScheduling.objects.filter(time_finish__lt=cutoff)
+            .order_by("pk")
+            .select_for_update(skip_locked=True)
+            .values(*SLOT_FIELDS)[:batch_size]
+        )
+        if not slots:
+            return 0, 0
+        pks = [slot["id"] for slot in slots]
+        appointments = Appointment.objects.filter(appointment_scheduling__in=pks)
+        rows = list(appointments.values(*APPOINTMENT_FIELDS))
+
+        ArchivedAppointmentScheduling.objects.bulk_create(
+            ArchivedAppointmentScheduling(**slot) for slot in slots
+        )
+        ArchivedAppointment.objects.bulk_create(
+            ArchivedAppointment(**row) for row in rows
+        )
+        # Set-based deletes, with the cascades to the listing and the
+        # appointments done by hand
+        delete_rows(SlotListing, "slot", pks)
+        delete_rows(Appointment, "appointment_scheduling", pks)
+        delete_rows(AppointmentScheduling, "id", pks)
+        slots_changed.send(
+            sender=AppointmentScheduling,
+            queryset=AppointmentScheduling.objects.filter(pk__in=pks),
+            closed=True,
+        )
+        if rows:
+            appointments_changed.send(
+                sender=Appointment, users=[row["user_id"] for row in rows]
+            )
+    return len(slots), len(rows)
+
+
+def archive(cutoff, batch_size=None, pause=0.0):
+    """Archive every slot finished before `cutoff`, a batch at a time
+
+    `pause` seconds between batches leave room to the live traffic.
+    """
+    started = time.perf_counter()
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    total_slots = total_appointments = 0
+    while True:
+        slots, appointments = archive_batch(cutoff, batch_size)
+        total_slots += slots
+        total_appointments += appointments
+        if slots < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return ArchiveResult(total_slots, total_appointments, time.perf_counter() - started)
@@ -0,0 +1,51 @@
+"""Health checks for persistent database connections
+
+With CONN_MAX_AGE a connection outlives the request that opened it, and one
+broken while idle (database restart, failover, a proxy's idle timeout)
+fails the next request that uses it. Django 4.1+ checks it first when
+CONN_HEALTH_CHECKS is set; on older versions `check_connections` runs at
+request start and closes the unusable ones, so the request reconnects.
+
+A connection reused moments after its last request is almost never broken,
+so it is only pinged once it has been idle for DB_HEALTH_CHECK_IDLE seconds,
+sparing busy processes a round trip per request.
+"""
+
+import time
+import django
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+# Django 4.1 reads CONN_HEALTH_CHECKS itself
+NATIVE_HEALTH_CHECKS = django.VERSION >= (4, 1)
+
+
+def check_connections(**kwargs):
+    """Close this thread's open connections that fail a ping after idling"""
+    if NATIVE_HEALTH_CHECKS:
+        return
+    now = time.monotonic()
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict.get("CONN_HEALTH_CHECKS")
+            and not connection.in_atomic_block
+            and now - getattr(connection, "idle_since", 0)
+            >= settings.DB_HEALTH_CHECK_IDLE
+            and not connection.is_usable()
+        ):
+            connection.close()
+
+
+def mark_idle(**kwargs):
+    """Note when this thread's open connections were last used"""
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.idle_since = now
+
+
+request_started.connect(check_connections)
+# After Django's own close_old_connections, so only kept connections count
+request_finished.connect(mark_idle)
@@ -0,0 +1,304 @@
+"""Bulk import of pediatricians and slots from CSV or NDJSON streams
+
+Rows are read one at a time and validated a batch at a time, so checking a
+batch of slots costs one query for its pediatricians and one for the slots
+it could overlap. Valid rows are written with PostgreSQL COPY, or chunked
+`bulk_create` elsewhere, and each batch is committed before the next one is
+validated so later rows are checked against earlier ones. Invalid rows are
+handed to a rejects writer with the reason.
+"""
+
+import abc
+import csv
+import datetime
+import io
+import json
+import time
+from typing import NamedTuple
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .intervals import IntervalIndex
+from .models import GENRE, AppointmentScheduling, Pediatrician
+from .signals import slots_changed
+
+FORMATS = ("csv", "ndjson")
+
+
+class ImportResult(NamedTuple):
+    created: int
+    rejected: int
+    seconds: float
+
+    @property
+    def rows_per_second(self):
+        return self.created / self.seconds if self.seconds else 0.0
+
+
+class Rejected(Exception):
+    """A row failed validation, the message says why"""
+
+
+def read_rows(lines, import_format):
+    """Yield the (line number, row) pairs of a CSV or NDJSON text stream
+
+    NDJSON lines that are not a JSON object are yielded as the raw string,
+    for the importer to reject.
+    """
+    if import_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = line
+        yield number, row if isinstance(row, dict) else line.rstrip("\r\n")
+
+
+def rejects_writer(stream, import_format, columns):
+    """Return a callable writing rejected rows to `stream`
+
+    Rejects keep the input format and columns, plus the line number and the
+    error, so the file can be fixed and imported again.
+    """
+    if import_format == "csv":
+        writer = csv.DictWriter(
+            stream, ["line", *columns, "error"], extrasaction="ignore"
+        )
+        writer.writeheader()
+
+        def write(line, row, error):
+            writer.writerow(dict(row, line=line, error=error))
+
+    else:
+
+        def write(line, row, error):
+            if not isinstance(row, dict):
+                row = {"raw": row}
+            stream.write(
+                json.dumps(dict(row, line=line, error=error), ensure_ascii=False)
+            )
+            stream.write("\n")
+
+    return write
+
+
+def parse_time(value):
+    parsed = parse_datetime(str(value or "").strip())
+    if parsed is None:
+        raise ValueError
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def copy_rows(model, columns, rows):
+    """Write `rows` with one PostgreSQL COPY through an in-memory CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if isinstance(value, datetime.datetime) else value
+            for value in row
+        )
+    buffer.seek(0)
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ", ".join(
+        connection.ops.quote_name(model._meta.get_field(name).column)
+        for name in columns
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({names}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def write_rows(model, columns, rows):
+    """Insert `rows` of `columns` values, the audit timestamps set to now"""
+    now = timezone.now()
+    columns = ("created", "updated", *columns)
+    rows = [(now, now, *row) for row in rows]
+    if connection.vendor == "postgresql":
+        copy_rows(model, columns, rows)
+    else:
+        model.objects.bulk_create(
+            (model(**dict(zip(columns, row))) for row in rows),
+            batch_size=settings.SLOT_BULK_CHUNK_SIZE,
+        )
+
+
+class Importer(abc.ABC):
+    """Validate and insert the rows of one model, a batch at a time
+
+    `fields` are the input columns, `columns` the model fields their
+    cleaned values are written to.
+    """
+
+    model = None
+    fields = ()
+    columns = ()
+
+    @abc.abstractmethod
+    def clean(self, row):
+        """Return the row values in `columns` order, or raise Rejected"""
+
+    def check_batch(self, batch):
+        """Yield the (line, row, values or Rejected) of a cleaned batch"""
+        for line, row, values in batch:
+            yield line, row, values
+
+    def written(self, values):
+        """Called with the values of each batch once it is inserted"""
+
+    def run(self, rows, reject=None, batch_size=None):
+        started = time.perf_counter()
+        batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        created = rejected = 0
+        batch = []
+
+        def flush():
+            nonlocal created, rejected
+            accepted = []
+            for line, row, values in self.check_batch(batch):
+                if isinstance(values, Rejected):
+                    rejected += 1
+                    if reject is not None:
+                        reject(line, row, str(values))
+                else:
+                    accepted.append(values)
+            if accepted:
+                with transaction.atomic():
+                    write_rows(self.model, self.columns, accepted)
+                self.written(accepted)
+            created += len(accepted)
+            batch.clear()
+
+        for line, row in rows:
+            try:
+                if not isinstance(row, dict):
+                    raise Rejected("Malformed row")
+                values = self.clean(row)
+            except Rejected as error:
+                values = error
+            batch.append((line, row, values))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        return ImportResult(created, rejected, time.perf_counter() - started)
+
+
+class PediatricianImporter(Importer):
+    """Rows with a `name` and an optional `genre` (M by default)"""
+
+    model = Pediatrician
+    fields = ("name", "genre")
+    columns = ("name", "genre")
+    max_name_length = Pediatrician._meta.get_field("name").max_length
+
+    def clean(self, row):
+        name = str(row.get("name") or "").strip()
+        if not name:
+            raise Rejected("name is required")
+        if len(name) > self.max_name_length:
+            raise Rejected(f"name is longer than {self.max_name_length} characters")
+        genre = str(row.get("genre") or "M").strip().upper()
+        if genre not in dict(GENRE):
+            raise Rejected(f"genre must be one of {', '.join(dict(GENRE))}")
+        return name, genre
+
+
+class SlotImporter(Importer):
+    """Rows with a `pediatrician` id and ISO 8601 `time_start`, `time_finish`
+
+    Naive times are read in the current time zone. Slots overlapping the
+    pediatrician calendar, or an earlier row of the file, are rejected.
+    """
+
+    model = AppointmentScheduling
+    fields = ("pediatrician", "time_start", "time_finish")
+    # COPY writes every listed column and skips the model defaults, and
+    # is_available has no database default
+    columns = ("pediatrician_id", "time_start", "time_finish", "is_available")
+
+    def clean(self, row):
+        try:
+            pediatrician = int(row.get("pediatrician"))
+        except (TypeError, ValueError):
+            raise Rejected("pediatrician must be an id")
+        try:
+            time_start = parse_time(row.get("time_start"))
+            time_finish = parse_time(row.get("time_finish"))
+        except ValueError:
+            raise Rejected("time_start and time_finish must be ISO 8601 datetimes")
+        if time_finish <= time_start:
+            raise Rejected("time_finish must be after time_start")
+        if time_finish - time_start > datetime.timedelta(
+            minutes=settings.SLOT_MAX_MINUTES
+        ):
+            raise Rejected(
+                f"A slot can last {settings.SLOT_MAX_MINUTES} minutes at most"
+            )
+        return pediatrician, time_start, time_finish, True
+
+    def check_batch(self, batch):
+        values = [values for _, _, values in batch if not isinstance(values, Rejected)]
+        if not values:
+            yield from batch
+            return
+        ids = {pediatrician for pediatrician, *_ in values}
+        known = set(
+            Pediatrician.objects.filter(pk__in=ids).values_list("pk", flat=True)
+        )
+        longest = datetime.timedelta(minutes=settings.SLOT_MAX_MINUTES)
+        existing = AppointmentScheduling.objects.filter(
+            pediatrician_id__in=known,
+            time_start__gt=min(start for _, start, *_ in values) - longest,
+            time_start__lt=max(finish for _, _, finish, _ in values),
+        ).values_list("pediatrician_id", "time_start", "time_finish")
+        intervals = {pediatrician: [] for pediatrician in known}
+        for pediatrician, start, finish in existing:
+            intervals[pediatrician].append((start, finish))
+        calendars = {
+            pediatrician: IntervalIndex(slots)
+            for pediatrician, slots in intervals.items()
+        }
+
+        for line, row, values in batch:
+            if not isinstance(values, Rejected):
+                pediatrician, start, finish, _ = values
+                if pediatrician not in known:
+                    values = Rejected(f"Pediatrician {pediatrician} does not exist")
+                elif not calendars[pediatrician].add(start, finish):
+                    values = Rejected(
+                        "The slot overlaps another slot of the pediatrician"
+                    )
+            yield line, row, values
+
+    def written(self, values):
+        slots_changed.send(
+            sender=AppointmentScheduling,
+            queryset=AppointmentScheduling.objects.filter(
+                pediatrician_id__in={pediatrician for pediatrician, *_ in values},
+                time_start__gte=min(start for _, start, *_ in values),
+                time_start__lte=max(start for _, start, *_ in values),
+            ),
+        )
+
+
+IMPORTERS = {
+    "pediatricians": PediatricianImporter,
+    "slots": SlotImporter,
+}
+
+
+def import_rows(kind, lines, import_format, reject=None, batch_size=None):
+    """Import the `kind` rows of a CSV or NDJSON text stream"""
+    return IMPORTERS[kind]().run(
+        read_rows(lines, import_format), reject=reject, batch_size=batch_size
+    )
@@ -0,0 +1,42 @@
+import bisect
+
+
+class IntervalIndex:
+    """Sorted set of disjoint half-open `[start, finish)` intervals
+
+    Lookups and inserts binary search the sorted starts, so checking a new
+    interval against a calendar costs O(log n) comparisons. Intervals given
+    to the constructor may overlap each other; they are merged into disjoint
+    blocks first, which keeps the neighbour check exact.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._finishes = []
+        for start, finish in sorted(intervals):
+            if self._finishes and start < self._finishes[-1]:
+                self._finishes[-1] = max(self._finishes[-1], finish)
+            else:
+                self._starts.append(start)
+                self._finishes.append(finish)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return zip(self._starts, self._finishes)
+
+    def overlaps(self, start, finish):
+        """Whether `[start, finish)` intersects an interval of the index"""
+        position = bisect.bisect_left(self._starts, finish)
+        # Only the last block starting before `finish` can reach `start`
+        return position > 0 and self._finishes[position - 1] > start
+
+    def add(self, start, finish):
+        """Insert the interval, return False without inserting on overlap"""
+        if self.overlaps(start, finish):
+            return False
+        position = bisect.bisect_left(self._starts, start)
+        self._starts.insert(position, start)
+        self._finishes.insert(position, finish)
+        return True
@@ -0,0 +1,261 @@
+import datetime
+import logging
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.mail import BadHeaderError, get_connection
+from django.db import transaction
+from django.utils import timezone
+from . import metrics
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+METRICS = (
+    "email.queue_depth",
+    "email.sent",
+    "email.retried",
+    "email.failed",
+    "email.connections_opened",
+    "email.delivery_latency_ms.count",
+    "email.delivery_latency_ms.sum",
+)
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts"""
+    delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return datetime.timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+
+class ConnectionUnavailable(Exception):
+    """The email backend could not open a connection"""
+
+
+class ConnectionPool:
+    """Fixed number of long-lived email backend connections
+
+    Connections are opened lazily, reused across batches, dropped after an
+    error and reopened when they have been idle longer than `max_idle`
+    seconds, since SMTP servers close idle sessions on their side.
+    """
+
+    def __init__(self, size=None, max_idle=None, **kwargs):
+        self.size = size or settings.EMAIL_POOL_SIZE
+        self.max_idle = max_idle or settings.EMAIL_POOL_MAX_IDLE
+        self.kwargs = kwargs
+        self._idle = queue.LifoQueue()
+        for _ in range(self.size):
+            self._idle.put((None, 0))
+
+    @contextmanager
+    def connection(self):
+        connection, last_used = self._idle.get()
+        try:
+            if connection is not None and time.monotonic() - last_used > self.max_idle:
+                self._discard(connection)
+                connection = None
+            if connection is None:
+                connection = get_connection(**self.kwargs)
+                try:
+                    connection.open()
+                except Exception as error:
+                    raise ConnectionUnavailable(error) from error
+                metrics.incr("email.connections_opened")
+            yield connection
+        except Exception:
+            self._discard(connection)
+            connection = None
+            raise
+        finally:
+            self._idle.put((connection, time.monotonic()))
+
+    @staticmethod
+    def _discard(connection):
+        if connection is None:
+            return
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close every open connection, the pool stays usable"""
+        for _ in range(self.size):
+            connection, _ = self._idle.get()
+            self._discard(connection)
+            self._idle.put((None, 0))
+
+
+def _mark_failed(email, error, now, permanent=False):
+    email.attempts += 1
+    email.last_error = str(error) or error.__class__.__name__
+    if permanent or email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = EmailOutbox.FAILED
+        metrics.incr("email.failed")
+    else:
+        email.next_attempt = now + retry_delay(email.attempts)
+        metrics.incr("email.retried")
+
+
+def _mark_sent(email, now):
+    email.attempts += 1
+    email.status = EmailOutbox.SENT
+    email.sent = now
+    email.last_error = ""
+    latency = now - email.created
+    metrics.incr("email.sent")
+    metrics.observe("email.delivery_latency_ms", int(latency.total_seconds() * 1000))
+
+
+class DeliveryEngine:
+    """Send outbox emails in batches over a pool of connections
+
+    A batch is sent as soon as `batch_size` emails are due, or when
+    `flush_interval` seconds have passed since the last flush. Each batch is
+    split between the pool connections, which send their share concurrently.
+    """
+
+    def __init__(self, pool=None, batch_size=None, flush_interval=None):
+        self.pool = pool or ConnectionPool()
+        self.batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+        if flush_interval is None:
+            flush_interval = settings.EMAIL_OUTBOX_FLUSH_INTERVAL
+        self.flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(max_workers=self.pool.size)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def _send_chunk(self, emails):
+        """Send emails over one pooled connection with one `send_messages` call
+
+        The backend renders each message right before sending it and stops
+        at the first failure, so the last rendered message is the one that
+        failed, those before it were sent and the rest were never tried.
+        Returns the errors by email and the emails that were not tried.
+        """
+        rendered = []
+        messages = [self._tracked_message(email, rendered) for email in emails]
+        try:
+            with self.pool.connection() as connection:
+                connection.send_messages(messages)
+        except ConnectionUnavailable as error:
+            # Fail the whole chunk rather than reconnecting per email
+            return {email.pk: error for email in emails}, []
+        except Exception as error:
+            failed = rendered[-1] if rendered else emails[0]
+            return {failed.pk: error}, emails[emails.index(failed) + 1 :]
+        return {}, []
+
+    @staticmethod
+    def _tracked_message(email, rendered):
+        """The email's message, appending the email to `rendered` when rendered"""
+        message = email.as_message()
+        render = message.message
+
+        def tracked():
+            rendered.append(email)
+            return render()
+
+        message.message = tracked
+        return message
+
+    def claim(self):
+        """Lease a batch of due emails to this worker, return the batch
+
+        The lease pushes the emails' `next_attempt` EMAIL_OUTBOX_LEASE
+        seconds ahead and is committed before anything is sent, so other
+        workers skip the batch while no transaction or row lock is held
+        during the SMTP round trips. A worker that dies while sending
+        leaves its batch to be sent again once the lease expires.
+        """
+        with transaction.atomic():
+            batch = list(
+                EmailOutbox.objects.due()
+                .select_for_update(skip_locked=True)
+                .order_by("next_attempt", "id")[: self.batch_size]
+            )
+            if batch:
+                leased_until = timezone.now() + datetime.timedelta(
+                    seconds=settings.EMAIL_OUTBOX_LEASE
+                )
+                EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+                    next_attempt=leased_until
+                )
+        return batch
+
+    def flush(self):
+        """Send one batch of due emails
+
+        Returns the number of emails sent and the number that failed.
+        """
+        sent = failed = 0
+        batch = self.claim()
+        if batch:
+            chunks = [
+                batch[index :: self.pool.size]
+                for index in range(min(self.pool.size, len(batch)))
+            ]
+            errors = {}
+            untried = set()
+            for chunk_errors, chunk_untried in self._executor.map(
+                self._send_chunk, chunks
+            ):
+                errors.update(chunk_errors)
+                untried.update(email.pk for email in chunk_untried)
+
+            now = timezone.now()
+            for email in batch:
+                error = errors.get(email.pk)
+                if email.pk in untried:
+                    # Saving its `next_attempt` from before the lease leaves
+                    # it for the next batch without counting an attempt
+                    continue
+                if error is None:
+                    _mark_sent(email, now)
+                    sent += 1
+                else:
+                    logger.warning("Unable to send email %s: %s", email.pk, error)
+                    _mark_failed(
+                        email,
+                        error,
+                        now,
+                        permanent=isinstance(error, BadHeaderError),
+                    )
+                    failed += 1
+            EmailOutbox.objects.bulk_update(
+                batch, ["status", "attempts", "next_attempt", "sent", "last_error"]
+            )
+
+        metrics.gauge("email.queue_depth", EmailOutbox.objects.pending().count())
+        return sent, failed
+
+    def run(self, poll_interval=0.2, stop=None):
+        """Flush batches until `stop()` returns True"""
+        last_flush = time.monotonic()
+        while not (stop and stop()):
+            due = EmailOutbox.objects.due()[: self.batch_size].count()
+            elapsed = time.monotonic() - last_flush
+            if due and (due >= self.batch_size or elapsed >= self.flush_interval):
+                sent, failed = self.flush()
+                last_flush = time.monotonic()
+                logger.info("Sent %s emails, %s failed", sent, failed)
+            else:
+                time.sleep(poll_interval)
+
+
+def deliver_pending(batch_size=None, pool=None):
+    """Send one batch of due outbox emails
+
+    Returns the number of emails sent and the number that failed.
+    """
+    engine = DeliveryEngine(pool=pool, batch_size=batch_size)
+    try:
+        return engine.flush()
+    finally:
+        engine.close()
+        if pool is None:
+            engine.pool.close()
@@ -0,0 +1,38 @@
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.archive import archive
+
+
+class Command(BaseCommand):
+    help = "Move finished slots and their appointments to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help="Archive slots finished at least this many days ago",
+        )
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--pause", type=float, default=0.0, help="Seconds to wait between batches"
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 0:
+            raise CommandError("--days must not be negative")
+        if options["batch_size"] is not None and options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be positive")
+
+        cutoff = timezone.now() - datetime.timedelta(days=options["days"])
+        result = archive(cutoff, options["batch_size"], options["pause"])
+        rate = result.slots / result.seconds if result.seconds else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {result.slots} slots and {result.appointments} "
+                f"appointments finished before {cutoff:%Y-%m-%d %H:%M} "
+                f"({rate:.0f} slots/s)"
+            )
+        )
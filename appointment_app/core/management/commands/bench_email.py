@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from benchmarks.harness import Timer, benchmark_database, rate
+from benchmarks.smtp import SMTPSink
+from core.mail import ConnectionPool, DeliveryEngine
+from core.models import EmailOutbox
+
+
+def queue_emails(count):
+    EmailOutbox.objects.all().delete()
+    EmailOutbox.objects.bulk_create(
+        EmailOutbox(
+            subject="Gracias por agendar su cita con Yema",
+            message="Su pediatra es: Benchmark",
+            from_email="yemaecommerce@gmail.com",
+            recipient=f"user{index}@example.com",
+        )
+        for index in range(count)
+    )
+
+
+class Command(BaseCommand):
+    help = "Compare per-message SMTP connections with pooled batch delivery"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--pool-size", type=int, default=2)
+        parser.add_argument(
+            "--connect-delay",
+            type=float,
+            default=0.01,
+            help="Seconds the SMTP stand-in waits before greeting a connection",
+        )
+
+    def handle(self, *args, **options):
+        messages = options["messages"]
+        with benchmark_database(), SMTPSink(options["connect_delay"]) as sink:
+            with override_settings(**sink.settings()):
+                queue_emails(messages)
+                with Timer() as naive:
+                    for email in EmailOutbox.objects.all():
+                        email.as_message().send()
+                naive_connections = sink.connections
+
+                queue_emails(messages)
+                pool = ConnectionPool(size=options["pool_size"])
+                engine = DeliveryEngine(pool=pool, batch_size=options["batch_size"])
+                with Timer() as pooled:
+                    while any(engine.flush()):
+                        pass
+                engine.close()
+                pool.close()
+
+        self.stdout.write(
+            f"connection per message: {rate(messages, naive.elapsed):.0f} msg/s "
+            f"({naive_connections} connections)"
+        )
+        self.stdout.write(
+            f"pooled batches:         {rate(messages, pooled.elapsed):.0f} msg/s "
+            f"({sink.connections - naive_connections} connections)"
+        )
@@ -0,0 +1,101 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Pediatrician
+from core.scheduling import create_slots, generate_slots
+
+
+def weekday_list(value):
+    try:
+        weekdays = [int(day) for day in value.split(",")]
+    except ValueError:
+        raise CommandError(f"Invalid weekdays: {value}")
+    if not all(0 <= day <= 6 for day in weekdays):
+        raise CommandError("Weekdays go from 0 (Monday) to 6 (Sunday)")
+    return weekdays
+
+
+class Command(BaseCommand):
+    help = "Generate the slots of pediatricians from a weekly recurrence"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pediatrician",
+            type=int,
+            nargs="+",
+            help="Pediatrician ids, all pediatricians when omitted",
+        )
+        parser.add_argument(
+            "--from", dest="date_from", type=datetime.date.fromisoformat, required=True
+        )
+        parser.add_argument(
+            "--to", dest="date_to", type=datetime.date.fromisoformat, required=True
+        )
+        parser.add_argument(
+            "--weekdays", type=weekday_list, default=[0, 1, 2, 3, 4], help="e.g. 0,2,4"
+        )
+        parser.add_argument(
+            "--start", dest="day_start", type=datetime.time.fromisoformat, required=True
+        )
+        parser.add_argument(
+            "--finish",
+            dest="day_finish",
+            type=datetime.time.fromisoformat,
+            required=True,
+        )
+        parser.add_argument("--minutes", dest="slot_minutes", type=int, default=15)
+        parser.add_argument(
+            "--exclude",
+            dest="exclusions",
+            type=datetime.date.fromisoformat,
+            nargs="*",
+            default=[],
+            help="Dates without slots",
+        )
+        parser.add_argument("--chunk-size", type=int)
+
+    def handle(self, *args, **options):
+        if options["date_from"] > options["date_to"]:
+            raise CommandError("--from must not be after --to")
+        if options["day_start"] >= options["day_finish"]:
+            raise CommandError("--start must be before --finish")
+        if options["slot_minutes"] <= 0:
+            raise CommandError("--minutes must be positive")
+
+        pediatricians = Pediatrician.objects.all()
+        if options["pediatrician"]:
+            pediatricians = pediatricians.filter(pk__in=options["pediatrician"])
+
+        recurrence = {
+            name: options[name]
+            for name in (
+                "date_from",
+                "date_to",
+                "weekdays",
+                "day_start",
+                "day_finish",
+                "slot_minutes",
+                "exclusions",
+            )
+        }
+        created = skipped = 0
+        seconds = 0.0
+        for pediatrician in pediatricians:
+            result = create_slots(
+                pediatrician,
+                generate_slots(**recurrence),
+                chunk_size=options["chunk_size"],
+            )
+            created += result.created
+            skipped += result.skipped
+            seconds += result.seconds
+            self.stdout.write(
+                f"{pediatrician}: {result.created} slots created, "
+                f"{result.skipped} overlapping skipped"
+            )
+
+        rate = created / seconds if seconds else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} slots, skipped {skipped} ({rate:.0f} rows/s)"
+            )
+        )
@@ -0,0 +1,78 @@
+import os
+import resource
+import sys
+from contextlib import nullcontext
+from django.core.management.base import BaseCommand, CommandError
+from core.imports import FORMATS, IMPORTERS, import_rows, rejects_writer
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    return "ndjson" if extension in (".ndjson", ".jsonl") else "csv"
+
+
+class Command(BaseCommand):
+    help = "Import pediatricians or slots from a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path", help="File to import, - reads standard input")
+        parser.add_argument(
+            "--format",
+            dest="import_format",
+            choices=FORMATS,
+            help="Guessed from the file extension when omitted",
+        )
+        parser.add_argument(
+            "--rejects",
+            help="File receiving the invalid rows, <path>.rejects.<format> "
+            "by default",
+        )
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        import_format = options["import_format"] or guess_format(path)
+        rejects = options["rejects"]
+        if rejects is None:
+            if path == "-":
+                raise CommandError("--rejects is required when reading stdin")
+            rejects = f"{os.path.splitext(path)[0]}.rejects.{import_format}"
+        if options["batch_size"] is not None and options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be positive")
+
+        try:
+            source = (
+                nullcontext(sys.stdin)
+                if path == "-"
+                else open(path, newline="", encoding="utf-8-sig")
+            )
+        except OSError as error:
+            raise CommandError(error)
+        with source as lines, open(
+            rejects, "w", newline="", encoding="utf-8"
+        ) as output:
+            reject = rejects_writer(
+                output, import_format, IMPORTERS[options["kind"]].fields
+            )
+            result = import_rows(
+                options["kind"],
+                lines,
+                import_format,
+                reject=reject,
+                batch_size=options["batch_size"],
+            )
+        if not result.rejected:
+            os.remove(rejects)
+
+        # Linux reports the peak resident set size in KiB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.created} {options['kind']}, "
+                f"rejected {result.rejected} "
+                f"({result.rows_per_second:.0f} rows/s, peak memory {peak:.0f} MiB)"
+            )
+        )
+        if result.rejected:
+            self.stdout.write(f"Rejected rows written to {rejects}")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.models import AvailabilityBitmap
+
+
+class Command(BaseCommand):
+    help = "Rebuild the availability bitmaps from the slots, from today on"
+
+    def handle(self, *args, **options):
+        AvailabilityBitmap.objects.refresh()
+        self.stdout.write(
+            f"{AvailabilityBitmap.objects.count()} pediatrician days with free slots"
+        )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core.models import SlotListing
+
+
+class Command(BaseCommand):
+    help = "Rebuild the bookable slot listing from the slots and pediatricians"
+
+    def handle(self, *args, **options):
+        SlotListing.objects.refresh()
+        self.stdout.write(f"{SlotListing.objects.count()} bookable slots listed")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from core import metrics
+from core.mail import METRICS, ConnectionPool, DeliveryEngine
+
+
+class Command(BaseCommand):
+    help = "Deliver the emails queued in the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Emails sent per batch")
+        parser.add_argument("--pool-size", type=int, help="Email connections kept open")
+        parser.add_argument(
+            "--flush-interval",
+            type=float,
+            help="Seconds to wait for a full batch before sending (with --loop)",
+        )
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling for new emails"
+        )
+
+    def handle(self, *args, **options):
+        pool = ConnectionPool(size=options["pool_size"])
+        engine = DeliveryEngine(
+            pool=pool,
+            batch_size=options["batch_size"],
+            flush_interval=options["flush_interval"],
+        )
+        try:
+            if options["loop"]:
+                engine.run()
+            else:
+                while True:
+                    sent, failed = engine.flush()
+                    if not (sent or failed):
+                        break
+                    self.stdout.write(f"Sent {sent} emails, {failed} failed")
+        finally:
+            engine.close()
+            pool.close()
+
+        for name, value in metrics.snapshot(*METRICS).items():
+            self.stdout.write(f"{name}: {value}")
@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from core.models import AppointmentScheduling
+
+
+class Command(BaseCommand):
+    help = "Release the slot holds that expired before being booked"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep sweeping every --interval"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=30, help="Seconds between sweeps"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            released = AppointmentScheduling.objects.release_expired()
+            if released or not options["loop"]:
+                self.stdout.write(f"Released {released} expired holds")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,41 @@
+"""Counters, gauges and timings shared between processes through the cache"""
+
+from django.core.cache import cache
+
+PREFIX = "metrics:"
+
+
+def _key(name):
+    return f"{PREFIX}{name}"
+
+
+def incr(name, amount=1):
+    """Increase the counter `name` by `amount`"""
+    key = _key(name)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, amount, timeout=None)
+
+
+def gauge(name, value):
+    """Record the current value of `name`"""
+    cache.set(_key(name), value, timeout=None)
+
+
+def observe(name, value):
+    """Record one observation of `name`, kept as a count and a sum"""
+    incr(f"{name}.count")
+    incr(f"{name}.sum", value)
+
+
+def snapshot(*names):
+    """Return the current value of each metric in `names`"""
+    values = cache.get_many([_key(name) for name in names])
+    return {name: values.get(_key(name), 0) for name in names}
+
+
+def reset(*names):
+    cache.delete_many([_key(name) for name in names])
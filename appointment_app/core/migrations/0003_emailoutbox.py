@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_appointment_appointmentscheduling_pediatrician'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('subject', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('from_email', models.EmailField(max_length=255)),
+                ('recipient', models.EmailField(max_length=255)),
+                ('status', models.CharField(choices=[('P', 'Pendiente'), ('S', 'Enviado'), ('F', 'Fallido')], default='P', max_length=1)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Correo',
+                'verbose_name_plural': 'Correos',
+                'ordering': ['next_attempt', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='emailoutbox',
+            index=models.Index(fields=['status', 'next_attempt'], name='core_emailo_status_bed6ce_idx'),
+        ),
+    ]
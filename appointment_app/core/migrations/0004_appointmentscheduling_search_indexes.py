@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointmentscheduling',
+            index=models.Index(fields=['is_available', 'time_start'], name='core_slot_available_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentscheduling',
+            index=models.Index(fields=['pediatrician', 'time_start'], name='core_slot_pediatr_start_idx'),
+        ),
+    ]
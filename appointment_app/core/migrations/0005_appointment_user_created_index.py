@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_appointmentscheduling_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['user', '-created', '-id'], name='core_appt_user_created_idx'),
+        ),
+    ]
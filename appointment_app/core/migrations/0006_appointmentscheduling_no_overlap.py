@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:33
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+ADD_EXCLUSION = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE core_appointmentscheduling
+    ADD CONSTRAINT core_slot_no_overlap
+    EXCLUDE USING gist (
+        pediatrician_id WITH =,
+        tstzrange(time_start, time_finish, '[)') WITH &&
+    );
+"""
+
+DROP_EXCLUSION = """
+ALTER TABLE core_appointmentscheduling DROP CONSTRAINT core_slot_no_overlap;
+"""
+
+
+def add_exclusion(apps, schema_editor):
+    # Range exclusion constraints only exist on PostgreSQL, elsewhere the
+    # overlap check in AppointmentScheduling.clean is the only guard
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(ADD_EXCLUSION)
+
+
+def drop_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_EXCLUSION)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_appointment_user_created_index'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='appointmentscheduling',
+            constraint=models.CheckConstraint(check=models.Q(('time_finish__gt', django.db.models.expressions.F('time_start'))), name='core_slot_finish_after_start'),
+        ),
+        migrations.RunPython(add_exclusion, drop_exclusion),
+    ]
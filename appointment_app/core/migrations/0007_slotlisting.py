@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_slot_listing(apps, schema_editor):
+    AppointmentScheduling = apps.get_model('core', 'AppointmentScheduling')
+    SlotListing = apps.get_model('core', 'SlotListing')
+    slots = AppointmentScheduling.objects.filter(is_available=True).select_related('pediatrician')
+    SlotListing.objects.bulk_create(
+        (
+            SlotListing(
+                slot_id=slot.pk,
+                pediatrician_id=slot.pediatrician_id,
+                pediatrician_name=slot.pediatrician.name,
+                pediatrician_genre=slot.pediatrician.genre,
+                time_start=slot.time_start,
+                time_finish=slot.time_finish,
+            )
+            for slot in slots.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_appointmentscheduling_no_overlap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotListing',
+            fields=[
+                ('slot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='core.appointmentscheduling')),
+                ('pediatrician_name', models.CharField(blank=True, max_length=250)),
+                ('pediatrician_genre', models.CharField(choices=[('M', 'Masculino'), ('F', 'Femenino')], max_length=1)),
+                ('time_start', models.DateTimeField()),
+                ('time_finish', models.DateTimeField()),
+                ('pediatrician', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.pediatrician')),
+            ],
+            options={
+                'verbose_name': 'Horario disponible',
+                'verbose_name_plural': 'Horarios disponibles',
+                'ordering': ['time_start', 'slot'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='slotlisting',
+            index=models.Index(fields=['time_start', 'slot'], name='core_listing_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='slotlisting',
+            index=models.Index(fields=['pediatrician', 'time_start'], name='core_listing_pediatr_idx'),
+        ),
+        migrations.RunPython(fill_slot_listing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:04
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_slotlisting'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='slotlisting',
+            options={'ordering': ['time_start', 'pk'], 'verbose_name': 'Horario disponible', 'verbose_name_plural': 'Horarios disponibles'},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_slotlisting_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmentscheduling',
+            name='held_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='appointmentscheduling',
+            name='held_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='appointmentscheduling',
+            name='hold_token',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentscheduling',
+            index=models.Index(fields=['held_until'], name='core_slot_held_until_idx'),
+        ),
+    ]
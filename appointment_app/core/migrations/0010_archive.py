@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_appointmentscheduling_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointmentScheduling',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('created', models.DateTimeField()),
+                ('updated', models.DateTimeField()),
+                ('archived', models.DateTimeField(default=django.utils.timezone.now)),
+                ('time_start', models.DateTimeField()),
+                ('time_finish', models.DateTimeField()),
+                ('is_available', models.BooleanField()),
+                ('pediatrician', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.pediatrician')),
+            ],
+            options={
+                'verbose_name': 'Programación de cita archivada',
+                'verbose_name_plural': 'Programación de citas archivadas',
+                'ordering': ['time_start', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('created', models.DateTimeField()),
+                ('updated', models.DateTimeField()),
+                ('archived', models.DateTimeField(default=django.utils.timezone.now)),
+                ('comments', models.TextField(blank=True)),
+                ('appointment_scheduling', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.archivedappointmentscheduling')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cita archivada',
+                'verbose_name_plural': 'Citas archivadas',
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointmentscheduling',
+            index=models.Index(fields=['pediatrician', 'time_start'], name='core_arch_slot_pediatr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['user', '-created', '-id'], name='core_arch_appt_user_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityBitmap',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bits', models.BigIntegerField()),
+                ('pediatrician', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.pediatrician')),
+            ],
+            options={
+                'verbose_name': 'Disponibilidad diaria',
+                'verbose_name_plural': 'Disponibilidad diaria',
+                'ordering': ['day', 'pediatrician'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='availabilitybitmap',
+            index=models.Index(fields=['day', 'pediatrician'], name='core_bitmap_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='availabilitybitmap',
+            constraint=models.UniqueConstraint(fields=('pediatrician', 'day'), name='core_bitmap_pediatr_day_uniq'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+import datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+# Copies of the helpers in core.models as of this migration, so it keeps
+# working whatever becomes of them
+BUCKET_MINUTES = 30
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+
+
+def free_buckets(rows):
+    bitmaps = {}
+    for pediatrician, time_start in rows:
+        local = timezone.localtime(time_start)
+        key = (pediatrician, local.date())
+        bucket = (local.hour * 60 + local.minute) // BUCKET_MINUTES
+        bitmaps[key] = bitmaps.get(key, 0) | 1 << bucket
+    return bitmaps
+
+
+def fill_availability_bitmap(apps, schema_editor):
+    AppointmentScheduling = apps.get_model('core', 'AppointmentScheduling')
+    AvailabilityBitmap = apps.get_model('core', 'AvailabilityBitmap')
+    rows = AppointmentScheduling.objects.filter(
+        is_available=True, time_start__gte=start_of_day(timezone.localdate())
+    ).values_list('pediatrician_id', 'time_start')
+    AvailabilityBitmap.objects.all().delete()
+    AvailabilityBitmap.objects.bulk_create(
+        (
+            AvailabilityBitmap(pediatrician_id=pediatrician, day=day, bits=bits)
+            for (pediatrician, day), bits in free_buckets(rows.iterator()).items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_availabilitybitmap'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_availability_bitmap, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,5 @@
 from django.utils import timezone
-from django.db import models
+from django.db import DatabaseError, IntegrityError, models, transaction
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -7,8 +7,16 @@ from django.contrib.auth.models import (
 )
 from django.conf import settings
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from django.core.mail import BadHeaderError, send_mail
+from django.db.models.signals import post_delete, post_save
+from django.core.mail import EmailMessage
+from django.core.exceptions import ValidationError
+from . import metrics
+from .signals import slots_changed
+import datetime
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
 
 
 def get_hour_appointment(date):
@@ -81,21 +89,405 @@ class Pediatrician(AuditTrail):
         return self.name
 
 
+HOLD_METRICS = (
+    "slot_holds.granted",
+    "slot_holds.contended",
+    "slot_holds.converted",
+    "slot_holds.expired",
+    "slot_bookings.contended",
+)
+
+
+class AppointmentSchedulingQuerySet(models.QuerySet):
+    def unheld(self, now=None):
+        """Slots without a hold or whose hold has expired"""
+        return self.filter(
+            models.Q(held_until__isnull=True)
+            | models.Q(held_until__lte=now or timezone.now())
+        )
+
+    def hold(self, pk, user, seconds):
+        """Hold an available slot for `user`, return (token, until) or None
+
+        One conditional update, so of concurrent holds exactly one wins and
+        the others fail without further work. Expired holds are taken over.
+        """
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        held_until = now + datetime.timedelta(seconds=seconds)
+        held = (
+            self.unheld(now)
+            .filter(pk=pk, is_available=True)
+            .update(
+                held_by=user,
+                hold_token=token,
+                held_until=held_until,
+                updated=now,
+            )
+        )
+        metrics.incr("slot_holds.granted" if held else "slot_holds.contended")
+        return (token, held_until) if held else None
+
+    def claim(self, pk, user=None, hold_token=None, slot=None):
+        """Mark an available slot as booked, return whether this call won it
+
+        A slot held by someone else can only be claimed once the hold has
+        expired, the holder claims it with the `hold_token` of the hold.
+        Callers that already loaded the slot pass it as `slot`, which lets
+        the receivers update its day without recomputing it.
+        """
+        now = timezone.now()
+        claimable = models.Q(held_until__isnull=True) | models.Q(held_until__lte=now)
+        if hold_token:
+            claimable |= models.Q(held_by=user, hold_token=hold_token)
+        claimed = self.filter(claimable, pk=pk, is_available=True).update(
+            is_available=False,
+            held_by=None,
+            hold_token=None,
+            held_until=None,
+            updated=now,
+        )
+        if claimed:
+            if hold_token:
+                metrics.incr("slot_holds.converted")
+            starts = None
+            if slot is not None:
+                starts = {(slot.pediatrician_id, slot.time_start)}
+            slots_changed.send(
+                sender=self.model,
+                queryset=self.filter(pk=pk),
+                closed=True,
+                starts=starts,
+            )
+        else:
+            metrics.incr("slot_bookings.contended")
+        return bool(claimed)
+
+    def release(self, pk):
+        """Make a booked slot bookable again, unless it has already started"""
+        now = timezone.now()
+        released = self.filter(pk=pk, is_available=False, time_start__gt=now).update(
+            is_available=True, updated=now
+        )
+        if released:
+            slots_changed.send(sender=self.model, queryset=self.filter(pk=pk))
+        return bool(released)
+
+    def release_expired(self, now=None):
+        """Clear the expired holds, return how many were released"""
+        released = self.filter(held_until__lte=now or timezone.now()).update(
+            held_by=None, hold_token=None, held_until=None
+        )
+        if released:
+            metrics.incr("slot_holds.expired", released)
+        return released
+
+    def overlapping(self, pediatrician, time_start, time_finish):
+        """Slots of the pediatrician intersecting `[time_start, time_finish)`
+
+        Slots last at most SLOT_MAX_MINUTES, which bounds the
+        `(pediatrician, time_start)` index range to scan on both sides.
+        """
+        longest = datetime.timedelta(minutes=settings.SLOT_MAX_MINUTES)
+        return self.filter(
+            pediatrician=pediatrician,
+            time_start__gt=time_start - longest,
+            time_start__lt=time_finish,
+            time_finish__gt=time_start,
+        )
+
+
 class AppointmentScheduling(AuditTrail):
     pediatrician = models.ForeignKey(Pediatrician, on_delete=models.CASCADE)
     time_start = models.DateTimeField()
     time_finish = models.DateTimeField()
     is_available = models.BooleanField(default=True)
+    held_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    hold_token = models.CharField(max_length=32, null=True, blank=True)
+    held_until = models.DateTimeField(null=True, blank=True)
+
+    objects = AppointmentSchedulingQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Programación de cita"
         verbose_name_plural = "Programación de citas"
         ordering = ["-created"]
+        indexes = [
+            models.Index(
+                fields=["is_available", "time_start"],
+                name="core_slot_available_start_idx",
+            ),
+            models.Index(
+                fields=["pediatrician", "time_start"],
+                name="core_slot_pediatr_start_idx",
+            ),
+            models.Index(fields=["held_until"], name="core_slot_held_until_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(time_finish__gt=models.F("time_start")),
+                name="core_slot_finish_after_start",
+            ),
+        ]
+
+    def clean(self):
+        if self.time_start is None or self.time_finish is None:
+            return
+        if self.time_finish <= self.time_start:
+            raise ValidationError("time_finish must be after time_start")
+        if self.time_finish - self.time_start > datetime.timedelta(
+            minutes=settings.SLOT_MAX_MINUTES
+        ):
+            raise ValidationError(
+                f"A slot can last {settings.SLOT_MAX_MINUTES} minutes at most"
+            )
+        overlapping = AppointmentScheduling.objects.overlapping(
+            self.pediatrician_id, self.time_start, self.time_finish
+        ).exclude(pk=self.pk)
+        if overlapping.exists():
+            raise ValidationError("The slot overlaps another slot of the pediatrician")
 
     def __str__(self):
         return f"{self.pediatrician.name} el {get_date_appointment(self.time_start)}  de {get_hour_appointment(self.time_start)} a {get_hour_appointment(self.time_finish)}"
 
 
+class SlotListingQuerySet(models.QuerySet):
+    def refresh(self, slots=None):
+        """Rebuild the listing rows of `slots`, every slot by default"""
+        if slots is None:
+            slots = AppointmentScheduling.objects.all()
+            stale = self.all()
+        else:
+            stale = self.filter(slot__in=slots.values("pk"))
+        rows = (
+            slots.filter(is_available=True)
+            .order_by()
+            .values_list(
+                "pk",
+                "pediatrician_id",
+                "pediatrician__name",
+                "pediatrician__genre",
+                "time_start",
+                "time_finish",
+            )
+        )
+        with transaction.atomic(using=self.db, savepoint=False):
+            stale.delete()
+            self.bulk_create(
+                (
+                    SlotListing(
+                        slot_id=pk,
+                        pediatrician_id=pediatrician_id,
+                        pediatrician_name=name,
+                        pediatrician_genre=genre,
+                        time_start=time_start,
+                        time_finish=time_finish,
+                    )
+                    for pk, pediatrician_id, name, genre, time_start, time_finish in rows
+                ),
+                batch_size=settings.SLOT_BULK_CHUNK_SIZE,
+            )
+
+
+class SlotListing(models.Model):
+    """Bookable slot with its pediatrician, as the availability listing shows it
+
+    A projection of AppointmentScheduling and Pediatrician kept in sync by
+    the receivers below, so listing slots reads one table without joins.
+    Appointments only reach it through the slot `is_available` flag, which
+    every booking path changes with `save()` or `claim()`.
+    """
+
+    slot = models.OneToOneField(
+        AppointmentScheduling,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="listing",
+    )
+    pediatrician = models.ForeignKey(
+        Pediatrician, on_delete=models.CASCADE, related_name="+"
+    )
+    pediatrician_name = models.CharField(max_length=250, blank=True)
+    pediatrician_genre = models.CharField(max_length=1, choices=GENRE)
+    time_start = models.DateTimeField()
+    time_finish = models.DateTimeField()
+
+    # Only bookable slots are listed
+    is_available = True
+
+    objects = SlotListingQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Horario disponible"
+        verbose_name_plural = "Horarios disponibles"
+        ordering = ["time_start", "pk"]
+        indexes = [
+            models.Index(fields=["time_start", "slot"], name="core_listing_start_idx"),
+            models.Index(
+                fields=["pediatrician", "time_start"],
+                name="core_listing_pediatr_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.slot_id)
+
+
+# Half hour buckets, the 48 of a day fit the bits of a BigIntegerField
+BUCKET_MINUTES = 30
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+
+
+def free_buckets(rows):
+    """Map each `(pediatrician_id, day)` of the free slot rows to its bits
+
+    `rows` are `(pediatrician_id, time_start)` pairs. The migration filling
+    the bitmaps keeps its own copy, so changes here do not reach it.
+    """
+    bitmaps = {}
+    for pediatrician, time_start in rows:
+        local = timezone.localtime(time_start)
+        key = (pediatrician, local.date())
+        bucket = (local.hour * 60 + local.minute) // BUCKET_MINUTES
+        bitmaps[key] = bitmaps.get(key, 0) | 1 << bucket
+    return bitmaps
+
+
+class AvailabilityBitmapQuerySet(models.QuerySet):
+    def refresh(self, slots=None):
+        """Recompute the bitmaps of the days `slots` start on, all by default"""
+        if slots is None:
+            today = timezone.localdate()
+            rows = AppointmentScheduling.objects.filter(
+                is_available=True, time_start__gte=start_of_day(today)
+            ).values_list("pediatrician_id", "time_start")
+            with transaction.atomic(using=self.db, savepoint=False):
+                self.all().delete()
+                self.bulk_create(self.compute(rows))
+            return
+        days = slots.order_by().values_list("pediatrician_id", "time_start")
+        self.refresh_days(
+            {(pediatrician, timezone.localdate(start)) for pediatrician, start in days}
+        )
+
+    def refresh_days(self, days):
+        """Recompute the bitmaps covering the `(pediatrician_id, day)` pairs
+
+        Past days are skipped. Every pair between the first and last day of
+        the given pediatricians is recomputed from one query of their slots.
+        """
+        today = timezone.localdate()
+        days = {(pediatrician, day) for pediatrician, day in days if day >= today}
+        if not days:
+            return
+        pediatricians = {pediatrician for pediatrician, _ in days}
+        first = min(day for _, day in days)
+        last = max(day for _, day in days)
+        rows = AppointmentScheduling.objects.filter(
+            is_available=True,
+            pediatrician_id__in=pediatricians,
+            time_start__gte=start_of_day(first),
+            time_start__lt=start_of_day(last + datetime.timedelta(days=1)),
+        ).values_list("pediatrician_id", "time_start")
+        stale = self.filter(
+            pediatrician_id__in=pediatricians, day__gte=first, day__lte=last
+        )
+        bitmaps = self.compute(rows)
+        if len(days) == 1:
+            # A booking or release changes one day, update its row in place
+            if not bitmaps:
+                stale.delete()
+            elif not stale.update(bits=bitmaps[0].bits):
+                bitmaps[0].save(using=self.db)
+            return
+        with transaction.atomic(using=self.db, savepoint=False):
+            stale.delete()
+            self.bulk_create(bitmaps)
+
+    def close_buckets(self, starts):
+        """Clear the buckets of booked slots left without another free slot
+
+        `starts` are the `(pediatrician_id, time_start)` pairs of the slots.
+        The bucket bounds are computed here, so each slot costs one UPDATE
+        whose subquery scans the `(pediatrician, time_start)` index. A day
+        left without free slots keeps a zero row.
+        """
+        today = timezone.localdate()
+        for pediatrician, time_start in starts:
+            local = timezone.localtime(time_start)
+            if local.date() < today:
+                continue
+            bucket = (local.hour * 60 + local.minute) // BUCKET_MINUTES
+            minutes = bucket * BUCKET_MINUTES
+            bucket_start = timezone.make_aware(
+                datetime.datetime.combine(
+                    local.date(), datetime.time(minutes // 60, minutes % 60)
+                )
+            )
+            free = AppointmentScheduling.objects.filter(
+                pediatrician_id=pediatrician,
+                is_available=True,
+                time_start__gte=bucket_start,
+                time_start__lt=bucket_start
+                + datetime.timedelta(minutes=BUCKET_MINUTES),
+            )
+            self.filter(pediatrician_id=pediatrician, day=local.date()).exclude(
+                models.Exists(free)
+            ).update(bits=models.F("bits").bitand(~(1 << bucket)))
+
+    def compute(self, rows):
+        """Bitmaps of the `(pediatrician_id, time_start)` rows of free slots"""
+        return [
+            AvailabilityBitmap(pediatrician_id=pediatrician, day=day, bits=bits)
+            for (pediatrician, day), bits in free_buckets(rows.order_by()).items()
+        ]
+
+
+class AvailabilityBitmap(models.Model):
+    """Which half hours of a day have a free slot of the pediatrician
+
+    Bit `n` of `bits` is set when an available slot starts within the nth
+    BUCKET_MINUTES of the local day. Days without free slots have no row,
+    or a zero row once their last free slot was booked.
+    The receivers below recompute the days of changed slots, from today on,
+    after each commit.
+    """
+
+    pediatrician = models.ForeignKey(
+        Pediatrician, on_delete=models.CASCADE, related_name="+"
+    )
+    day = models.DateField()
+    bits = models.BigIntegerField()
+
+    objects = AvailabilityBitmapQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Disponibilidad diaria"
+        verbose_name_plural = "Disponibilidad diaria"
+        ordering = ["day", "pediatrician"]
+        indexes = [
+            models.Index(fields=["day", "pediatrician"], name="core_bitmap_day_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pediatrician", "day"], name="core_bitmap_pediatr_day_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.pediatrician_id} {self.day}"
+
+
 class Appointment(AuditTrail):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     appointment_scheduling = models.ForeignKey(
@@ -107,13 +499,134 @@ class Appointment(AuditTrail):
         verbose_name = "Cita"
         verbose_name_plural = "Citas"
         ordering = ["-created"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created", "-id"], name="core_appt_user_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.user.email
 
 
+class ArchivedAppointmentScheduling(models.Model):
+    """Slot that finished before the archival cutoff
+
+    Rows are moved here by the `archive_history` command and keep the id and
+    audit dates of the slot, so the hot table only holds the calendar ahead.
+    """
+
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+    archived = models.DateTimeField(default=timezone.now)
+    pediatrician = models.ForeignKey(
+        Pediatrician, on_delete=models.CASCADE, related_name="+"
+    )
+    time_start = models.DateTimeField()
+    time_finish = models.DateTimeField()
+    is_available = models.BooleanField()
+
+    class Meta:
+        verbose_name = "Programación de cita archivada"
+        verbose_name_plural = "Programación de citas archivadas"
+        ordering = ["time_start", "id"]
+        indexes = [
+            models.Index(
+                fields=["pediatrician", "time_start"], name="core_arch_slot_pediatr_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.id)
+
+
+class ArchivedAppointment(models.Model):
+    """Appointment of an archived slot, with the same fields and id"""
+
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+    archived = models.DateTimeField(default=timezone.now)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    appointment_scheduling = models.ForeignKey(
+        ArchivedAppointmentScheduling, on_delete=models.CASCADE
+    )
+    comments = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Cita archivada"
+        verbose_name_plural = "Citas archivadas"
+        ordering = ["-created"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created", "-id"], name="core_arch_appt_user_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.id)
+
+
+EMAIL_STATUS = (
+    ("P", "Pendiente"),
+    ("S", "Enviado"),
+    ("F", "Fallido"),
+)
+
+
+class EmailOutboxQuerySet(models.QuerySet):
+    def pending(self):
+        return self.filter(status=EmailOutbox.PENDING)
+
+    def due(self, now=None):
+        """Pending messages whose next attempt is not in the future"""
+        return self.pending().filter(next_attempt__lte=now or timezone.now())
+
+
+class EmailOutbox(AuditTrail):
+    """Email waiting to be delivered by the `send_emails` worker"""
+
+    PENDING = "P"
+    SENT = "S"
+    FAILED = "F"
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.EmailField(max_length=255)
+    recipient = models.EmailField(max_length=255)
+    status = models.CharField(max_length=1, choices=EMAIL_STATUS, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    sent = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    objects = EmailOutboxQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Correo"
+        verbose_name_plural = "Correos"
+        ordering = ["next_attempt", "id"]
+        indexes = [models.Index(fields=["status", "next_attempt"])]
+
+    def __str__(self):
+        return f"{self.recipient}: {self.subject}"
+
+    def as_message(self, connection=None):
+        return EmailMessage(
+            self.subject,
+            self.message,
+            self.from_email,
+            [self.recipient],
+            connection=connection,
+        )
+
+
 @receiver(post_save, sender=Appointment)
 def send_user_email(sender, instance, **kwargs):
+    """Queue the confirmation email in the same transaction as the booking"""
     if kwargs.get("created", False):
         subject = "Gracias por agendar su cita con Yema"
         pediatrician = instance.appointment_scheduling.pediatrician.name
@@ -121,7 +634,72 @@ def send_user_email(sender, instance, **kwargs):
         message = f"Su pediatra es: {pediatrician}\n\nFecha de cita: {appointment}\n\nComentarios: {instance.comments}"
         from_email = "yemaecommerce@gmail.com"
         user_email = instance.user.email
-        try:
-            send_mail(subject, message, from_email, [user_email])
-        except BadHeaderError:
-            pass
+        EmailOutbox.objects.create(
+            subject=subject,
+            message=message,
+            from_email=from_email,
+            recipient=user_email,
+        )
+
+
+@receiver(post_save, sender=AppointmentScheduling)
+def refresh_slot_listing(sender, instance, **kwargs):
+    SlotListing.objects.refresh(AppointmentScheduling.objects.filter(pk=instance.pk))
+
+
+@receiver(slots_changed)
+def refresh_changed_slot_listing(sender, queryset, closed=False, **kwargs):
+    if closed:
+        # Closed slots only leave the listing
+        SlotListing.objects.filter(slot__in=queryset.values("pk")).delete()
+    else:
+        SlotListing.objects.refresh(queryset)
+
+
+def refresh_bitmaps_on_commit(refresh):
+    """Run `refresh` once the transaction commits, outside the booking
+
+    Concurrent refreshes of one day can both insert its row, the one that
+    fails the unique constraint retries and replaces the winner's row. The
+    change is committed by then, so other failures are only logged and
+    left to the `rebuild_availability` command.
+    """
+
+    def run():
+        for attempt in (1, 2):
+            try:
+                refresh()
+                return
+            except IntegrityError:
+                if attempt == 2:
+                    logger.exception("Availability bitmap refresh lost twice")
+            except DatabaseError:
+                logger.exception("Availability bitmap refresh failed")
+                return
+
+    transaction.on_commit(run)
+
+
+@receiver(post_save, sender=AppointmentScheduling)
+@receiver(post_delete, sender=AppointmentScheduling)
+def refresh_slot_bitmap(sender, instance, **kwargs):
+    days = {(instance.pediatrician_id, timezone.localdate(instance.time_start))}
+    refresh_bitmaps_on_commit(lambda: AvailabilityBitmap.objects.refresh_days(days))
+
+
+@receiver(slots_changed)
+def refresh_changed_slot_bitmaps(sender, queryset, closed=False, starts=None, **kwargs):
+    if closed and starts is not None:
+        refresh_bitmaps_on_commit(
+            lambda: AvailabilityBitmap.objects.close_buckets(starts)
+        )
+    else:
+        refresh_bitmaps_on_commit(lambda: AvailabilityBitmap.objects.refresh(queryset))
+
+
+@receiver(post_save, sender=Pediatrician)
+def update_slot_listing_pediatrician(sender, instance, created=False, **kwargs):
+    if not created:
+        SlotListing.objects.filter(pediatrician=instance).update(
+            pediatrician_name=instance.name, pediatrician_genre=instance.genre
+        )
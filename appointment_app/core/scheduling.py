@@ -0,0 +1,239 @@
+import datetime
+import time
+import uuid
+from typing import NamedTuple
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from . import metrics
+from .intervals import IntervalIndex
+from .models import (
+    Appointment,
+    AppointmentScheduling,
+    EmailOutbox,
+    get_date_appointment,
+    get_hour_appointment,
+)
+from .signals import appointments_changed, slots_changed
+
+
+class BookingResult(NamedTuple):
+    booked: list
+    rejected: list
+
+
+class CancellationResult(NamedTuple):
+    appointments: int
+    slots: int
+
+
+class GenerationResult(NamedTuple):
+    created: int
+    skipped: int
+    seconds: float
+
+    @property
+    def rows_per_second(self):
+        return self.created / self.seconds if self.seconds else 0.0
+
+
+def generate_slots(
+    date_from, date_to, weekdays, day_start, day_finish, slot_minutes, exclusions=()
+):
+    """Yield the (time_start, time_finish) pairs of a weekly recurrence
+
+    Slots of `slot_minutes` fill the working hours between `day_start` and
+    `day_finish` (local time) on each of the `weekdays` (0 is Monday) from
+    `date_from` to `date_to` inclusive, except on the `exclusions` dates.
+    """
+    length = datetime.timedelta(minutes=slot_minutes)
+    weekdays = set(weekdays)
+    exclusions = set(exclusions)
+    day = date_from
+    while day <= date_to:
+        if day.weekday() in weekdays and day not in exclusions:
+            time_start = timezone.make_aware(datetime.datetime.combine(day, day_start))
+            day_end = timezone.make_aware(datetime.datetime.combine(day, day_finish))
+            while time_start + length <= day_end:
+                yield time_start, time_start + length
+                time_start += length
+        day += datetime.timedelta(days=1)
+
+
+def remove_overlaps(intervals, existing):
+    """Split `intervals` into those free of overlaps and the rest
+
+    An interval is rejected when it overlaps one of the `existing`
+    (time_start, time_finish) pairs or an interval accepted before it.
+    """
+    calendar = IntervalIndex(existing)
+    accepted, rejected = [], []
+    for start, finish in intervals:
+        if calendar.add(start, finish):
+            accepted.append((start, finish))
+        else:
+            rejected.append((start, finish))
+    return accepted, rejected
+
+
+def create_slots(pediatrician, intervals, chunk_size=None):
+    """Insert the slots of `intervals` that do not overlap the calendar
+
+    Existing slots of the pediatrician in the covered period are loaded
+    once, overlaps are resolved in memory and the remaining slots are
+    inserted with `bulk_create` in chunks of `chunk_size`.
+    """
+    started = time.perf_counter()
+    chunk_size = chunk_size or settings.SLOT_BULK_CHUNK_SIZE
+    intervals = sorted(intervals)
+    if not intervals:
+        return GenerationResult(0, 0, 0.0)
+
+    existing = AppointmentScheduling.objects.overlapping(
+        pediatrician, intervals[0][0], max(finish for _, finish in intervals)
+    ).values_list("time_start", "time_finish")
+    accepted, rejected = remove_overlaps(intervals, existing)
+
+    slots = [
+        AppointmentScheduling(
+            pediatrician=pediatrician, time_start=start, time_finish=finish
+        )
+        for start, finish in accepted
+    ]
+    with transaction.atomic():
+        AppointmentScheduling.objects.bulk_create(slots, batch_size=chunk_size)
+    if accepted:
+        slots_changed.send(
+            sender=AppointmentScheduling,
+            queryset=AppointmentScheduling.objects.filter(
+                pediatrician=pediatrician,
+                time_start__gte=accepted[0][0],
+                time_start__lte=accepted[-1][0],
+            ),
+        )
+
+    return GenerationResult(len(accepted), len(rejected), time.perf_counter() - started)
+
+
+def cancel_day(pediatrician, day):
+    """Cancel the pediatrician's appointments on `day` and close its slots
+
+    Set-based: the users are notified with one insert into the outbox, the
+    appointments are deleted together and one update makes every slot of
+    the day unavailable, so nobody can book them again.
+    """
+    time_start = timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+    time_finish = timezone.make_aware(
+        datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time())
+    )
+    slots = AppointmentScheduling.objects.filter(
+        pediatrician=pediatrician,
+        time_start__gte=time_start,
+        time_start__lt=time_finish,
+    )
+    appointments = Appointment.objects.filter(appointment_scheduling__in=slots)
+    with transaction.atomic():
+        emails = [
+            EmailOutbox(
+                subject="Su cita con Yema fue cancelada",
+                message=(
+                    f"Su pediatra es: {pediatrician.name}\n\n"
+                    f"Fecha de cita cancelada: {get_date_appointment(start)}  de "
+                    f"{get_hour_appointment(start)} a {get_hour_appointment(finish)}"
+                ),
+                from_email="yemaecommerce@gmail.com",
+                recipient=email,
+            )
+            for email, start, finish in appointments.values_list(
+                "user__email",
+                "appointment_scheduling__time_start",
+                "appointment_scheduling__time_finish",
+            )
+        ]
+        EmailOutbox.objects.bulk_create(emails)
+        appointments.delete()
+        closed = slots.update(
+            is_available=False,
+            held_by=None,
+            hold_token=None,
+            held_until=None,
+            updated=timezone.now(),
+        )
+        if closed:
+            slots_changed.send(
+                sender=AppointmentScheduling, queryset=slots, closed=True
+            )
+    return CancellationResult(len(emails), closed)
+
+
+def book_slots(user, bookings, all_or_nothing=True):
+    """Book several slots for `user` with a fixed number of statements
+
+    `bookings` are (slot id, comments, hold token or None) triples. One
+    update claims every slot that is available and not held by someone
+    else, tagging the rows with a batch marker to tell which ones it won.
+    The appointments are inserted with `bulk_create` and a single email
+    confirms the whole batch. With `all_or_nothing`, losing any slot rolls
+    the batch back and nothing is booked.
+    """
+    pks = [pk for pk, _, _ in bookings]
+    tokens = [token for _, _, token in bookings if token]
+    now = timezone.now()
+    marker = uuid.uuid4().hex
+    claimable = models.Q(held_until__isnull=True) | models.Q(held_until__lte=now)
+    if tokens:
+        claimable |= models.Q(held_by=user, hold_token__in=tokens)
+
+    with transaction.atomic():
+        slots = AppointmentScheduling.objects.filter(pk__in=pks)
+        claimed = slots.filter(claimable, is_available=True).update(
+            is_available=False,
+            held_by=None,
+            hold_token=marker,
+            held_until=None,
+            updated=now,
+        )
+        if claimed < len(pks):
+            metrics.incr("slot_bookings.contended", len(pks) - claimed)
+            if all_or_nothing:
+                won = set(slots.filter(hold_token=marker).values_list("pk", flat=True))
+                # The claimed slots are released by rolling the batch back
+                transaction.set_rollback(True)
+                return BookingResult([], [pk for pk in pks if pk not in won])
+        if not claimed:
+            return BookingResult([], pks)
+
+        won = slots.filter(hold_token=marker)
+        rows = list(
+            won.order_by("time_start").values_list(
+                "pk", "pediatrician__name", "time_start", "time_finish"
+            )
+        )
+        won.update(hold_token=None)
+        booked = {pk for pk, _, _, _ in rows}
+        comments = {pk: text for pk, text, _ in bookings}
+        Appointment.objects.bulk_create(
+            Appointment(user=user, appointment_scheduling_id=pk, comments=comments[pk])
+            for pk in pks
+            if pk in booked
+        )
+        slots_changed.send(
+            sender=AppointmentScheduling,
+            queryset=AppointmentScheduling.objects.filter(pk__in=booked),
+            closed=True,
+        )
+        appointments_changed.send(sender=Appointment, users=[user.pk])
+        appointments = "\n".join(
+            f"{name}: {get_date_appointment(start)}  de "
+            f"{get_hour_appointment(start)} a {get_hour_appointment(finish)}"
+            for _, name, start, finish in rows
+        )
+        EmailOutbox.objects.create(
+            subject="Gracias por agendar sus citas con Yema",
+            message=f"Sus citas:\n\n{appointments}",
+            from_email="yemaecommerce@gmail.com",
+            recipient=user.email,
+        )
+    return BookingResult(
+        [pk for pk in pks if pk in booked], [pk for pk in pks if pk not in booked]
+    )
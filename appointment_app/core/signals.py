@@ -0,0 +1,13 @@
+from django.dispatch import Signal
+
+# Sent after set-based writes (update, bulk_create) change which slots are
+# available, since those bypass the model save and delete signals. The
+# `queryset` argument selects the affected AppointmentScheduling rows.
+# Senders may add `closed=True` when the slots were only made unavailable,
+# and `starts`, the `(pediatrician_id, time_start)` pairs of the slots, when
+# they know them without a query.
+slots_changed = Signal()
+
+# Sent after set-based writes create or delete appointments, for the same
+# reason. The `users` argument lists the ids of the users they belong to.
+appointments_changed = Signal()
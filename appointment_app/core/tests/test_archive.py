@@ -0,0 +1,93 @@
+import datetime
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models.signals import post_delete
+from django.test import TestCase
+from django.utils import timezone
+from core.archive import archive
+from core.models import (
+    Appointment,
+    AppointmentScheduling,
+    ArchivedAppointment,
+    ArchivedAppointmentScheduling,
+    Pediatrician,
+    SlotListing,
+)
+from core.signals import appointments_changed, slots_changed
+
+
+class ArchiveTests(TestCase):
+    """Test moving finished slots and appointments to the archive"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.pediatrician = Pediatrician.objects.create(name="Test P")
+        now = timezone.now()
+        self.past = [
+            self.create_slot(now - datetime.timedelta(days=40, hours=i))
+            for i in range(5)
+        ]
+        self.future = self.create_slot(now + datetime.timedelta(days=1))
+        self.appointment = Appointment.objects.create(
+            user=self.user, appointment_scheduling=self.past[0], comments="Nota"
+        )
+        Appointment.objects.create(user=self.user, appointment_scheduling=self.future)
+
+    def create_slot(self, time_start):
+        return AppointmentScheduling.objects.create(
+            pediatrician=self.pediatrician,
+            time_start=time_start,
+            time_finish=time_start + datetime.timedelta(minutes=30),
+        )
+
+    def test_archive_moves_finished_slots(self):
+        """Test finished slots and their appointments move in batches"""
+        cutoff = timezone.now() - datetime.timedelta(days=30)
+
+        result = archive(cutoff, batch_size=2)
+
+        self.assertEqual((result.slots, result.appointments), (5, 1))
+        self.assertEqual(list(AppointmentScheduling.objects.all()), [self.future])
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertEqual(ArchivedAppointmentScheduling.objects.count(), 5)
+        self.assertEqual(
+            list(SlotListing.objects.values_list("slot_id", flat=True)),
+            [self.future.id],
+        )
+        archived = ArchivedAppointment.objects.get()
+        self.assertEqual(archived.id, self.appointment.id)
+        self.assertEqual(archived.created, self.appointment.created)
+        self.assertEqual(archived.appointment_scheduling_id, self.past[0].id)
+        self.assertEqual(archived.comments, "Nota")
+
+    def test_archive_signals_once_per_batch(self):
+        """Test a batch skips the per-row delete signals and signals once"""
+        sent = []
+
+        def record(signal, **kwargs):
+            sent.append(signal)
+
+        for signal in (post_delete, slots_changed, appointments_changed):
+            signal.connect(record)
+            self.addCleanup(signal.disconnect, record)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            archive(timezone.now() - datetime.timedelta(days=30), batch_size=5)
+
+        self.assertEqual(sent, [slots_changed, appointments_changed])
+
+    def test_archive_keeps_recent_slots(self):
+        """Test slots finished after the cutoff stay in the hot table"""
+        result = archive(timezone.now() - datetime.timedelta(days=60))
+
+        self.assertEqual(result.slots, 0)
+        self.assertEqual(AppointmentScheduling.objects.count(), 6)
+
+    def test_archive_command(self):
+        """Test the command archives slots older than --days"""
+        out = StringIO()
+
+        call_command("archive_history", "--days", "30", "--batch-size", "3", stdout=out)
+
+        self.assertIn("Archived 5 slots and 1 appointments", out.getvalue())
@@ -0,0 +1,130 @@
+import datetime
+import importlib
+from io import StringIO
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from core.models import AppointmentScheduling, AvailabilityBitmap, Pediatrician
+from core.scheduling import create_slots
+
+
+class AvailabilityBitmapTests(TestCase):
+    """Test the availability bitmaps follow the slots"""
+
+    def setUp(self):
+        self.pediatrician = Pediatrician.objects.create(name="Test P")
+        self.day = timezone.localdate() + datetime.timedelta(days=1)
+
+    def at(self, hour, minute=0, day=None):
+        return timezone.make_aware(
+            datetime.datetime.combine(day or self.day, datetime.time(hour, minute))
+        )
+
+    def create_slot(self, hour, minute=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AppointmentScheduling.objects.create(
+                pediatrician=self.pediatrician,
+                time_start=self.at(hour, minute),
+                time_finish=self.at(hour, minute) + datetime.timedelta(minutes=15),
+            )
+
+    def bits(self):
+        # Days left without free slots keep a zero row
+        return dict(
+            AvailabilityBitmap.objects.exclude(bits=0).values_list("day", "bits")
+        )
+
+    def test_created_slots_set_buckets(self):
+        """Test each free slot sets the bit of its half hour"""
+        self.create_slot(9)
+        self.create_slot(9, 15)
+        self.create_slot(10, 30)
+
+        self.assertEqual(self.bits(), {self.day: 1 << 18 | 1 << 21})
+
+    def test_booking_and_release_update_bucket(self):
+        """Test claiming the last free slot of a bucket clears its bit"""
+        first = self.create_slot(9)
+        second = self.create_slot(9, 15)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AppointmentScheduling.objects.claim(first.pk)
+        self.assertEqual(self.bits(), {self.day: 1 << 18})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AppointmentScheduling.objects.claim(second.pk)
+        self.assertEqual(self.bits(), {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AppointmentScheduling.objects.release(first.pk)
+        self.assertEqual(self.bits(), {self.day: 1 << 18})
+
+    def test_claim_clears_bucket_in_one_statement(self):
+        """Test a claim of a loaded slot clears its bucket with one update"""
+        first = self.create_slot(9)
+        self.create_slot(23, 45)
+
+        # claim, listing delete, bitmap update
+        with self.assertNumQueries(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                AppointmentScheduling.objects.claim(first.pk, slot=first)
+
+        self.assertEqual(self.bits(), {self.day: 1 << 47})
+
+    def test_claim_keeps_bucket_with_free_slot(self):
+        """Test a claim keeps the bucket set while another slot in it is free"""
+        first = self.create_slot(9)
+        self.create_slot(9, 15)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AppointmentScheduling.objects.claim(first.pk, slot=first)
+
+        self.assertEqual(self.bits(), {self.day: 1 << 18})
+
+    def test_deleted_slot_clears_bucket(self):
+        """Test deleting a slot clears its bit"""
+        slot = self.create_slot(9)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            slot.delete()
+
+        self.assertEqual(self.bits(), {})
+
+    def test_bulk_created_slots(self):
+        """Test slots inserted in bulk fill the bitmaps of every day"""
+        next_day = self.day + datetime.timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_slots(
+                self.pediatrician,
+                [
+                    (self.at(8), self.at(8, 30)),
+                    (self.at(23, 30, next_day), self.at(23, 59, next_day)),
+                ],
+            )
+
+        self.assertEqual(self.bits(), {self.day: 1 << 16, next_day: 1 << 47})
+
+    def test_rebuild_command(self):
+        """Test the bitmaps are rebuilt after writes that skipped the signals"""
+        self.create_slot(9)
+        AppointmentScheduling.objects.update(is_available=False)
+        self.assertEqual(len(self.bits()), 1)
+
+        out = StringIO()
+        call_command("rebuild_availability", stdout=out)
+
+        self.assertEqual(self.bits(), {})
+        self.assertIn("0 pediatrician days", out.getvalue())
+
+    def test_migration_fills_bitmaps(self):
+        """Test the migration fills the bitmaps of the slots already there"""
+        self.create_slot(9)
+        AvailabilityBitmap.objects.all().delete()
+        migration = importlib.import_module(
+            "core.migrations.0012_fill_availabilitybitmap"
+        )
+
+        migration.fill_availability_bitmap(apps, None)
+
+        self.assertEqual(self.bits(), {self.day: 1 << 18})
@@ -0,0 +1,74 @@
+import datetime
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from core import metrics
+from core.models import HOLD_METRICS, AppointmentScheduling, Pediatrician
+
+
+class SlotHoldTests(TestCase):
+    """Test holding slots before booking them"""
+
+    def setUp(self):
+        metrics.reset(*HOLD_METRICS)
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.other = get_user_model().objects.create_user("other@test.com", "pass")
+        time_start = timezone.now() + datetime.timedelta(days=1)
+        self.slot = AppointmentScheduling.objects.create(
+            pediatrician=Pediatrician.objects.create(name="Test P"),
+            time_start=time_start,
+            time_finish=time_start + datetime.timedelta(minutes=30),
+        )
+        self.slots = AppointmentScheduling.objects
+
+    def expire(self):
+        self.slots.update(held_until=timezone.now() - datetime.timedelta(seconds=1))
+
+    def test_hold_excludes_other_clients(self):
+        """Test a held slot can be neither held nor claimed by others"""
+        token, held_until = self.slots.hold(self.slot.pk, self.user, 60)
+
+        self.assertGreater(held_until, timezone.now())
+        self.assertIsNone(self.slots.hold(self.slot.pk, self.other, 60))
+        self.assertFalse(self.slots.claim(self.slot.pk, self.other))
+        self.assertFalse(self.slots.claim(self.slot.pk, self.other, token))
+        self.assertTrue(self.slots.claim(self.slot.pk, self.user, token))
+        self.slot.refresh_from_db()
+        self.assertFalse(self.slot.is_available)
+        self.assertIsNone(self.slot.hold_token)
+        self.assertEqual(
+            metrics.snapshot(*HOLD_METRICS),
+            {
+                "slot_holds.granted": 1,
+                "slot_holds.contended": 1,
+                "slot_holds.converted": 1,
+                "slot_holds.expired": 0,
+                "slot_bookings.contended": 2,
+            },
+        )
+
+    def test_expired_hold_taken_over(self):
+        """Test an expired hold is reclaimed lazily by the next client"""
+        self.slots.hold(self.slot.pk, self.user, 60)
+        self.expire()
+
+        self.assertIsNotNone(self.slots.hold(self.slot.pk, self.other, 60))
+
+    def test_sweep_command(self):
+        """Test the sweeper releases expired holds only"""
+        self.slots.hold(self.slot.pk, self.user, 60)
+        out = StringIO()
+
+        call_command("sweep_holds", stdout=out)
+        self.assertIn("Released 0", out.getvalue())
+
+        self.expire()
+        call_command("sweep_holds", stdout=out)
+        self.assertIn("Released 1", out.getvalue())
+        self.slot.refresh_from_db()
+        self.assertIsNone(self.slot.held_by)
+        self.assertEqual(
+            metrics.snapshot("slot_holds.expired")["slot_holds.expired"], 1
+        )
@@ -0,0 +1,152 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+from unittest import mock, skipUnless
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from core.imports import import_rows, rejects_writer
+from core.models import AppointmentScheduling, Pediatrician, SlotListing
+
+
+class ImportTests(TestCase):
+    """Test the CSV and NDJSON importer"""
+
+    def setUp(self):
+        self.pediatrician = Pediatrician.objects.create(name="Test P")
+        self.time_start = timezone.now().replace(microsecond=0) + datetime.timedelta(
+            days=1
+        )
+
+    def slot(self, offset, minutes=30, pediatrician=None):
+        time_start = self.time_start + datetime.timedelta(minutes=offset)
+        return {
+            "pediatrician": pediatrician or self.pediatrician.id,
+            "time_start": time_start.isoformat(),
+            "time_finish": (
+                time_start + datetime.timedelta(minutes=minutes)
+            ).isoformat(),
+        }
+
+    def ndjson(self, rows):
+        return io.StringIO("".join(json.dumps(row) + "\n" for row in rows))
+
+    def test_import_pediatricians_csv(self):
+        """Test valid pediatricians are created and invalid ones rejected"""
+        lines = io.StringIO("name,genre\nAna,F\nLuis,\n,M\nEva,X\n")
+        rejects = []
+
+        result = import_rows(
+            "pediatricians",
+            lines,
+            "csv",
+            reject=lambda *reject: rejects.append(reject),
+        )
+
+        self.assertEqual((result.created, result.rejected), (2, 2))
+        self.assertEqual(Pediatrician.objects.get(name="Luis").genre, "M")
+        self.assertEqual([line for line, _, _ in rejects], [4, 5])
+
+    def test_import_slots_ndjson(self):
+        """Test slots are created and listed, batch after batch"""
+        rows = [self.slot(30 * index) for index in range(5)]
+
+        result = import_rows("slots", self.ndjson(rows), "ndjson", batch_size=2)
+
+        self.assertEqual(result.created, 5)
+        self.assertEqual(AppointmentScheduling.objects.count(), 5)
+        self.assertEqual(SlotListing.objects.count(), 5)
+
+    def test_import_slots_rejects(self):
+        """Test overlapping, unknown and malformed slots are rejected"""
+        AppointmentScheduling.objects.create(
+            pediatrician=self.pediatrician,
+            time_start=self.time_start,
+            time_finish=self.time_start + datetime.timedelta(minutes=30),
+        )
+        lines = self.ndjson(
+            [
+                self.slot(0),
+                self.slot(30),
+                self.slot(45),
+                self.slot(90, pediatrician=999),
+                self.slot(120, minutes=-30),
+                {"pediatrician": self.pediatrician.id, "time_start": "tomorrow"},
+            ]
+        )
+        lines.seek(0, io.SEEK_END)
+        lines.write("not json\n")
+        lines.seek(0)
+        output = io.StringIO()
+        reject = rejects_writer(
+            output, "ndjson", ("pediatrician", "time_start", "time_finish")
+        )
+
+        # A batch of two checks later rows against the earlier batches
+        result = import_rows("slots", lines, "ndjson", reject=reject, batch_size=2)
+
+        self.assertEqual((result.created, result.rejected), (1, 6))
+        rejects = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([reject["line"] for reject in rejects], [1, 3, 4, 5, 6, 7])
+        self.assertIn("overlaps", rejects[1]["error"])
+        self.assertIn("999", rejects[2]["error"])
+        self.assertEqual(rejects[5]["raw"], "not json")
+
+    def test_import_slots_copy(self):
+        """Test the COPY of slots writes every column without a default"""
+        copied = []
+
+        def copy_expert(sql, buffer):
+            copied.append((sql, buffer.getvalue().splitlines()))
+
+        postgresql = mock.MagicMock(vendor="postgresql", ops=connection.ops)
+        cursor = postgresql.cursor.return_value.__enter__.return_value
+        cursor.copy_expert.side_effect = copy_expert
+
+        with mock.patch("core.imports.connection", postgresql):
+            result = import_rows("slots", self.ndjson([self.slot(0)]), "ndjson")
+
+        self.assertEqual(result.created, 1)
+        ((sql, lines),) = copied
+        self.assertIn('"is_available"', sql)
+        self.assertEqual(lines[0].rsplit(",", 1)[1], "True")
+
+    @skipUnless(connection.vendor == "postgresql", "COPY needs PostgreSQL")
+    def test_import_slots_copy_postgresql(self):
+        """Test slots imported with COPY are bookable"""
+        rows = [self.slot(30 * index) for index in range(3)]
+
+        result = import_rows("slots", self.ndjson(rows), "ndjson")
+
+        self.assertEqual(result.created, 3)
+        self.assertEqual(
+            AppointmentScheduling.objects.filter(is_available=True).count(), 3
+        )
+
+    def test_import_slots_queries(self):
+        """Test a batch is checked with a fixed number of queries"""
+        rows = [self.slot(30 * index) for index in range(20)]
+
+        with self.assertNumQueries(8):
+            import_rows("slots", self.ndjson(rows), "ndjson")
+
+    def test_import_command(self):
+        """Test the command imports a file and writes the rejected rows"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pediatricians.csv")
+            with open(path, "w") as source:
+                source.write("name,genre\nAna,F\n,F\n")
+            out = io.StringIO()
+
+            call_command("import_rows", "pediatricians", path, stdout=out)
+
+            with open(os.path.join(directory, "pediatricians.rejects.csv")) as rejects:
+                self.assertEqual(
+                    rejects.read().splitlines(),
+                    ["line,name,genre,error", "3,,F,name is required"],
+                )
+        self.assertIn("Imported 1 pediatricians, rejected 1", out.getvalue())
+        self.assertIn("rows/s, peak memory", out.getvalue())
@@ -0,0 +1,36 @@
+from django.test import SimpleTestCase
+from core.intervals import IntervalIndex
+
+
+class IntervalIndexTests(SimpleTestCase):
+    """Test the sorted interval index used for overlap checks"""
+
+    def test_overlaps_half_open(self):
+        """Test touching intervals do not overlap"""
+        index = IntervalIndex([(10, 20), (30, 40)])
+
+        self.assertTrue(index.overlaps(15, 16))
+        self.assertTrue(index.overlaps(5, 11))
+        self.assertTrue(index.overlaps(19, 31))
+        self.assertFalse(index.overlaps(20, 30))
+        self.assertFalse(index.overlaps(0, 10))
+        self.assertFalse(index.overlaps(40, 50))
+
+    def test_overlapping_input_is_merged(self):
+        """Test an interval hidden inside a longer one is still detected"""
+        index = IntervalIndex([(10, 12), (0, 100), (5, 8)])
+
+        self.assertEqual(list(index), [(0, 100)])
+        self.assertTrue(index.overlaps(50, 60))
+
+    def test_add_keeps_order_and_rejects_overlaps(self):
+        """Test add inserts in order and refuses overlapping intervals"""
+        index = IntervalIndex()
+
+        self.assertTrue(index.add(30, 40))
+        self.assertTrue(index.add(10, 20))
+        self.assertTrue(index.add(20, 30))
+        self.assertFalse(index.add(35, 45))
+
+        self.assertEqual(list(index), [(10, 20), (20, 30), (30, 40)])
+        self.assertEqual(len(index), 3)
@@ -0,0 +1,215 @@
+import datetime
+from io import StringIO
+from smtplib import SMTPRecipientsRefused
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from benchmarks.smtp import SMTPSink
+from core import metrics
+from core.mail import (
+    METRICS,
+    ConnectionPool,
+    DeliveryEngine,
+    deliver_pending,
+    retry_delay,
+)
+from core.models import Appointment, AppointmentScheduling, EmailOutbox, Pediatrician
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Email backend whose server rejects every message"""
+
+    def send_messages(self, email_messages):
+        raise ConnectionError("SMTP server unavailable")
+
+
+class RejectingEmailBackend(BaseEmailBackend):
+    """Email backend whose server rejects the messages to rejected@test.com"""
+
+    calls = []
+
+    def send_messages(self, email_messages):
+        self.calls.append(len(email_messages))
+        for message in email_messages:
+            message.message()
+            if message.to == ["rejected@test.com"]:
+                raise SMTPRecipientsRefused({"rejected@test.com": (550, b"No")})
+            mail.outbox.append(message)
+        return len(email_messages)
+
+
+class LeaseCheckingEmailBackend(BaseEmailBackend):
+    """Email backend recording how many emails other workers see as due"""
+
+    due = []
+
+    def send_messages(self, email_messages):
+        # Sending runs in a pool thread, on its own database connection
+        try:
+            self.due.append(EmailOutbox.objects.due().count())
+        finally:
+            connection.close()
+        return len(email_messages)
+
+
+def sample_appointment(user, **params):
+    """Create and return a sample appointment"""
+    pediatrician = Pediatrician.objects.create(name="Test P")
+    appointment_scheduling = AppointmentScheduling.objects.create(
+        pediatrician=pediatrician,
+        time_start=timezone.now(),
+        time_finish=timezone.now() + datetime.timedelta(minutes=30),
+    )
+    return Appointment.objects.create(
+        user=user, appointment_scheduling=appointment_scheduling, **params
+    )
+
+
+class EmailOutboxTests(TestCase):
+    """Test the confirmation email outbox"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "testpass")
+
+    def test_appointment_queues_email(self):
+        """Test creating an appointment queues the email without sending it"""
+        sample_appointment(self.user, comments="comments")
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.recipient, self.user.email)
+        self.assertEqual(email.status, EmailOutbox.PENDING)
+        self.assertIn("Test P", email.message)
+
+    def test_deliver_pending_sends_batch(self):
+        """Test the worker drains the outbox in batches"""
+        for _ in range(3):
+            sample_appointment(self.user)
+
+        self.assertEqual(deliver_pending(batch_size=2), (2, 0))
+        self.assertEqual(deliver_pending(batch_size=2), (1, 0))
+        self.assertEqual(deliver_pending(batch_size=2), (0, 0))
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        self.assertFalse(EmailOutbox.objects.pending().exists())
+        stats = metrics.snapshot(*METRICS)
+        self.assertEqual(stats["email.sent"], 3)
+        self.assertEqual(stats["email.queue_depth"], 0)
+        self.assertEqual(stats["email.delivery_latency_ms.count"], 3)
+
+    @override_settings(
+        EMAIL_BACKEND="core.tests.test_outbox.FailingEmailBackend",
+        EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+    )
+    def test_deliver_pending_retries_with_backoff(self):
+        """Test failed emails are retried later and eventually given up"""
+        sample_appointment(self.user)
+
+        self.assertEqual(deliver_pending(), (0, 1))
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.status, EmailOutbox.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt, timezone.now())
+        self.assertIn("SMTP server unavailable", email.last_error)
+        self.assertEqual(deliver_pending(), (0, 0))
+
+        EmailOutbox.objects.update(next_attempt=timezone.now())
+        self.assertEqual(deliver_pending(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailOutbox.FAILED)
+
+    @override_settings(EMAIL_OUTBOX_RETRY_DELAY=10, EMAIL_OUTBOX_MAX_RETRY_DELAY=60)
+    def test_retry_delay_backoff(self):
+        """Test the retry delay doubles up to the configured maximum"""
+        self.assertEqual(retry_delay(1), datetime.timedelta(seconds=10))
+        self.assertEqual(retry_delay(3), datetime.timedelta(seconds=40))
+        self.assertEqual(retry_delay(10), datetime.timedelta(seconds=60))
+
+    def test_pooled_delivery_reuses_connections(self):
+        """Test batches share the pool connections instead of reconnecting"""
+        for _ in range(6):
+            sample_appointment(self.user)
+
+        with SMTPSink() as sink, override_settings(**sink.settings()):
+            pool = ConnectionPool(size=2)
+            engine = DeliveryEngine(pool=pool, batch_size=3)
+            try:
+                self.assertEqual(engine.flush(), (3, 0))
+                self.assertEqual(engine.flush(), (3, 0))
+            finally:
+                engine.close()
+                pool.close()
+
+        self.assertEqual(sink.messages, 6)
+        self.assertEqual(sink.connections, 2)
+
+    @override_settings(EMAIL_BACKEND="core.tests.test_outbox.RejectingEmailBackend")
+    def test_chunk_sent_in_one_call(self):
+        """Test a chunk is sent with one call and a failure maps to its email"""
+        rejected = get_user_model().objects.create_user("rejected@test.com", "pass")
+        for user in (self.user, rejected, self.user):
+            sample_appointment(user)
+        RejectingEmailBackend.calls.clear()
+
+        pool = ConnectionPool(size=1)
+        self.assertEqual(deliver_pending(pool=pool), (1, 1))
+        pool.close()
+
+        self.assertEqual(RejectingEmailBackend.calls, [3])
+        self.assertEqual(len(mail.outbox), 1)
+        sent, failed, untried = EmailOutbox.objects.order_by("id")
+        self.assertEqual(sent.status, EmailOutbox.SENT)
+        self.assertEqual(failed.attempts, 1)
+        self.assertGreater(failed.next_attempt, timezone.now())
+        self.assertEqual((untried.status, untried.attempts), (EmailOutbox.PENDING, 0))
+        self.assertLessEqual(untried.next_attempt, timezone.now())
+
+    def test_unavailable_server_fails_batch(self):
+        """Test a refused connection schedules every email for a retry"""
+        for _ in range(3):
+            sample_appointment(self.user)
+        with SMTPSink() as sink:
+            email_settings = sink.settings()
+
+        with override_settings(**email_settings):
+            self.assertEqual(deliver_pending(), (0, 3))
+
+        self.assertEqual(EmailOutbox.objects.filter(attempts=1).count(), 3)
+        self.assertEqual(metrics.snapshot("email.retried")["email.retried"], 3)
+
+    def test_send_emails_command(self):
+        """Test the management command drains the outbox"""
+        sample_appointment(self.user)
+        out = StringIO()
+
+        call_command("send_emails", stdout=out)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Sent 1 emails", out.getvalue())
+        self.assertIn("email.queue_depth: 0", out.getvalue())
+
+
+class EmailOutboxLeaseTests(TransactionTestCase):
+    """Test batches are claimed before they are sent"""
+
+    @override_settings(EMAIL_BACKEND="core.tests.test_outbox.LeaseCheckingEmailBackend")
+    def test_batch_leased_before_sending(self):
+        """Test the lease is committed and hides the batch while it is sent"""
+        user = get_user_model().objects.create_user("alfonso@test.com", "testpass")
+        for _ in range(2):
+            sample_appointment(user)
+        LeaseCheckingEmailBackend.due.clear()
+
+        pool = ConnectionPool(size=1)
+        self.assertEqual(deliver_pending(pool=pool), (2, 0))
+        pool.close()
+
+        self.assertEqual(LeaseCheckingEmailBackend.due, [0])
+        self.assertFalse(EmailOutbox.objects.pending().exists())
@@ -0,0 +1,107 @@
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from core.models import AppointmentScheduling, Pediatrician
+from core.scheduling import create_slots, generate_slots, remove_overlaps
+
+MONDAY = datetime.date(2030, 1, 7)
+
+
+def local(day, hour, minute=0):
+    return timezone.make_aware(
+        datetime.datetime.combine(day, datetime.time(hour, minute))
+    )
+
+
+class SlotGenerationTests(TestCase):
+    """Test generating slots from a weekly recurrence"""
+
+    def setUp(self):
+        self.pediatrician = Pediatrician.objects.create(name="Test P")
+
+    def recurrence(self, **params):
+        defaults = {
+            "date_from": MONDAY,
+            "date_to": MONDAY + datetime.timedelta(days=6),
+            "weekdays": [0, 2],
+            "day_start": datetime.time(9),
+            "day_finish": datetime.time(10),
+            "slot_minutes": 15,
+        }
+        defaults.update(params)
+        return list(generate_slots(**defaults))
+
+    def test_generate_slots_recurrence(self):
+        """Test slots fill the working hours of the chosen weekdays"""
+        slots = self.recurrence()
+
+        self.assertEqual(len(slots), 8)
+        self.assertEqual(slots[0], (local(MONDAY, 9), local(MONDAY, 9, 15)))
+        wednesday = MONDAY + datetime.timedelta(days=2)
+        self.assertEqual(slots[-1], (local(wednesday, 9, 45), local(wednesday, 10)))
+
+    def test_generate_slots_exclusions_and_partial_slots(self):
+        """Test excluded dates are skipped and slots never pass day_finish"""
+        slots = self.recurrence(exclusions=[MONDAY], slot_minutes=25)
+
+        self.assertEqual(len(slots), 2)
+        self.assertTrue(all(start.date() != MONDAY for start, _ in slots))
+
+    def test_remove_overlaps(self):
+        """Test overlapping intervals are rejected, touching ones are not"""
+        existing = [
+            (local(MONDAY, 9), local(MONDAY, 12)),
+            (local(MONDAY, 9), local(MONDAY, 9, 30)),
+        ]
+        intervals = [
+            (local(MONDAY, 8), local(MONDAY, 9)),
+            (local(MONDAY, 11), local(MONDAY, 11, 30)),
+            (local(MONDAY, 12), local(MONDAY, 13)),
+            (local(MONDAY, 12, 30), local(MONDAY, 13, 30)),
+        ]
+
+        accepted, rejected = remove_overlaps(intervals, existing)
+
+        self.assertEqual(accepted, [intervals[0], intervals[2]])
+        self.assertEqual(rejected, [intervals[1], intervals[3]])
+
+    def test_create_slots_skips_existing(self):
+        """Test bulk creation keeps the slots already in the calendar"""
+        AppointmentScheduling.objects.create(
+            pediatrician=self.pediatrician,
+            time_start=local(MONDAY, 9, 10),
+            time_finish=local(MONDAY, 9, 40),
+        )
+
+        result = create_slots(self.pediatrician, self.recurrence(), chunk_size=3)
+
+        self.assertEqual((result.created, result.skipped), (5, 3))
+        self.assertEqual(
+            AppointmentScheduling.objects.filter(
+                pediatrician=self.pediatrician
+            ).count(),
+            6,
+        )
+
+    def test_generate_slots_command(self):
+        """Test the management command generates slots for every pediatrician"""
+        Pediatrician.objects.create(name="Other P")
+        out = StringIO()
+
+        call_command(
+            "generate_slots",
+            "--from=2030-01-07",
+            "--to=2030-01-13",
+            "--weekdays=0,2",
+            "--start=09:00",
+            "--finish=10:00",
+            "--minutes=30",
+            "--exclude",
+            "2030-01-09",
+            stdout=out,
+        )
+
+        self.assertEqual(AppointmentScheduling.objects.count(), 4)
+        self.assertIn("Created 4 slots, skipped 0", out.getvalue())
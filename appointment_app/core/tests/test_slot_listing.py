@@ -0,0 +1,82 @@
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from core.models import AppointmentScheduling, Pediatrician, SlotListing
+from core.scheduling import create_slots
+
+
+class SlotListingTests(TestCase):
+    """Test the bookable slot projection follows its source tables"""
+
+    def setUp(self):
+        self.pediatrician = Pediatrician.objects.create(name="Test P", genre="F")
+        self.time_start = timezone.now() + datetime.timedelta(days=1)
+        self.slot = AppointmentScheduling.objects.create(
+            pediatrician=self.pediatrician,
+            time_start=self.time_start,
+            time_finish=self.time_start + datetime.timedelta(minutes=30),
+        )
+
+    def listed(self):
+        return list(SlotListing.objects.values_list("slot_id", flat=True))
+
+    def test_new_slot_listed(self):
+        """Test a created slot is copied with its pediatrician"""
+        listing = SlotListing.objects.get()
+
+        self.assertEqual(listing.slot_id, self.slot.id)
+        self.assertEqual(listing.pediatrician_name, "Test P")
+        self.assertEqual(listing.pediatrician_genre, "F")
+        self.assertEqual(listing.time_start, self.slot.time_start)
+
+    def test_unavailable_slot_removed(self):
+        """Test saving a slot as unavailable drops it and back adds it"""
+        self.slot.is_available = False
+        self.slot.save()
+        self.assertEqual(self.listed(), [])
+
+        self.slot.is_available = True
+        self.slot.save()
+        self.assertEqual(self.listed(), [self.slot.id])
+
+    def test_claim_removes_slot(self):
+        """Test booking through claim drops the slot"""
+        AppointmentScheduling.objects.claim(self.slot.pk)
+
+        self.assertEqual(self.listed(), [])
+
+    def test_deleted_slot_removed(self):
+        """Test deleting a slot deletes its listing"""
+        self.slot.delete()
+
+        self.assertEqual(self.listed(), [])
+
+    def test_pediatrician_change_copied(self):
+        """Test renaming a pediatrician updates the listed slots"""
+        self.pediatrician.name = "Renamed"
+        self.pediatrician.save()
+
+        self.assertEqual(SlotListing.objects.get().pediatrician_name, "Renamed")
+
+    def test_bulk_created_slots_listed(self):
+        """Test slots inserted in bulk are listed"""
+        time_start = self.time_start + datetime.timedelta(hours=1)
+        create_slots(
+            self.pediatrician,
+            [(time_start, time_start + datetime.timedelta(minutes=30))],
+        )
+
+        self.assertEqual(SlotListing.objects.count(), 2)
+
+    def test_rebuild_command(self):
+        """Test the listing is rebuilt after writes that skipped the signals"""
+        AppointmentScheduling.objects.update(is_available=False)
+        self.assertEqual(self.listed(), [self.slot.id])
+
+        out = StringIO()
+        call_command("rebuild_slot_listing", stdout=out)
+
+        self.assertEqual(self.listed(), [])
+        self.assertIn("0 bookable slots", out.getvalue())
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ServiceConfig(AppConfig):
     name = 'service'
+
+    def ready(self):
+        # Connect the cache invalidation receivers
+        from . import authentication, cache, conditional  # noqa: F401
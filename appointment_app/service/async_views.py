@@ -0,0 +1,141 @@
+"""Async versions of the read-heavy listings, served under ASGI
+
+A request waiting on the database holds a coroutine instead of a worker
+thread, so one process can keep many slow or idle clients connected. The
+blocking part of each request (token lookup, cache, queries, serializing)
+runs as one job on a thread pool of ASYNC_DB_THREADS threads, which also
+bounds the database connections these views open. Django's async ORM
+methods are not used: up to 5.x they run every query through
+`sync_to_async` on a single shared thread, which serializes all requests.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from appointment_app.routers import primary_pinned, read_from_replica, replica_reads
+from core.connections import check_connections, mark_idle
+from core.models import Appointment, SlotListing
+from .authentication import CachedTokenAuthentication
+from .pagination import AppointmentPagination, AppointmentSchedulingPagination
+from .fast_serializers import AppointmentValuesSerializer, SlotListingValuesSerializer
+from .instrumentation import profiled_connections
+from .serializers import AppointmentSchedulingSearchSerializer
+from . import cache
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix="async-db"
+)
+
+
+def in_pool(function, *args):
+    # Pool threads live outside the request cycle, so they expire their
+    # connections themselves, honouring CONN_MAX_AGE and the health checks
+    close_old_connections()
+    check_connections()
+    try:
+        with profiled_connections():
+            return function(*args)
+    finally:
+        close_old_connections()
+        mark_idle()
+
+
+async def run_sync(function, *args):
+    """Run blocking code on the bounded pool"""
+    loop = asyncio.get_running_loop()
+    # Carry the request's context variables, such as its replica pin and
+    # its timing profile
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor, functools.partial(context.run, in_pool, function, *args)
+    )
+
+
+def authenticate(request):
+    result = CachedTokenAuthentication().authenticate(request)
+    if result is None:
+        raise NotAuthenticated()
+    # Like DRF, which also sets it on the Django request for the replica pin
+    request.user = result[0]
+    return result[0]
+
+
+def render(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+def api_view(load):
+    """Serve `load(request)` from the pool, rendering errors like DRF does"""
+
+    @functools.wraps(load)
+    async def view(request):
+        if request.method != "GET":
+            return render({"detail": f'Method "{request.method}" not allowed.'}, 405)
+        try:
+            return render(await run_sync(load, Request(request)))
+        except APIException as error:
+            data = error.detail
+            if not isinstance(data, (list, dict)):
+                data = {"detail": data}
+            response = render(data, error.status_code)
+            if error.status_code == 401:
+                response["WWW-Authenticate"] = CachedTokenAuthentication.keyword
+            return response
+
+    return view
+
+
+def paginate(queryset, paginator, serializer_class, request):
+    rows = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_data(serializer_class(rows, many=True).data)
+
+
+@api_view
+def appointment_scheduling_list(request):
+    """List available slots through the availability cache"""
+    authenticate(request)
+    key = cache.page_key(request.build_absolute_uri())
+    data = None if primary_pinned() else cache.get_page(key)
+    if data is not None:
+        return data
+
+    search = AppointmentSchedulingSearchSerializer(data=request.query_params)
+    search.is_valid(raise_exception=True)
+    queryset = search.filter_queryset(
+        SlotListing.objects.all(), genre_field="pediatrician_genre"
+    )
+    with replica_reads():
+        data = paginate(
+            SlotListingValuesSerializer.values(queryset),
+            AppointmentSchedulingPagination(),
+            SlotListingValuesSerializer,
+            request,
+        )
+    data = dict(data, results=list(data["results"]))
+    if not read_from_replica():
+        cache.set_page(key, data)
+    return data
+
+
+@api_view
+def appointment_list(request):
+    """List the authenticated user's appointments"""
+    queryset = Appointment.objects.select_related(
+        "appointment_scheduling__pediatrician"
+    ).filter(user=authenticate(request))
+    with replica_reads():
+        return paginate(
+            AppointmentValuesSerializer.values(queryset),
+            AppointmentPagination(),
+            AppointmentValuesSerializer,
+            request,
+        )
@@ -0,0 +1,117 @@
+"""Token authentication that skips the authtoken query on repeat requests
+
+Resolved tokens are kept in a bounded process-local LRU and, when
+AUTH_TOKEN_CACHE_ALIAS names a cache, in that shared backend as well.
+Entries are dropped when the token is deleted or its user is saved
+(password change, `is_active` toggled...). Other processes only see the
+drop once their local entry expires, so AUTH_TOKEN_CACHE_TIMEOUT bounds
+how long a revoked token can keep working there.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LRUCache:
+    """Thread-safe mapping bounded by size and entry age"""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LRUCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TIMEOUT
+)
+
+
+def get_shared_cache():
+    alias = settings.AUTH_TOKEN_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def shared_key(key):
+    return f"auth_token:{key}"
+
+
+def invalidate_tokens(*keys):
+    shared = get_shared_cache()
+    for key in keys:
+        local_cache.delete(key)
+    if shared is not None:
+        shared.delete_many([shared_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication resolving known tokens without a query"""
+
+    def authenticate_credentials(self, key):
+        # Entries are pickled so each request gets its own user instance
+        shared = get_shared_cache()
+        credentials = local_cache.get(key)
+        if credentials is None and shared is not None:
+            credentials = shared.get(shared_key(key))
+            if credentials is not None:
+                local_cache.set(key, credentials)
+        if credentials is not None:
+            return pickle.loads(credentials)
+
+        user, token = super().authenticate_credentials(key)
+        credentials = pickle.dumps((user, token))
+        local_cache.set(key, credentials)
+        if shared is not None:
+            shared.set(
+                shared_key(key), credentials, timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT
+            )
+        return user, token
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate_tokens(
+            *Token.objects.filter(user=instance).values_list("key", flat=True)
+        )
@@ -0,0 +1,84 @@
+"""Read-through cache of the available slot listing
+
+Pages are stored under the full request URL and a global version number.
+Every change to slot availability bumps the version, which orphans all the
+cached pages at once; they then expire with AVAILABILITY_CACHE_TIMEOUT.
+"""
+
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core import metrics
+from core.models import Appointment, AppointmentScheduling, Pediatrician
+from core.signals import slots_changed
+
+VERSION_KEY = "availability:version"
+
+METRICS = (
+    "availability_cache.hit",
+    "availability_cache.miss",
+    "availability_cache.invalidated",
+)
+
+
+def get_cache():
+    return caches[settings.AVAILABILITY_CACHE_ALIAS]
+
+
+def get_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a flushed cache never reuses old versions
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def page_key(url):
+    digest = hashlib.sha1(url.encode()).hexdigest()
+    return f"availability:{get_version()}:{digest}"
+
+
+def get_page(key):
+    data = get_cache().get(key)
+    metrics.incr(
+        "availability_cache.miss" if data is None else "availability_cache.hit"
+    )
+    return data
+
+
+def set_page(key, data):
+    # `key` must be taken before querying, so rows read after a concurrent
+    # invalidation are stored under the already orphaned version
+    get_cache().set(key, data, timeout=settings.AVAILABILITY_CACHE_TIMEOUT)
+
+
+def invalidate():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    metrics.incr("availability_cache.invalidated")
+
+
+def invalidate_on_commit():
+    # Invalidate now for this transaction's own reads and again on commit,
+    # in case a concurrent request cached the old rows in between
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=AppointmentScheduling)
+@receiver(post_delete, sender=AppointmentScheduling)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=Pediatrician)
+@receiver(post_delete, sender=Pediatrician)
+@receiver(slots_changed)
+def invalidate_availability(sender, **kwargs):
+    invalidate_on_commit()
@@ -0,0 +1,140 @@
+"""Per-user version stamps and conditional GETs of the user's own data
+
+Every user has a version stamp, bumped whenever their appointments or their
+profile change, and a shared stamp covers the slots and pediatricians their
+appointments render. A response's strong ETag hashes both stamps with the
+user, URL and format, and its data is cached under that ETag. A poll whose
+If-None-Match still matches gets a 304, and a plain GET of unchanged data
+is served from the cache, both after a single cache read and without
+querying the appointment tables.
+"""
+
+import functools
+import hashlib
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from appointment_app.routers import primary_pinned, read_from_replica
+from core import metrics
+from core.models import Appointment, AppointmentScheduling, Pediatrician
+from core.signals import appointments_changed
+
+CATALOG_KEY = "user-data:catalog"
+
+METRICS = (
+    "user_cache.hit",
+    "user_cache.miss",
+    "user_cache.not_modified",
+)
+
+
+def get_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def version_key(user_id):
+    return f"user-data:version:{user_id}"
+
+
+def get_versions(user_id):
+    """Return the user's and the catalog's stamps with one cache read"""
+    cache = get_cache()
+    keys = (version_key(user_id), CATALOG_KEY)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock so a flushed cache never reuses old stamps
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_on_commit(key):
+    # Bump now for this transaction's own reads and again on commit, in case
+    # a concurrent request cached the old rows in between
+    bump(key)
+    transaction.on_commit(lambda: bump(key))
+
+
+def make_etag(request):
+    versions = get_versions(request.user.pk)
+    identity = (
+        f"{request.user.pk}:{versions[0]}:{versions[1]}:"
+        f"{request.accepted_renderer.format}:{request.get_full_path()}"
+    )
+    return f'"{hashlib.sha1(identity.encode()).hexdigest()}"'
+
+
+def conditional(function):
+    """Serve the decorated GET handler with an ETag, a 304 or cached data
+
+    The ETag is taken before the handler queries, so data read after a
+    concurrent change is stored under the already outdated stamps. Data
+    read from a replica is not stored, and clients pinned to the primary
+    after a write do not read the cached data.
+    """
+
+    @functools.wraps(function)
+    def wrapper(view, request, *args, **kwargs):
+        etag = make_etag(request)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            metrics.incr("user_cache.not_modified")
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f"user-data:page:{etag}"
+            data = None if primary_pinned() else get_cache().get(key)
+            metrics.incr("user_cache.miss" if data is None else "user_cache.hit")
+            if data is not None:
+                response = Response(data)
+            else:
+                response = function(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                if not read_from_replica():
+                    get_cache().set(key, response.data, settings.USER_CACHE_TIMEOUT)
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+    return wrapper
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    bump_on_commit(version_key(instance.user_id))
+
+
+@receiver(appointments_changed)
+def appointments_bulk_changed(sender, users, **kwargs):
+    for user_id in set(users):
+        bump_on_commit(version_key(user_id))
+
+
+@receiver(post_save, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    bump_on_commit(version_key(instance.pk))
+
+
+@receiver(post_save, sender=AppointmentScheduling)
+@receiver(post_delete, sender=AppointmentScheduling)
+@receiver(post_save, sender=Pediatrician)
+@receiver(post_delete, sender=Pediatrician)
+def catalog_changed(sender, **kwargs):
+    bump_on_commit(CATALOG_KEY)
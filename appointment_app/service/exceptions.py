@@ -0,0 +1,27 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class SlotNotAvailable(APIException):
+    """Raised when another booking claimed the slot first"""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("The appointment scheduling is no longer available.")
+    default_code = "slot_not_available"
+
+
+class SlotOverlap(APIException):
+    """Raised when the database rejects a slot overlapping another one"""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("The slot overlaps another slot of the pediatrician.")
+    default_code = "slot_overlap"
+
+
+class SlotHeld(APIException):
+    """Raised when the slot is booked or held by another client"""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("The appointment scheduling is held by another booking.")
+    default_code = "slot_held"
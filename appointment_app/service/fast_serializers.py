@@ -0,0 +1,167 @@
+"""Read-only serializers rendering list pages straight from `values()` rows
+
+A DRF serializer binds and walks its fields for every row, and the nested
+SerializerMethodFields build two more serializers per row. These classes
+compile their output into a fixed plan once and fill plain dicts from
+`values()` rows. They must render exactly what the serializers they stand
+in for do, the tests compare both on the same rows.
+"""
+
+from rest_framework import serializers
+from .instrumentation import timed
+
+LOOKUP, NESTED, CONSTANT = range(3)
+
+
+class Constant:
+    """Output value that does not come from the row"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+def render(plan, row):
+    data = {}
+    for key, kind, source, convert in plan:
+        if kind == LOOKUP:
+            value = row[source]
+            data[key] = value if convert is None or value is None else convert(value)
+        elif kind == NESTED:
+            data[key] = render(source, row)
+        else:
+            data[key] = source
+    return data
+
+
+class ValuesSerializer:
+    """Render `values()` rows through the plan compiled from `fields`
+
+    `fields` maps each output key, in output order, to a `values()` lookup,
+    a nested mapping or a Constant. `converters` maps lookups to the
+    function turning their values into JSON types; `extra_lookups` are
+    fetched for pagination without being rendered.
+    """
+
+    fields = {}
+    converters = {}
+    extra_lookups = ("pk",)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.plan = cls.compile(cls.fields)
+        lookups = list(cls.extra_lookups)
+        cls.collect(cls.fields, lookups)
+        cls.lookups = tuple(dict.fromkeys(lookups))
+
+    @classmethod
+    def compile(cls, fields):
+        plan = []
+        for key, source in fields.items():
+            if isinstance(source, dict):
+                plan.append((key, NESTED, cls.compile(source), None))
+            elif isinstance(source, Constant):
+                plan.append((key, CONSTANT, source.value, None))
+            else:
+                plan.append((key, LOOKUP, source, cls.converters.get(source)))
+        return tuple(plan)
+
+    @classmethod
+    def collect(cls, fields, lookups):
+        for source in fields.values():
+            if isinstance(source, dict):
+                cls.collect(source, lookups)
+            elif not isinstance(source, Constant):
+                lookups.append(source)
+
+    @classmethod
+    def values(cls, queryset):
+        """Return `queryset` fetching exactly the columns the plan reads"""
+        return queryset.values(*cls.lookups)
+
+    def __init__(self, instance=None, many=True, **kwargs):
+        self.instance = instance
+
+    @property
+    @timed("serialize")
+    def data(self):
+        plan = self.plan
+        return [render(plan, row) for row in self.instance]
+
+    def stream(self):
+        """Render the rows one at a time, for iterators too long to hold"""
+        plan = self.plan
+        for row in self.instance:
+            yield render(plan, row)
+
+
+datetime_field = serializers.DateTimeField()
+
+
+class SlotListingValuesSerializer(ValuesSerializer):
+    """Bookable slots, as AppointmentSchedulingSerializer renders them"""
+
+    fields = {
+        "id": "slot_id",
+        "pediatrician": "pediatrician_id",
+        "time_start": "time_start",
+        "time_finish": "time_finish",
+        "is_available": Constant(True),
+        "pediatrician_data": {
+            "id": "pediatrician_id",
+            "name": "pediatrician_name",
+            "genre": "pediatrician_genre",
+        },
+    }
+    converters = {
+        "time_start": datetime_field.to_representation,
+        "time_finish": datetime_field.to_representation,
+    }
+
+
+class AppointmentSchedulingValuesSerializer(ValuesSerializer):
+    """Slots, as AppointmentSchedulingSerializer renders them"""
+
+    fields = {
+        "id": "id",
+        "pediatrician": "pediatrician_id",
+        "time_start": "time_start",
+        "time_finish": "time_finish",
+        "is_available": "is_available",
+        "pediatrician_data": {
+            "id": "pediatrician_id",
+            "name": "pediatrician__name",
+            "genre": "pediatrician__genre",
+        },
+    }
+    converters = {
+        "time_start": datetime_field.to_representation,
+        "time_finish": datetime_field.to_representation,
+    }
+
+
+class AppointmentValuesSerializer(ValuesSerializer):
+    """Appointments, as AppointmentSerializer renders them"""
+
+    fields = {
+        "id": "id",
+        "user": "user_id",
+        "appointment_scheduling": "appointment_scheduling_id",
+        "comments": "comments",
+        "appointment_scheduling_data": {
+            "id": "appointment_scheduling_id",
+            "pediatrician": "appointment_scheduling__pediatrician_id",
+            "time_start": "appointment_scheduling__time_start",
+            "time_finish": "appointment_scheduling__time_finish",
+            "is_available": "appointment_scheduling__is_available",
+            "pediatrician_data": {
+                "id": "appointment_scheduling__pediatrician_id",
+                "name": "appointment_scheduling__pediatrician__name",
+                "genre": "appointment_scheduling__pediatrician__genre",
+            },
+        },
+    }
+    converters = {
+        "appointment_scheduling__time_start": datetime_field.to_representation,
+        "appointment_scheduling__time_finish": datetime_field.to_representation,
+    }
+    extra_lookups = ("pk", "created")
@@ -0,0 +1,182 @@
+"""Opt-in per-request query and timing instrumentation
+
+RequestTimingMiddleware records the number and duration of database
+queries, the view time and the time spent in `timed` serializer code, then
+reports them in a `Server-Timing` header and a log line. Requests over
+REQUEST_TIMING_QUERY_BUDGET or REQUEST_TIMING_LATENCY_BUDGET_MS are logged
+as warnings. With REQUEST_TIMING_ENABLED off the middleware removes itself
+and `timed` code only pays for a context variable lookup.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar("current_profile", default=None)
+
+
+class Profile:
+    """Timings collected while handling one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.timings = defaultdict(float)
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper counting and timing every query"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - start) * 1000
+            self.queries += 1
+
+
+@contextmanager
+def profiled_connections():
+    """Count the queries of this thread's connections in the current profile
+
+    Execute wrappers are per thread, so the threads async views run their
+    queries on enter this too, with the request's context copied over.
+    """
+    profile = current_profile.get()
+    with ExitStack() as stack:
+        if profile is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+        yield
+
+
+def timed(name):
+    """Add the decorated function's run time to the `name` timing
+
+    Nested calls under the same name are only counted once, so a serializer
+    rendering other timed serializers is not measured twice.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profile = current_profile.get()
+            if profile is None or name in profile.active:
+                return function(*args, **kwargs)
+            profile.active.add(name)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profile.timings[name] += (time.perf_counter() - start) * 1000
+                profile.active.discard(name)
+
+        return wrapper
+
+    return decorator
+
+
+class TimedSerializerMixin:
+    """Count a serializer's rendering in the `serialize` timing"""
+
+    @timed("serialize")
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+
+def server_timing(metrics):
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in metrics.items())
+
+
+class RequestTimingMiddleware:
+    """Report queries and timings of each request
+
+    Sync and async capable, so under ASGI an async view is awaited on the
+    event loop instead of being run through Django's single sync thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marks the instance as a coroutine function for the handler,
+            # as Django's MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        profile = Profile()
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with profiled_connections():
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.report(request, response, profile, start)
+
+    async def __acall__(self, request):
+        profile = Profile()
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.report(request, response, profile, start)
+
+    def report(self, request, response, profile, start):
+        end = time.perf_counter()
+        total_ms = (end - start) * 1000
+
+        metrics = {"db": profile.db_ms}
+        view_start = getattr(request, "timing_view_start", None)
+        if view_start is not None:
+            # Includes rendering the response, DRF renders after the view
+            metrics["view"] = (end - view_start) * 1000
+        metrics.update(profile.timings)
+        metrics["total"] = total_ms
+        response["Server-Timing"] = server_timing(metrics)
+
+        over_budget = []
+        if profile.queries > settings.REQUEST_TIMING_QUERY_BUDGET:
+            over_budget.append("queries")
+        if total_ms > settings.REQUEST_TIMING_LATENCY_BUDGET_MS:
+            over_budget.append("latency")
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": getattr(request, "timing_view", None),
+            "status": response.status_code,
+            "queries": profile.queries,
+            **{f"{name}_ms": round(value, 1) for name, value in metrics.items()},
+            "over_budget": over_budget,
+        }
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            json.dumps(record),
+            extra={"timing": record},
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "cls", view_func)
+        request.timing_view = f"{view.__module__}.{view.__qualname__}"
+        action = getattr(view_func, "actions", {}).get(request.method.lower())
+        if action:
+            request.timing_view += f".{action}"
+        request.timing_view_start = time.perf_counter()
@@ -0,0 +1,98 @@
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks.api import SCENARIOS, median_result, run_scenario, seed
+from benchmarks.harness import benchmark_database, compare_baseline
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+
+
+class Command(BaseCommand):
+    help = "Load test the booking API and fail on regressions against a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pediatricians", type=int, default=20)
+        parser.add_argument("--slots", type=int, default=10000)
+        parser.add_argument("--appointments", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--clients", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=3,
+            help="Runs per scenario, the median of each statistic is reported",
+        )
+        parser.add_argument(
+            "--scenario", action="append", choices=SCENARIOS, dest="scenarios"
+        )
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Allowed p95 latency growth and throughput loss, 0.5 is 50%%",
+        )
+        parser.add_argument(
+            "--write-baseline",
+            action="store_true",
+            help="Store the measured results as the new baseline",
+        )
+
+    def handle(self, *args, **options):
+        bookings = options["requests"] * options["rounds"]
+        if options["slots"] < options["appointments"] + bookings:
+            raise CommandError("--slots must leave a free slot for every booking")
+
+        results = {}
+        with benchmark_database():
+            fixture = seed(
+                options["pediatricians"],
+                options["slots"],
+                options["users"],
+                options["appointments"],
+            )
+            for name in options["scenarios"] or SCENARIOS:
+                results[name] = median_result(
+                    [
+                        run_scenario(
+                            name, fixture, options["requests"], options["clients"]
+                        )
+                        for _ in range(options["rounds"])
+                    ]
+                )
+                self.report(name, results[name])
+
+        failed = [name for name, result in results.items() if result["errors"]]
+        if failed:
+            raise CommandError(f"Requests failed in: {', '.join(failed)}")
+
+        path = Path(options["baseline"])
+        if options["write_baseline"]:
+            rounded = {
+                name: {key: round(value, 3) for key, value in result.items()}
+                for name, result in results.items()
+            }
+            path.write_text(json.dumps(rounded, indent=2, sort_keys=True) + "\n")
+            self.stdout.write(f"Baseline written to {path}")
+            return
+        if not path.exists():
+            self.stdout.write(f"No baseline at {path}, nothing to compare")
+            return
+
+        regressions = compare_baseline(
+            results, json.loads(path.read_text()), options["tolerance"]
+        )
+        if regressions:
+            raise CommandError("Regressions:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name}: {result['requests']} requests, {result['errors']} errors, "
+            f"{result['throughput']:.0f} requests/s, "
+            f"p50 {result['p50_ms']:.1f}ms, p95 {result['p95_ms']:.1f}ms, "
+            f"p99 {result['p99_ms']:.1f}ms, "
+            f"{result['queries_per_request']:.2f} queries/request"
+        )
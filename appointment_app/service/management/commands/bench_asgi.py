@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from benchmarks.api import seed
+from benchmarks.asgi import run_asgi, run_wsgi, simulated_latency
+from benchmarks.harness import benchmark_database
+
+ENDPOINTS = (
+    (
+        "availability",
+        "service:appointmentscheduling-list",
+        "service:async-appointmentscheduling-list",
+    ),
+    ("my_appointments", "service:appointment-list", "service:async-appointment-list"),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare WSGI and ASGI throughput of the listings under concurrency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--slots", type=int, default=3000)
+        parser.add_argument("--appointments", type=int, default=1000)
+        parser.add_argument("--clients", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Threads serving the WSGI requests",
+        )
+        parser.add_argument(
+            "--db-latency-ms",
+            type=float,
+            default=0,
+            help="Delay added to every query to stand in for a remote database",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            fixture = seed(
+                20, options["slots"], options["users"], options["appointments"]
+            )
+            _, token = fixture["users"][0]
+            with simulated_latency(options["db_latency_ms"]):
+                for name, wsgi_url, asgi_url in ENDPOINTS:
+                    wsgi = run_wsgi(
+                        reverse(wsgi_url),
+                        token,
+                        options["clients"],
+                        options["requests"],
+                        options["workers"],
+                    )
+                    self.report(f"{name} wsgi", wsgi)
+                    asgi = run_asgi(
+                        reverse(asgi_url),
+                        token,
+                        options["clients"],
+                        options["requests"],
+                    )
+                    self.report(f"{name} asgi", asgi)
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name}: {result['requests']} requests, {result['errors']} errors, "
+            f"{result['throughput']:.0f} requests/s, "
+            f"p50 {result['p50_ms']:.1f}ms, p95 {result['p95_ms']:.1f}ms, "
+            f"p99 {result['p99_ms']:.1f}ms"
+        )
@@ -0,0 +1,43 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from benchmarks.harness import Timer, benchmark_database, rate
+from service.authentication import CachedTokenAuthentication, local_cache
+from service.views import ManageUserView
+
+
+class Command(BaseCommand):
+    help = "Compare queries and latency of stock and cached token authentication"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        requests = options["requests"]
+        url = reverse("service:me")
+        with benchmark_database():
+            user = get_user_model().objects.create_user(
+                "bench@example.com", "benchpass"
+            )
+            token = Token.objects.create(user=user)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+            for authentication in (TokenAuthentication, CachedTokenAuthentication):
+                local_cache.clear()
+                with mock.patch.object(
+                    ManageUserView, "authentication_classes", (authentication,)
+                ), CaptureQueriesContext(connection) as queries, Timer() as timer:
+                    for _ in range(requests):
+                        client.get(url)
+                self.stdout.write(
+                    f"{authentication.__name__}: "
+                    f"{len(queries) / requests:.2f} queries/request, "
+                    f"{rate(requests, timer.elapsed):.0f} requests/s"
+                )
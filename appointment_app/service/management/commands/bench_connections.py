@@ -0,0 +1,79 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from rest_framework.test import APIClient
+from benchmarks.api import seed
+from benchmarks.harness import Timer, benchmark_database, percentile, rate
+from core.connections import check_connections, mark_idle
+
+
+class Command(BaseCommand):
+    help = "Compare a database connection per request with persistent connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--conn-max-age", type=int, default=60)
+        parser.add_argument(
+            "--connect-delay",
+            type=float,
+            default=0,
+            help="Seconds added to every connection setup, standing in for "
+            "a remote database's handshake",
+        )
+
+    def handle(self, *args, **options):
+        def connected(sender, connection, **kwargs):
+            nonlocal connections
+            connections += 1
+            if options["connect_delay"]:
+                time.sleep(options["connect_delay"])
+
+        with benchmark_database():
+            fixture = seed(5, 200, 10, 100)
+            _, token = fixture["users"][0]
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+            url = reverse("service:appointment-list")
+
+            connection_created.connect(connected)
+            try:
+                for name, max_age in (
+                    ("connection per request", 0),
+                    (
+                        f"CONN_MAX_AGE={options['conn_max_age']}",
+                        options["conn_max_age"],
+                    ),
+                ):
+                    connections = 0
+                    result = self.run(client, url, options["requests"], max_age)
+                    self.stdout.write(
+                        f"{name}: {rate(options['requests'], result['seconds']):.0f} "
+                        f"requests/s, p50 {result['p50_ms']:.2f}ms, "
+                        f"p95 {result['p95_ms']:.2f}ms ({connections} connections)"
+                    )
+            finally:
+                connection_created.disconnect(connected)
+
+    def run(self, client, url, requests, max_age):
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        latencies = []
+        with Timer() as timer:
+            for _ in range(requests):
+                started = time.perf_counter()
+                # The test client skips the handler's connection upkeep, so
+                # do what it does at request start and end
+                close_old_connections()
+                check_connections()
+                client.get(url)
+                close_old_connections()
+                mark_idle()
+                latencies.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        return {
+            "seconds": timer.elapsed,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+        }
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from benchmarks.api import seed
+from benchmarks.harness import Timer, benchmark_database, rate
+from core.models import Appointment, AppointmentScheduling, SlotListing
+from service.fast_serializers import (
+    AppointmentValuesSerializer,
+    SlotListingValuesSerializer,
+)
+from service.serializers import AppointmentSchedulingSerializer, AppointmentSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare rows/second of the DRF and the fast list serializers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        with benchmark_database():
+            # Half the slots booked gives `rows` listed slots and appointments
+            seed(20, rows * 2, 100, rows)
+            slots = AppointmentScheduling.objects.select_related("pediatrician").filter(
+                is_available=True
+            )
+            appointments = Appointment.objects.select_related(
+                "appointment_scheduling__pediatrician"
+            )
+            cases = (
+                (
+                    "AppointmentSchedulingSerializer",
+                    lambda: AppointmentSchedulingSerializer(
+                        slots.order_by("time_start", "id"), many=True
+                    ),
+                ),
+                (
+                    "SlotListingValuesSerializer",
+                    lambda: SlotListingValuesSerializer(
+                        SlotListingValuesSerializer.values(
+                            SlotListing.objects.order_by("time_start", "pk")
+                        )
+                    ),
+                ),
+                (
+                    "AppointmentSerializer",
+                    lambda: AppointmentSerializer(
+                        appointments.order_by("id"), many=True
+                    ),
+                ),
+                (
+                    "AppointmentValuesSerializer",
+                    lambda: AppointmentValuesSerializer(
+                        AppointmentValuesSerializer.values(
+                            Appointment.objects.order_by("id")
+                        )
+                    ),
+                ),
+            )
+            rendered = {}
+            for name, serializer in cases:
+                best = None
+                for _ in range(options["repeat"]):
+                    with Timer() as timer:
+                        data = serializer().data
+                    best = min(best or timer.elapsed, timer.elapsed)
+                rendered[name] = JSONRenderer().render(data)
+                self.stdout.write(
+                    f"{name}: {rate(len(data), best):.0f} rows/s "
+                    "(query and serialization)"
+                )
+
+        for slow, fast in (
+            ("AppointmentSchedulingSerializer", "SlotListingValuesSerializer"),
+            ("AppointmentSerializer", "AppointmentValuesSerializer"),
+        ):
+            if rendered[slow] != rendered[fast]:
+                raise CommandError(f"{fast} output differs from {slow}")
+        self.stdout.write(self.style.SUCCESS("Fast serializers output is identical"))
@@ -0,0 +1,137 @@
+import base64
+import json
+from collections import OrderedDict
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination keyed on a `(field, pk)` pair
+
+    Pages are fetched with `WHERE (field, pk) > cursor ORDER BY field, pk
+    LIMIT n`, never OFFSET, so every page costs the same index range scan
+    and rows inserted while a client is paging cannot shift its position.
+    Both ordering fields must share a direction and the pair must be unique.
+    """
+
+    ordering = ("id",)
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = _("Invalid cursor")
+
+    @property
+    def page_size(self):
+        return settings.PAGINATION_PAGE_SIZE
+
+    @property
+    def max_page_size(self):
+        return settings.PAGINATION_MAX_PAGE_SIZE
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    @property
+    def key_field(self):
+        return self.ordering[0].lstrip("-")
+
+    @property
+    def descending(self):
+        return self.ordering[0].startswith("-")
+
+    def encode_cursor(self, row, reverse):
+        if isinstance(row, dict):
+            # `values()` rows of the fast serializers carry "pk" and the key
+            key, pk = row[self.key_field], row["pk"]
+        else:
+            key, pk = getattr(row, self.key_field), row.pk
+        if hasattr(key, "isoformat"):
+            # Keep microseconds, the key must round-trip exactly
+            key = key.isoformat()
+        position = {"key": key, "id": pk, "reverse": reverse}
+        data = json.dumps(position).encode()
+        cursor = base64.urlsafe_b64encode(data).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, queryset):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            field = queryset.model._meta.get_field(self.key_field)
+            key = field.to_python(position["key"])
+            pk = int(position["id"])
+            reverse = bool(position["reverse"])
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if key is None:
+            raise NotFound(self.invalid_cursor_message)
+        return key, pk, reverse
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = remove_query_param(
+            request.build_absolute_uri(), self.cursor_query_param
+        )
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset)
+        reverse = bool(position and position[2])
+
+        # Walking backwards flips both the comparison and the ordering
+        descending = self.descending != reverse
+        prefix = "-" if descending else ""
+        queryset = queryset.order_by(f"{prefix}{self.key_field}", f"{prefix}pk")
+        if position:
+            key, pk, _ = position
+            lookup = "lt" if descending else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.key_field}__{lookup}e": key})
+                & (
+                    Q(**{f"{self.key_field}__{lookup}": key})
+                    | Q(**{f"pk__{lookup}": pk})
+                )
+            )
+
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = bool(position), has_more
+        else:
+            has_next, has_previous = has_more, bool(position)
+
+        self.next = self.encode_cursor(rows[-1], False) if has_next and rows else None
+        self.previous = (
+            self.encode_cursor(rows[0], True) if has_previous and rows else None
+        )
+        return rows
+
+    def get_paginated_data(self, data):
+        return OrderedDict(
+            [("next", self.next), ("previous", self.previous), ("results", data)]
+        )
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+
+class AppointmentSchedulingPagination(KeysetPagination):
+    """Slots from the earliest start time"""
+
+    ordering = ("time_start", "id")
+
+
+class AppointmentPagination(KeysetPagination):
+    """Appointments from the most recently created"""
+
+    ordering = ("-created", "-id")
@@ -1,11 +1,21 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
-from django.utils.translation import ugettext_lazy as _
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-from core.models import AppointmentScheduling, Appointment, Pediatrician
+from core.models import (
+    AppointmentScheduling,
+    Appointment,
+    Pediatrician,
+    GENRE,
+)
+from core.imports import FORMATS, IMPORTERS
 from rest_framework.exceptions import ValidationError
+from .instrumentation import TimedSerializerMixin, timed
 
 
-class UserSerializers(serializers.ModelSerializer):
+class UserSerializers(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializers for the users object"""
 
     class Meta:
@@ -17,6 +27,15 @@ class UserSerializers(serializers.ModelSerializer):
         """Create a new user with encrypted password and return it"""
         return get_user_model().objects.create_user(**validate_data)
 
+    def update(self, instance, validated_data):
+        """Update a user, setting the password correctly and return it"""
+        password = validated_data.pop("password", None)
+        user = super().update(instance, validated_data)
+        if password:
+            user.set_password(password)
+            user.save()
+        return user
+
 
 class AuthTokenSerializers(serializers.Serializer):
     """Serializer for the user authentication object"""
@@ -42,7 +61,7 @@ class AuthTokenSerializers(serializers.Serializer):
         return attrs
 
 
-class PediatricianSerializer(serializers.ModelSerializer):
+class PediatricianSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serialize Pediatrician"""
 
     class Meta:
@@ -55,16 +74,32 @@ class PediatricianSerializer(serializers.ModelSerializer):
         read_only_fields = ("id",)
 
 
-class AppointmentSchedulingSerializer(serializers.ModelSerializer):
+class AppointmentSchedulingSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     """Serialize AppointmentScheduling"""
 
     pediatrician_data = serializers.SerializerMethodField()
 
     @staticmethod
+    @timed("pediatrician_data")
     def get_pediatrician_data(obj):
         serializers = PediatricianSerializer(obj.pediatrician)
         return serializers.data
 
+    def validate(self, data):
+        """Reject slots that are too long or overlap the pediatrician calendar"""
+        values = {
+            field: data.get(field, getattr(self.instance, field, None))
+            for field in ("pediatrician", "time_start", "time_finish")
+        }
+        slot = AppointmentScheduling(pk=getattr(self.instance, "pk", None), **values)
+        try:
+            slot.clean()
+        except DjangoValidationError as error:
+            raise ValidationError(error.messages)
+        return data
+
     class Meta:
         model = AppointmentScheduling
         fields = (
@@ -78,23 +113,175 @@ class AppointmentSchedulingSerializer(serializers.ModelSerializer):
         read_only_fields = ("id",)
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSchedulingSearchSerializer(serializers.Serializer):
+    """Validate the availability search query parameters"""
+
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+    pediatrician = serializers.IntegerField(required=False, min_value=1)
+    genre = serializers.ChoiceField(choices=GENRE, required=False)
+    time_from = serializers.TimeField(required=False)
+    time_to = serializers.TimeField(required=False)
+
+    def validate(self, data):
+        for start, end in (("date_from", "date_to"), ("time_from", "time_to")):
+            if start in data and end in data and data[start] > data[end]:
+                msg = _("%(start)s must not be after %(end)s") % {
+                    "start": start,
+                    "end": end,
+                }
+                raise ValidationError(msg)
+        return data
+
+    def filter_queryset(self, queryset, genre_field="pediatrician__genre"):
+        """Apply the validated search to a queryset of slots or listings"""
+        data = self.validated_data
+        if "date_from" in data:
+            queryset = queryset.filter(time_start__gte=data["date_from"])
+        if "date_to" in data:
+            queryset = queryset.filter(time_start__lt=data["date_to"])
+        if "pediatrician" in data:
+            queryset = queryset.filter(pediatrician_id=data["pediatrician"])
+        if "genre" in data:
+            queryset = queryset.filter(**{genre_field: data["genre"]})
+        # No index covers the local time of day. These two filters are
+        # checked on the rows the time_start or pediatrician index range
+        # returns, and the listing walks that index in order until a page
+        # is full
+        if "time_from" in data:
+            queryset = queryset.filter(time_start__time__gte=data["time_from"])
+        if "time_to" in data:
+            queryset = queryset.filter(time_start__time__lt=data["time_to"])
+        return queryset
+
+
+class AvailabilityFilterMixin:
+    def filter_queryset(self, queryset, genre_field="pediatrician__genre"):
+        """Apply the pediatrician and genre filters to bitmaps or listings"""
+        data = self.validated_data
+        if "pediatrician" in data:
+            queryset = queryset.filter(pediatrician_id=data["pediatrician"])
+        if "genre" in data:
+            queryset = queryset.filter(**{genre_field: data["genre"]})
+        return queryset
+
+
+class AvailabilitySearchSerializer(AvailabilityFilterMixin, serializers.Serializer):
+    """Validate the calendar heatmap query parameters"""
+
+    date_from = serializers.DateField(default=timezone.localdate)
+    days = serializers.IntegerField(
+        min_value=1, max_value=settings.AVAILABILITY_MAX_DAYS, default=60
+    )
+    pediatrician = serializers.IntegerField(required=False, min_value=1)
+    genre = serializers.ChoiceField(choices=GENRE, required=False)
+
+
+class FirstFreeSlotSerializer(AvailabilityFilterMixin, serializers.Serializer):
+    """Validate the first free slot query parameters"""
+
+    after = serializers.DateTimeField(required=False)
+    pediatrician = serializers.IntegerField(required=False, min_value=1)
+    genre = serializers.ChoiceField(choices=GENRE, required=False)
+
+
+class ExportSerializer(serializers.Serializer):
+    """Validate the format of a streamed export"""
+
+    export_format = serializers.ChoiceField(choices=("json", "ndjson"), default="json")
+
+
+class AppointmentSchedulingExportSerializer(
+    ExportSerializer, AppointmentSchedulingSearchSerializer
+):
+    """Validate a streamed export of slots, booked ones included"""
+
+
+class ImportSerializer(serializers.Serializer):
+    """Validate an uploaded CSV or NDJSON file of pediatricians or slots"""
+
+    kind = serializers.ChoiceField(choices=sorted(IMPORTERS))
+    import_format = serializers.ChoiceField(choices=FORMATS, default="csv")
+    file = serializers.FileField()
+
+
+class AppointmentSchedulingHoldSerializer(serializers.Serializer):
+    """Validate how long a slot is held"""
+
+    seconds = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.SLOT_HOLD_MAX_SECONDS,
+        default=settings.SLOT_HOLD_SECONDS,
+    )
+
+
+class CancelDaySerializer(serializers.Serializer):
+    """Validate the pediatrician and day whose appointments are cancelled"""
+
+    pediatrician = serializers.PrimaryKeyRelatedField(
+        queryset=Pediatrician.objects.all()
+    )
+    date = serializers.DateField()
+
+
+class AppointmentSchedulingGenerateSerializer(serializers.Serializer):
+    """Validate a recurrence of slots for one pediatrician"""
+
+    pediatrician = serializers.PrimaryKeyRelatedField(
+        queryset=Pediatrician.objects.all()
+    )
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        default=[0, 1, 2, 3, 4],
+        allow_empty=False,
+    )
+    day_start = serializers.TimeField()
+    day_finish = serializers.TimeField()
+    slot_minutes = serializers.IntegerField(
+        min_value=5, max_value=settings.SLOT_MAX_MINUTES
+    )
+    exclusions = serializers.ListField(child=serializers.DateField(), default=list)
+
+    def validate(self, data):
+        if data["date_from"] > data["date_to"]:
+            raise ValidationError(_("date_from must not be after date_to"))
+        if (data["date_to"] - data["date_from"]).days > 366:
+            raise ValidationError(_("Slots can be generated for one year at most"))
+        if data["day_start"] >= data["day_finish"]:
+            raise ValidationError(_("day_start must be before day_finish"))
+        return data
+
+
+class AppointmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serialize Appointment"""
 
+    appointment_scheduling = serializers.PrimaryKeyRelatedField(
+        queryset=AppointmentScheduling.objects.select_related("pediatrician")
+    )
     appointment_scheduling_data = serializers.SerializerMethodField()
+    hold_token = serializers.CharField(write_only=True, required=False)
 
     @staticmethod
+    @timed("appointment_scheduling_data")
     def get_appointment_scheduling_data(obj):
         serializers = AppointmentSchedulingSerializer(obj.appointment_scheduling)
         return serializers.data
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # Appointments move through the reschedule action, which claims
+            # the new slot and releases the old one
+            fields["appointment_scheduling"].read_only = True
+        return fields
+
     def validate(self, data):
-        if data.get("appointment_scheduling"):
-            appointment_scheduling = data.get("appointment_scheduling")
-            search = AppointmentScheduling.objects.get(pk=appointment_scheduling.id)
-            if not search.is_available:
-                msg = "not available"
-                raise ValidationError(msg)
+        appointment_scheduling = data.get("appointment_scheduling")
+        if appointment_scheduling and not appointment_scheduling.is_available:
+            msg = "not available"
+            raise ValidationError(msg)
         return data
 
     class Meta:
@@ -105,5 +292,45 @@ class AppointmentSerializer(serializers.ModelSerializer):
             "appointment_scheduling",
             "comments",
             "appointment_scheduling_data",
+            "hold_token",
         )
         read_only_fields = ("id",)
+
+
+class AppointmentRescheduleSerializer(serializers.Serializer):
+    """Validate the slot an appointment moves to"""
+
+    appointment_scheduling = serializers.PrimaryKeyRelatedField(
+        queryset=AppointmentScheduling.objects.select_related("pediatrician")
+    )
+    hold_token = serializers.CharField(required=False)
+
+
+class BulkAppointmentItemSerializer(serializers.Serializer):
+    """One booking of a batch"""
+
+    appointment_scheduling = serializers.IntegerField(min_value=1)
+    comments = serializers.CharField(allow_blank=True, default="")
+    hold_token = serializers.CharField(required=False)
+
+
+class BulkAppointmentSerializer(serializers.Serializer):
+    """Validate a batch of bookings for the authenticated user
+
+    `all` books every slot or none of them, `best_effort` books those that
+    are still available.
+    """
+
+    appointments = BulkAppointmentItemSerializer(many=True, allow_empty=False)
+    mode = serializers.ChoiceField(choices=("all", "best_effort"), default="all")
+
+    def validate_appointments(self, appointments):
+        if len(appointments) > settings.BULK_BOOKING_MAX_SIZE:
+            raise ValidationError(
+                _("At most %(count)s appointments can be booked at once")
+                % {"count": settings.BULK_BOOKING_MAX_SIZE}
+            )
+        slots = [item["appointment_scheduling"] for item in appointments]
+        if len(set(slots)) < len(slots):
+            raise ValidationError(_("A slot can only be booked once"))
+        return appointments
@@ -1,4 +1,5 @@
 import datetime
+from unittest import mock
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
@@ -45,8 +46,8 @@ class PrivateAppointmentTests(TestCase):
 
         app_scheduling = AppointmentScheduling.objects.create(
             pediatrician=self.pediatrician,
-            time_start=timezone.now() - datetime.timedelta(hours=1),
-            time_finish=timezone.now(),
+            time_start=timezone.now() + datetime.timedelta(days=1),
+            time_finish=timezone.now() + datetime.timedelta(days=1, hours=1),
             is_available=False,
         )
         payload = {
@@ -57,6 +58,45 @@ class PrivateAppointmentTests(TestCase):
         res = self.client.post(APPOINTMENTS_URL, data=payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_appointment_claims_slot(self):
+        """Test booking marks the slot as no longer available"""
+        payload = {
+            "user": self.user.id,
+            "appointment_scheduling": self.appointment_scheduling.id,
+            "comments": "One comments",
+        }
+        res = self.client.post(APPOINTMENTS_URL, data=payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.appointment_scheduling.refresh_from_db()
+        self.assertFalse(self.appointment_scheduling.is_available)
+
+    def test_create_appointment_lost_race(self):
+        """Test booking a slot claimed by another request returns 409"""
+        payload = {
+            "user": self.user.id,
+            "appointment_scheduling": self.appointment_scheduling.id,
+            "comments": "One comments",
+        }
+        with mock.patch.object(
+            AppointmentScheduling.objects, "claim", return_value=False
+        ):
+            res = self.client.post(APPOINTMENTS_URL, data=payload)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_create_appointment_queries(self):
+        """Test booking runs lookups, one claim and one insert"""
+        payload = {
+            "user": self.user.id,
+            "appointment_scheduling": self.appointment_scheduling.id,
+            "comments": "One comments",
+        }
+        # user and slot lookups, savepoint, claim, listing delete, insert,
+        # queued email, release savepoint
+        with self.assertNumQueries(8):
+            res = self.client.post(APPOINTMENTS_URL, data=payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
     def test_retrieve_appointment_list(self):
         """Test retrieving list of appointment"""
         Appointment.objects.create(
@@ -72,10 +112,10 @@ class PrivateAppointmentTests(TestCase):
 
         res = self.client.get(APPOINTMENTS_URL)
 
-        appointment = Appointment.objects.all().order_by("-id")
+        appointment = Appointment.objects.all().order_by("-created", "-id")
         serializer = AppointmentSerializer(appointment, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_appointment_limited_to_user(self):
         """Test that only appointments for authenticated user are returned"""
@@ -95,8 +135,8 @@ class PrivateAppointmentTests(TestCase):
         res = self.client.get(APPOINTMENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["user"], appointment.user.id)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["user"], appointment.user.id)
 
     def test_partial_update_appointment(self):
         """Test updating a appointment with patch"""
@@ -107,8 +147,8 @@ class PrivateAppointmentTests(TestCase):
         )
         appointment_scheduling = AppointmentScheduling.objects.create(
             pediatrician=self.pediatrician,
-            time_start=timezone.now() - datetime.timedelta(hours=1),
-            time_finish=timezone.now(),
+            time_start=timezone.now() + datetime.timedelta(days=2),
+            time_finish=timezone.now() + datetime.timedelta(days=2, hours=1),
         )
         payload = {
             "comments": "Chaged",
@@ -128,8 +168,8 @@ class PrivateAppointmentTests(TestCase):
         )
         appointment_scheduling = AppointmentScheduling.objects.create(
             pediatrician=self.pediatrician,
-            time_start=timezone.now() - datetime.timedelta(hours=1),
-            time_finish=timezone.now(),
+            time_start=timezone.now() + datetime.timedelta(days=3),
+            time_finish=timezone.now() + datetime.timedelta(days=3, hours=1),
         )
         new_user = get_user_model().objects.create_user("other@gmail.com", "testpass")
         payload = {
@@ -10,6 +10,7 @@ from django.utils import timezone
 import json
 
 APPOINTMENTSCHEDULE_URL = reverse("service:appointmentscheduling-list")
+BULK_URL = reverse("service:appointmentscheduling-bulk")
 
 
 def sample_appointmentscheduling(pediatrician, **params):
@@ -47,14 +48,95 @@ class PrivateAppointmentSchedulingApiTests(TestCase):
     def test_retrieve_appointment_scheduling(self):
         """Test retrieving list of appointment_scheduling"""
         sample_appointmentscheduling(pediatrician=self.pediatrician)
-        sample_appointmentscheduling(pediatrician=self.pediatrician)
+        sample_appointmentscheduling(
+            pediatrician=self.pediatrician,
+            time_start=timezone.now(),
+            time_finish=timezone.now() + datetime.timedelta(hours=1),
+        )
 
         res = self.client.get(APPOINTMENTSCHEDULE_URL)
 
-        appointment_scheduling = AppointmentScheduling.objects.all().order_by("-id")
+        appointment_scheduling = AppointmentScheduling.objects.all().order_by(
+            "time_start", "id"
+        )
         serializer = AppointmentSchedulingSerializer(appointment_scheduling, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
+
+    def test_filter_appointment_scheduling_by_date_range(self):
+        """Test filtering slots by a time_start range"""
+        now = timezone.now()
+        sample_appointmentscheduling(
+            self.pediatrician,
+            time_start=now + datetime.timedelta(days=1),
+            time_finish=now + datetime.timedelta(days=1, minutes=30),
+        )
+        next_week = sample_appointmentscheduling(
+            self.pediatrician,
+            time_start=now + datetime.timedelta(days=8),
+            time_finish=now + datetime.timedelta(days=8, minutes=30),
+        )
+
+        res = self.client.get(
+            APPOINTMENTSCHEDULE_URL,
+            {
+                "date_from": (now + datetime.timedelta(days=7)).isoformat(),
+                "date_to": (now + datetime.timedelta(days=14)).isoformat(),
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([slot["id"] for slot in res.data["results"]], [next_week.id])
+
+    def test_filter_appointment_scheduling_by_pediatrician_and_genre(self):
+        """Test filtering slots by pediatrician and pediatrician genre"""
+        other = Pediatrician.objects.create(name="Ana Lopez", genre="F")
+        sample_appointmentscheduling(self.pediatrician)
+        slot = sample_appointmentscheduling(other)
+
+        by_pediatrician = self.client.get(
+            APPOINTMENTSCHEDULE_URL, {"pediatrician": other.id}
+        )
+        by_genre = self.client.get(APPOINTMENTSCHEDULE_URL, {"genre": "F"})
+
+        self.assertEqual(
+            [item["id"] for item in by_pediatrician.data["results"]], [slot.id]
+        )
+        self.assertEqual([item["id"] for item in by_genre.data["results"]], [slot.id])
+
+    def test_filter_appointment_scheduling_by_time_of_day(self):
+        """Test filtering slots by local time of day"""
+        day = timezone.localtime(timezone.now()) + datetime.timedelta(days=1)
+        morning = day.replace(hour=9, minute=0, second=0, microsecond=0)
+        evening = day.replace(hour=18, minute=0, second=0, microsecond=0)
+        slot = sample_appointmentscheduling(
+            self.pediatrician,
+            time_start=morning,
+            time_finish=morning + datetime.timedelta(minutes=30),
+        )
+        sample_appointmentscheduling(
+            self.pediatrician,
+            time_start=evening,
+            time_finish=evening + datetime.timedelta(minutes=30),
+        )
+
+        res = self.client.get(
+            APPOINTMENTSCHEDULE_URL, {"time_from": "08:00", "time_to": "12:00"}
+        )
+
+        self.assertEqual([item["id"] for item in res.data["results"]], [slot.id])
+
+    def test_filter_appointment_scheduling_invalid(self):
+        """Test invalid search parameters are rejected"""
+        res = self.client.get(
+            APPOINTMENTSCHEDULE_URL, {"genre": "X", "time_from": "later"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(
+            APPOINTMENTSCHEDULE_URL, {"time_from": "12:00", "time_to": "08:00"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_create_basic_appointment_scheduling(self):
         """Test creating appointment scheduling"""
@@ -66,6 +148,31 @@ class PrivateAppointmentSchedulingApiTests(TestCase):
         res = self.client.post(APPOINTMENTSCHEDULE_URL, data=payload)
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
 
+    def test_create_overlapping_appointment_scheduling(self):
+        """Test a slot overlapping the pediatrician calendar is rejected"""
+        slot = sample_appointmentscheduling(pediatrician=self.pediatrician)
+        payload = {
+            "pediatrician": self.pediatrician.id,
+            "time_start": slot.time_start + datetime.timedelta(minutes=30),
+            "time_finish": slot.time_finish + datetime.timedelta(minutes=30),
+        }
+        res = self.client.post(APPOINTMENTSCHEDULE_URL, data=payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        payload["time_start"] = slot.time_finish
+        res = self.client.post(APPOINTMENTSCHEDULE_URL, data=payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_create_inverted_appointment_scheduling(self):
+        """Test a slot finishing before it starts is rejected"""
+        payload = {
+            "pediatrician": self.pediatrician.id,
+            "time_start": timezone.now(),
+            "time_finish": timezone.now() - datetime.timedelta(hours=1),
+        }
+        res = self.client.post(APPOINTMENTSCHEDULE_URL, data=payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_create_bad_request_appointment_scheduling(self):
         """Test creating appointment scheduling"""
         payload = {
@@ -75,3 +182,48 @@ class PrivateAppointmentSchedulingApiTests(TestCase):
         }
         res = self.client.post(APPOINTMENTSCHEDULE_URL, data=payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_requires_staff(self):
+        """Test only staff can generate slots in bulk"""
+        res = self.client.post(BULK_URL, {}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_create_appointment_scheduling(self):
+        """Test generating a week of slots in one request"""
+        self.user.is_staff = True
+        self.user.save()
+        payload = {
+            "pediatrician": self.pediatrician.id,
+            "date_from": "2030-01-07",
+            "date_to": "2030-01-13",
+            "weekdays": [0, 1, 2, 3, 4],
+            "day_start": "09:00",
+            "day_finish": "13:00",
+            "slot_minutes": 15,
+            "exclusions": ["2030-01-08"],
+        }
+
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["created"], 4 * 16)
+        self.assertEqual(AppointmentScheduling.objects.count(), 4 * 16)
+
+        res = self.client.post(BULK_URL, payload, format="json")
+        self.assertEqual(res.data["created"], 0)
+        self.assertEqual(res.data["skipped"], 4 * 16)
+
+    def test_bulk_create_invalid_recurrence(self):
+        """Test an inverted working day is rejected"""
+        self.user.is_staff = True
+        self.user.save()
+        payload = {
+            "pediatrician": self.pediatrician.id,
+            "date_from": "2030-01-07",
+            "date_to": "2030-01-13",
+            "day_start": "13:00",
+            "day_finish": "09:00",
+            "slot_minutes": 15,
+        }
+        res = self.client.post(BULK_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,72 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.archive import archive
+from core.models import Appointment, AppointmentScheduling, Pediatrician
+from service.serializers import AppointmentSerializer
+
+HISTORY_URL = reverse("service:appointment-history")
+
+
+def detail_url(appointment_id):
+    return reverse("service:appointment-detail", args=[appointment_id])
+
+
+class ArchivedAppointmentApiTests(TestCase):
+    """Test reading archived appointments through the API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.client.force_authenticate(self.user)
+        pediatrician = Pediatrician.objects.create(name="Test P", genre="F")
+        time_start = timezone.now() - datetime.timedelta(days=40)
+        self.appointments = []
+        for index in range(3):
+            slot = AppointmentScheduling.objects.create(
+                pediatrician=pediatrician,
+                time_start=time_start + datetime.timedelta(hours=index),
+                time_finish=time_start + datetime.timedelta(hours=index, minutes=30),
+                is_available=False,
+            )
+            self.appointments.append(
+                Appointment.objects.create(
+                    user=self.user, appointment_scheduling=slot, comments=str(index)
+                )
+            )
+        self.expected = [
+            AppointmentSerializer(appointment).data for appointment in self.appointments
+        ]
+        archive(timezone.now() - datetime.timedelta(days=30))
+
+    def test_retrieve_falls_back_to_archive(self):
+        """Test an archived appointment renders as it did before archival"""
+        res = self.client.get(detail_url(self.appointments[0].id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, self.expected[0])
+
+    def test_retrieve_archive_limited_to_user(self):
+        """Test other users' archived appointments are not found"""
+        other = get_user_model().objects.create_user("other@test.com", "pass")
+        self.client.force_authenticate(other)
+
+        res = self.client.get(detail_url(self.appointments[0].id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_history_paginated(self):
+        """Test the history lists archived appointments, newest first"""
+        res = self.client.get(HISTORY_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"], self.expected[:0:-1])
+        res = self.client.get(res.data["next"])
+        self.assertEqual(res.data["results"], self.expected[:1])
+        self.assertEqual(
+            self.client.get(reverse("service:appointment-list")).data["results"], []
+        )
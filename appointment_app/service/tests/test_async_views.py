@@ -0,0 +1,109 @@
+import datetime
+import json
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.models import Appointment, AppointmentScheduling, Pediatrician
+from service.authentication import local_cache
+
+ASYNC_APPOINTMENTSCHEDULE_URL = reverse("service:async-appointmentscheduling-list")
+ASYNC_APPOINTMENTS_URL = reverse("service:async-appointment-list")
+APPOINTMENTSCHEDULE_URL = reverse("service:appointmentscheduling-list")
+APPOINTMENTS_URL = reverse("service:appointment-list")
+
+
+class AsyncListTests(TransactionTestCase):
+    """Test the async listings match their synchronous counterparts"""
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "testpass")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        pediatrician = Pediatrician.objects.create(name="Test P")
+        time_start = timezone.now() + datetime.timedelta(days=1)
+        self.slots = [
+            AppointmentScheduling.objects.create(
+                pediatrician=pediatrician,
+                time_start=time_start + datetime.timedelta(minutes=30 * index),
+                time_finish=time_start + datetime.timedelta(minutes=30 * index + 30),
+            )
+            for index in range(3)
+        ]
+        other = get_user_model().objects.create_user("other@test.com", "testpass")
+        Appointment.objects.create(user=self.user, appointment_scheduling=self.slots[0])
+        Appointment.objects.create(user=other, appointment_scheduling=self.slots[1])
+
+    async def get(self, url, data=None, token=True):
+        # The async test client turns extra keyword arguments into headers
+        # and only reads the query string from the URL
+        headers = {"authorization": f"Token {self.token.key}"} if token else {}
+        if data:
+            url = f"{url}?{urlencode(data)}"
+        return await self.async_client.get(url, **headers)
+
+    async def get_sync(self, url, data=None):
+        return await sync_to_async(self.client.get)(url, data)
+
+    async def test_availability_matches_sync_listing(self):
+        """Test the async availability listing returns the same slots"""
+        res = await self.get(ASYNC_APPOINTMENTSCHEDULE_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        expected = await self.get_sync(APPOINTMENTSCHEDULE_URL, {"page_size": 2})
+        data = json.loads(res.content)
+        self.assertEqual(data["results"], json.loads(expected.content)["results"])
+        self.assertIsNotNone(data["next"])
+
+    async def test_availability_next_page(self):
+        """Test the async listing cursor walks to the next page"""
+        first = await self.get(ASYNC_APPOINTMENTSCHEDULE_URL, {"page_size": 2})
+        res = await self.get(json.loads(first.content)["next"])
+
+        data = json.loads(res.content)
+        self.assertEqual([slot["id"] for slot in data["results"]], [self.slots[2].id])
+        self.assertIsNone(data["next"])
+
+    async def test_appointments_match_sync_listing(self):
+        """Test the async appointment listing returns only the user's own"""
+        res = await self.get(ASYNC_APPOINTMENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        expected = await self.get_sync(APPOINTMENTS_URL)
+        self.assertEqual(
+            json.loads(res.content)["results"], json.loads(expected.content)["results"]
+        )
+        self.assertEqual(len(json.loads(res.content)["results"]), 1)
+
+    async def test_login_required(self):
+        """Test the async listings reject anonymous requests"""
+        res = await self.get(ASYNC_APPOINTMENTS_URL, token=False)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res["WWW-Authenticate"], "Token")
+
+    async def test_invalid_search_rejected(self):
+        """Test invalid search parameters return 400"""
+        res = await self.get(ASYNC_APPOINTMENTSCHEDULE_URL, {"pediatrician": "x"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("pediatrician", json.loads(res.content))
+
+    @override_settings(REQUEST_TIMING_ENABLED=True)
+    async def test_request_timing_counts_pool_queries(self):
+        """Test the queries an async view runs on the pool are reported"""
+        with self.assertLogs("service.instrumentation", "INFO") as logs:
+            res = await self.get(ASYNC_APPOINTMENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record["queries"], 0)
@@ -0,0 +1,105 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from service.authentication import LRUCache, local_cache
+
+ME_URL = reverse("service:me")
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token authentication through the token cache"""
+
+    def setUp(self):
+        local_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "alfonso@test.com", "testpass", name="Alfonso"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_repeat_requests_skip_token_query(self):
+        """Test only the first request with a token queries the database"""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_invalid_token_rejected(self):
+        """Test unknown tokens are not cached as valid"""
+        self.client.credentials(HTTP_AUTHORIZATION="Token unknown")
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token revokes the cached entry"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test toggling is_active revokes the cached entry"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_refreshes_user(self):
+        """Test changing the password through me hashes it and refreshes the cache"""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {"password": "newpassword", "name": "New"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("newpassword"))
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data["name"], "New")
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="default")
+    def test_shared_cache_fills_other_processes(self):
+        """Test a token resolved by one process is found in the shared cache"""
+        self.client.get(ME_URL)
+        local_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Test the bounded process-local cache"""
+
+    def test_least_recently_used_evicted(self):
+        """Test the oldest unused entry is evicted past maxsize"""
+        cache = LRUCache(maxsize=2, timeout=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_entries_expire(self):
+        """Test entries are dropped after the timeout"""
+        cache = LRUCache(maxsize=2, timeout=10)
+        with mock.patch("service.authentication.time.monotonic", return_value=0):
+            cache.set("a", 1)
+        with mock.patch("service.authentication.time.monotonic", return_value=11):
+            self.assertIsNone(cache.get("a"))
@@ -0,0 +1,116 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import AppointmentScheduling, AvailabilityBitmap, Pediatrician
+
+AVAILABILITY_URL = reverse("service:availability")
+FIRST_FREE_URL = reverse("service:availability-first-free")
+
+
+class AvailabilityApiTests(TestCase):
+    """Test the heatmap and first free slot endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        self.pediatricians = [
+            Pediatrician.objects.create(name="Test P", genre="M"),
+            Pediatrician.objects.create(name="Test F", genre="F"),
+        ]
+        self.slots = [
+            self.create_slot(self.pediatricians[0], 1, 9),
+            self.create_slot(self.pediatricians[0], 1, 9, 30),
+            self.create_slot(self.pediatricians[1], 1, 8),
+            self.create_slot(self.pediatricians[1], 3, 12),
+        ]
+        AvailabilityBitmap.objects.refresh()
+
+    def create_slot(self, pediatrician, days, hour, minute=0):
+        day = self.today + datetime.timedelta(days=days)
+        time_start = timezone.make_aware(
+            datetime.datetime.combine(day, datetime.time(hour, minute))
+        )
+        return AppointmentScheduling.objects.create(
+            pediatrician=pediatrician,
+            time_start=time_start,
+            time_finish=time_start + datetime.timedelta(minutes=30),
+        )
+
+    def test_heatmap(self):
+        """Test the free half hours are counted per pediatrician and day"""
+        with self.assertNumQueries(1):
+            res = self.client.get(AVAILABILITY_URL, {"days": 5})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["bucket_minutes"], 30)
+        results = {result["pediatrician"]: result for result in res.data["results"]}
+        self.assertEqual(
+            results[self.pediatricians[0].id]["free_buckets"], [0, 2, 0, 0, 0]
+        )
+        self.assertEqual(
+            results[self.pediatricians[0].id]["bitmaps"][1], 1 << 18 | 1 << 19
+        )
+        self.assertEqual(
+            results[self.pediatricians[1].id]["free_buckets"], [0, 1, 0, 1, 0]
+        )
+
+    def test_heatmap_filters(self):
+        """Test the heatmap takes the genre filter and the date range"""
+        res = self.client.get(
+            AVAILABILITY_URL,
+            {"genre": "F", "date_from": self.today + datetime.timedelta(days=2)},
+        )
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["free_buckets"][1], 1)
+        self.assertEqual(len(res.data["results"][0]["free_buckets"]), 60)
+
+    def test_heatmap_skips_booked_days(self):
+        """Test pediatricians whose free slots were all booked leave the heatmap"""
+        for slot in self.slots[2:]:
+            with self.captureOnCommitCallbacks(execute=True):
+                AppointmentScheduling.objects.claim(slot.pk, slot=slot)
+
+        res = self.client.get(AVAILABILITY_URL, {"genre": "F", "days": 5})
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_heatmap_too_many_days(self):
+        """Test ranges longer than AVAILABILITY_MAX_DAYS return 400"""
+        res = self.client.get(AVAILABILITY_URL, {"days": 1000})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_first_free(self):
+        """Test the earliest free slot is found in two queries"""
+        with self.assertNumQueries(2):
+            res = self.client.get(FIRST_FREE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["id"], self.slots[2].id)
+
+    def test_first_free_filters(self):
+        """Test the first free slot of a pediatrician after a given time"""
+        res = self.client.get(
+            FIRST_FREE_URL,
+            {
+                "pediatrician": self.pediatricians[0].id,
+                "after": self.slots[0].time_start + datetime.timedelta(minutes=1),
+            },
+        )
+
+        self.assertEqual(res.data["id"], self.slots[1].id)
+
+    def test_first_free_none(self):
+        """Test 404 when no slot is free"""
+        res = self.client.get(
+            FIRST_FREE_URL, {"after": timezone.now() + datetime.timedelta(days=5)}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,130 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import metrics
+from core.models import AppointmentScheduling, Pediatrician, Appointment
+from core.scheduling import create_slots
+from service.cache import METRICS
+from django.utils import timezone
+
+APPOINTMENTS_URL = reverse("service:appointment-list")
+APPOINTMENTSCHEDULE_URL = reverse("service:appointmentscheduling-list")
+METRICS_URL = reverse("service:metrics")
+
+
+class AvailabilityCacheTests(TestCase):
+    """Test the read-through cache of the available slot listing"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        self.pediatrician = Pediatrician.objects.create(name="Test P")
+        self.slot = self.create_slot(days=1)
+
+    def create_slot(self, days):
+        time_start = timezone.now() + datetime.timedelta(days=days)
+        return AppointmentScheduling.objects.create(
+            pediatrician=self.pediatrician,
+            time_start=time_start,
+            time_finish=time_start + datetime.timedelta(minutes=30),
+        )
+
+    def listed_ids(self, params=None):
+        res = self.client.get(APPOINTMENTSCHEDULE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [slot["id"] for slot in res.data["results"]]
+
+    def test_repeated_listing_served_from_cache(self):
+        """Test an identical listing skips the database and counts a hit"""
+        first = self.client.get(APPOINTMENTSCHEDULE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(APPOINTMENTSCHEDULE_URL)
+
+        self.assertEqual(second.data, first.data)
+        stats = metrics.snapshot(*METRICS)
+        self.assertEqual(stats["availability_cache.miss"], 1)
+        self.assertEqual(stats["availability_cache.hit"], 1)
+
+    def test_filters_are_cached_separately(self):
+        """Test each set of query parameters has its own cache entry"""
+        other = Pediatrician.objects.create(name="Other P")
+
+        self.assertEqual(self.listed_ids(), [self.slot.id])
+        self.assertEqual(self.listed_ids({"pediatrician": other.id}), [])
+
+    def test_slot_creation_invalidates(self):
+        """Test a new slot shows up in a previously cached listing"""
+        self.listed_ids()
+        slot = self.create_slot(days=2)
+
+        self.assertEqual(self.listed_ids(), [self.slot.id, slot.id])
+
+    def test_bulk_creation_invalidates(self):
+        """Test slots inserted in bulk show up in a cached listing"""
+        self.listed_ids()
+        time_start = timezone.now() + datetime.timedelta(days=3)
+        create_slots(
+            self.pediatrician,
+            [(time_start, time_start + datetime.timedelta(minutes=30))],
+        )
+
+        self.assertEqual(len(self.listed_ids()), 2)
+
+    def test_booking_invalidates(self):
+        """Test a booked slot disappears from a cached listing"""
+        self.listed_ids()
+        payload = {
+            "user": self.user.id,
+            "appointment_scheduling": self.slot.id,
+            "comments": "",
+        }
+        res = self.client.post(APPOINTMENTS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.listed_ids(), [])
+
+    def test_appointment_deletion_invalidates(self):
+        """Test deleting an appointment drops the cached listing"""
+        appointment = Appointment.objects.create(
+            user=self.user, appointment_scheduling=self.slot
+        )
+        self.listed_ids()
+        appointment.delete()
+        self.listed_ids()
+
+        self.assertEqual(metrics.snapshot(*METRICS)["availability_cache.miss"], 2)
+
+    def test_pediatrician_change_invalidates(self):
+        """Test a renamed or deleted pediatrician drops the cached listing"""
+        self.listed_ids()
+        self.pediatrician.name = "Renamed P"
+        self.pediatrician.save()
+
+        res = self.client.get(APPOINTMENTSCHEDULE_URL)
+        self.assertEqual(
+            res.data["results"][0]["pediatrician_data"]["name"], "Renamed P"
+        )
+
+        self.pediatrician.delete()
+        self.assertEqual(self.listed_ids(), [])
+
+    def test_metrics_endpoint(self):
+        """Test cache counters are exposed to staff only"""
+        self.listed_ids()
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["availability_cache.miss"], 1)
+        self.assertIn("email.queue_depth", res.data)
@@ -0,0 +1,73 @@
+import datetime
+import threading
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import AppointmentScheduling, Pediatrician, Appointment
+from django.utils import timezone
+
+APPOINTMENTS_URL = reverse("service:appointment-list")
+
+WORKERS = 30
+
+
+class BookingContentionTests(TransactionTestCase):
+    """Test concurrent bookings of the same slot"""
+
+    def setUp(self):
+        self.pediatrician = Pediatrician.objects.create(name="Test P")
+        self.appointment_scheduling = AppointmentScheduling.objects.create(
+            pediatrician=self.pediatrician,
+            time_start=timezone.now(),
+            time_finish=timezone.now() + datetime.timedelta(minutes=30),
+        )
+        self.users = [
+            get_user_model().objects.create_user(f"user{index}@test.com", "testpass")
+            for index in range(WORKERS)
+        ]
+
+    def test_only_one_booking_wins(self):
+        """Test dozens of workers booking one slot produce one appointment"""
+        barrier = threading.Barrier(WORKERS)
+        status_codes = []
+
+        def book(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            payload = {
+                "user": user.id,
+                "appointment_scheduling": self.appointment_scheduling.id,
+                "comments": "Race",
+            }
+            try:
+                barrier.wait()
+                res = client.post(APPOINTMENTS_URL, data=payload)
+                status_codes.append(res.status_code)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=book, args=(user,)) for user in self.users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(len(status_codes), WORKERS)
+        self.assertEqual(status_codes.count(status.HTTP_201_CREATED), 1)
+        self.assertTrue(
+            all(
+                code
+                in (
+                    status.HTTP_201_CREATED,
+                    status.HTTP_400_BAD_REQUEST,
+                    status.HTTP_409_CONFLICT,
+                )
+                for code in status_codes
+            )
+        )
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.appointment_scheduling.refresh_from_db()
+        self.assertFalse(self.appointment_scheduling.is_available)
@@ -0,0 +1,126 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Appointment, AppointmentScheduling, EmailOutbox, Pediatrician
+
+BULK_URL = reverse("service:appointment-bulk")
+
+
+class BulkBookingTests(TestCase):
+    """Test booking several slots in one request"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.client.force_authenticate(self.user)
+        self.other = get_user_model().objects.create_user("other@test.com", "pass")
+        pediatrician = Pediatrician.objects.create(name="Test P")
+        time_start = timezone.now() + datetime.timedelta(days=1)
+        self.slots = [
+            AppointmentScheduling.objects.create(
+                pediatrician=pediatrician,
+                time_start=time_start + datetime.timedelta(minutes=30 * index),
+                time_finish=time_start + datetime.timedelta(minutes=30 * index + 30),
+            )
+            for index in range(6)
+        ]
+        EmailOutbox.objects.all().delete()
+
+    def book(self, slots, **extra):
+        payload = {
+            "appointments": [
+                {"appointment_scheduling": slot.id, "comments": f"Hijo {index}"}
+                for index, slot in enumerate(slots)
+            ],
+            **extra,
+        }
+        return self.client.post(BULK_URL, payload, format="json")
+
+    def test_bulk_booking(self):
+        """Test every slot is booked and one email confirms the batch"""
+        res = self.book(self.slots[:3])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["rejected"], [])
+        self.assertEqual(
+            [item["appointment_scheduling"] for item in res.data["appointments"]],
+            [slot.id for slot in self.slots[:3]],
+        )
+        self.assertEqual(res.data["appointments"][1]["comments"], "Hijo 1")
+        self.assertEqual(
+            AppointmentScheduling.objects.filter(is_available=False).count(), 3
+        )
+        self.assertFalse(
+            AppointmentScheduling.objects.filter(hold_token__isnull=False).exists()
+        )
+        self.assertEqual(EmailOutbox.objects.get().recipient, self.user.email)
+
+    def test_all_or_nothing(self):
+        """Test one taken slot makes the whole batch fail"""
+        AppointmentScheduling.objects.claim(self.slots[1].pk)
+
+        res = self.book(self.slots[:3])
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data["rejected"], [self.slots[1].id])
+        self.assertFalse(Appointment.objects.exists())
+        self.assertEqual(
+            AppointmentScheduling.objects.filter(is_available=False).count(), 1
+        )
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    def test_best_effort(self):
+        """Test best effort books the slots that are still free"""
+        AppointmentScheduling.objects.claim(self.slots[1].pk)
+        AppointmentScheduling.objects.hold(self.slots[2].pk, self.other, 60)
+
+        res = self.book(self.slots[:3], mode="best_effort")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["rejected"], [self.slots[1].id, self.slots[2].id])
+        self.assertEqual(
+            Appointment.objects.get().appointment_scheduling, self.slots[0]
+        )
+
+    def test_held_slots_with_token(self):
+        """Test the user's own holds are booked with their tokens"""
+        token, _ = AppointmentScheduling.objects.hold(self.slots[0].pk, self.user, 60)
+        payload = {
+            "appointments": [
+                {"appointment_scheduling": self.slots[0].id, "hold_token": token},
+                {"appointment_scheduling": self.slots[1].id},
+            ]
+        }
+
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Appointment.objects.count(), 2)
+
+    def test_duplicate_slots_rejected(self):
+        """Test a slot listed twice returns 400"""
+        res = self.book([self.slots[0], self.slots[0]])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BULK_BOOKING_MAX_SIZE=2)
+    def test_batch_size_limited(self):
+        """Test batches over BULK_BOOKING_MAX_SIZE return 400"""
+        res = self.book(self.slots[:3])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queries_do_not_grow_with_batch(self):
+        """Test booking six slots costs as many queries as booking two"""
+        with CaptureQueriesContext(connection) as two:
+            self.book(self.slots[:2])
+        with CaptureQueriesContext(connection) as six:
+            self.book(self.slots[2:])
+
+        self.assertEqual(len(two), len(six))
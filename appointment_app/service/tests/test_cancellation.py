@@ -0,0 +1,195 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import (
+    Appointment,
+    AppointmentScheduling,
+    EmailOutbox,
+    Pediatrician,
+    SlotListing,
+)
+
+CANCEL_DAY_URL = reverse("service:appointmentscheduling-cancel-day")
+
+
+def appointment_url(action, appointment_id):
+    return reverse(f"service:appointment-{action}", args=[appointment_id])
+
+
+class CancellationTests(TestCase):
+    """Test cancelling and rescheduling appointments"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.client.force_authenticate(self.user)
+        self.pediatrician = Pediatrician.objects.create(name="Test P")
+        day = timezone.localdate() + datetime.timedelta(days=1)
+        self.time_start = timezone.make_aware(
+            datetime.datetime.combine(day, datetime.time(9))
+        )
+        self.slots = [self.create_slot(30 * index) for index in range(3)]
+        self.appointment = self.book(self.slots[0])
+
+    def create_slot(self, minutes):
+        time_start = self.time_start + datetime.timedelta(minutes=minutes)
+        return AppointmentScheduling.objects.create(
+            pediatrician=self.pediatrician,
+            time_start=time_start,
+            time_finish=time_start + datetime.timedelta(minutes=30),
+        )
+
+    def book(self, slot, user=None):
+        slot.is_available = False
+        slot.save()
+        return Appointment.objects.create(
+            user=user or self.user, appointment_scheduling=slot
+        )
+
+    def assertAvailable(self, slot, available=True):
+        slot.refresh_from_db()
+        self.assertEqual(slot.is_available, available)
+        self.assertEqual(SlotListing.objects.filter(slot=slot).exists(), available)
+
+    def test_delete_releases_slot(self):
+        """Test deleting an appointment makes its slot bookable again"""
+        res = self.client.delete(
+            reverse("service:appointment-detail", args=[self.appointment.id])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertAvailable(self.slots[0])
+
+    def test_cancel_releases_slot(self):
+        """Test the cancel action deletes the appointment and frees the slot"""
+        res = self.client.post(appointment_url("cancel", self.appointment.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Appointment.objects.exists())
+        self.assertAvailable(self.slots[0])
+
+    def test_cancel_past_appointment_keeps_slot_closed(self):
+        """Test slots that already started are not released"""
+        AppointmentScheduling.objects.filter(pk=self.slots[0].pk).update(
+            time_start=timezone.now() - datetime.timedelta(hours=1),
+            time_finish=timezone.now() - datetime.timedelta(minutes=30),
+        )
+
+        self.client.post(appointment_url("cancel", self.appointment.id))
+
+        self.assertAvailable(self.slots[0], False)
+
+    def test_reschedule(self):
+        """Test rescheduling claims the new slot and releases the old one"""
+        res = self.client.post(
+            appointment_url("reschedule", self.appointment.id),
+            {"appointment_scheduling": self.slots[1].id},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["appointment_scheduling"], self.slots[1].id)
+        self.assertFalse(res.data["appointment_scheduling_data"]["is_available"])
+        self.assertAvailable(self.slots[0])
+        self.assertAvailable(self.slots[1], False)
+
+    def test_reschedule_to_taken_slot(self):
+        """Test rescheduling onto a booked slot fails and changes nothing"""
+        other = get_user_model().objects.create_user("other@test.com", "pass")
+        self.book(self.slots[1], other)
+
+        res = self.client.post(
+            appointment_url("reschedule", self.appointment.id),
+            {"appointment_scheduling": self.slots[1].id},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.appointment_scheduling, self.slots[0])
+        self.assertAvailable(self.slots[0], False)
+
+    def test_reschedule_to_held_slot(self):
+        """Test only the holder can reschedule onto a held slot"""
+        other = get_user_model().objects.create_user("other@test.com", "pass")
+        AppointmentScheduling.objects.hold(self.slots[1].pk, other, 60)
+        hold_token, _ = AppointmentScheduling.objects.hold(
+            self.slots[2].pk, self.user, 60
+        )
+        url = appointment_url("reschedule", self.appointment.id)
+
+        res = self.client.post(url, {"appointment_scheduling": self.slots[1].id})
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        res = self.client.post(
+            url,
+            {"appointment_scheduling": self.slots[2].id, "hold_token": hold_token},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_does_not_move_appointment(self):
+        """Test PATCH can not move an appointment and double book a slot"""
+        res = self.client.patch(
+            appointment_url("detail", self.appointment.id),
+            {"appointment_scheduling": self.slots[1].id, "comments": "Fiebre"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["appointment_scheduling"], self.slots[0].id)
+        self.assertEqual(res.data["comments"], "Fiebre")
+        self.assertAvailable(self.slots[1])
+
+        other = get_user_model().objects.create_user("other@test.com", "pass")
+        self.client.force_authenticate(other)
+        res = self.client.post(
+            reverse("service:appointment-list"),
+            {"user": other.id, "appointment_scheduling": self.slots[1].id},
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Appointment.objects.filter(appointment_scheduling=self.slots[1]).count(),
+            1,
+        )
+
+    def test_reschedule_other_users_appointment(self):
+        """Test users can not reschedule appointments of others"""
+        other = get_user_model().objects.create_user("other@test.com", "pass")
+        appointment = self.book(self.slots[1], other)
+
+        res = self.client.post(
+            appointment_url("reschedule", appointment.id),
+            {"appointment_scheduling": self.slots[2].id},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cancel_day_requires_staff(self):
+        """Test only staff can cancel a day"""
+        res = self.client.post(
+            CANCEL_DAY_URL,
+            {"pediatrician": self.pediatrician.id, "date": self.time_start.date()},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cancel_day(self):
+        """Test a day is cancelled with set-based writes and users notified"""
+        self.user.is_staff = True
+        self.user.save()
+        self.book(self.slots[1])
+        next_day = self.create_slot(24 * 60)
+        EmailOutbox.objects.all().delete()
+        payload = {"pediatrician": self.pediatrician.id, "date": self.time_start.date()}
+
+        with self.assertNumQueries(9):
+            res = self.client.post(CANCEL_DAY_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"appointments": 2, "slots": 3})
+        self.assertFalse(Appointment.objects.exists())
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+        for slot in self.slots:
+            self.assertAvailable(slot, False)
+        self.assertAvailable(next_day)
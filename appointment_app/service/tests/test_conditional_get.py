@@ -0,0 +1,140 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Appointment, AppointmentScheduling, Pediatrician
+
+APPOINTMENTS_URL = reverse("service:appointment-list")
+BULK_URL = reverse("service:appointment-bulk")
+ME_URL = reverse("service:me")
+
+
+class ConditionalGetTests(TestCase):
+    """Test the user's appointments and profile answer conditional GETs"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.client.force_authenticate(self.user)
+        self.other = get_user_model().objects.create_user("other@test.com", "pass")
+        pediatrician = Pediatrician.objects.create(name="Test P")
+        time_start = timezone.now() + datetime.timedelta(days=1)
+        self.slots = [
+            AppointmentScheduling.objects.create(
+                pediatrician=pediatrician,
+                time_start=time_start + datetime.timedelta(minutes=30 * index),
+                time_finish=time_start + datetime.timedelta(minutes=30 * index + 30),
+            )
+            for index in range(3)
+        ]
+        self.appointment = Appointment.objects.create(
+            user=self.user, appointment_scheduling=self.slots[0]
+        )
+
+    def get(self, url=APPOINTMENTS_URL, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def assertChanged(self, etag, url=APPOINTMENTS_URL):
+        res = self.get(url, etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        return res
+
+    def test_not_modified(self):
+        """Test a matching If-None-Match gets a 304 without any query"""
+        etag = self.get()["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.get(etag=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertIn("Authorization", res["Vary"])
+
+    def test_unchanged_data_cached(self):
+        """Test a plain GET of unchanged appointments is served from the cache"""
+        expected = self.get().data
+
+        with self.assertNumQueries(0):
+            res = self.get()
+
+        self.assertEqual(res.data, expected)
+
+    def test_pages_have_their_own_etag(self):
+        """Test the ETag covers the query string"""
+        res = self.client.get(APPOINTMENTS_URL, {"page_size": 1})
+
+        self.assertNotEqual(res["ETag"], self.get()["ETag"])
+
+    def test_booking_changes_etag(self):
+        """Test booking a slot gives the list a new ETag and the new data"""
+        etag = self.get()["ETag"]
+        self.client.post(
+            APPOINTMENTS_URL,
+            {"user": self.user.id, "appointment_scheduling": self.slots[1].id},
+        )
+
+        res = self.assertChanged(etag)
+
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_bulk_booking_changes_etag(self):
+        """Test bulk bookings, which skip the model signals, change the ETag"""
+        etag = self.get()["ETag"]
+        self.client.post(
+            BULK_URL,
+            {"appointments": [{"appointment_scheduling": self.slots[1].id}]},
+            format="json",
+        )
+
+        res = self.assertChanged(etag)
+
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_cancelling_changes_etag(self):
+        """Test cancelling an appointment changes the ETag"""
+        etag = self.get()["ETag"]
+        self.client.delete(
+            reverse("service:appointment-detail", args=[self.appointment.id])
+        )
+
+        res = self.assertChanged(etag)
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_slot_change_changes_etag(self):
+        """Test moving a booked slot changes the ETag, appointments render it"""
+        etag = self.get()["ETag"]
+        slot = self.slots[0]
+        slot.time_finish -= datetime.timedelta(minutes=10)
+        slot.save()
+
+        self.assertChanged(etag)
+
+    def test_other_users_writes_keep_etag(self):
+        """Test another user's booking does not change the user's ETag"""
+        etag = self.get()["ETag"]
+        Appointment.objects.create(
+            user=self.other, appointment_scheduling=self.slots[2]
+        )
+
+        res = self.get(etag=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_profile_not_modified(self):
+        """Test the profile answers conditional GETs and changes on update"""
+        etag = self.get(ME_URL)["ETag"]
+
+        res = self.get(ME_URL, etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(ME_URL, {"name": "Alfonso"})
+        res = self.assertChanged(etag, ME_URL)
+        self.assertEqual(res.data["name"], "Alfonso")
@@ -0,0 +1,88 @@
+import datetime
+import json
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Appointment, AppointmentScheduling, Pediatrician
+from service.serializers import AppointmentSchedulingSerializer, AppointmentSerializer
+
+SLOT_EXPORT_URL = reverse("service:appointmentscheduling-export")
+APPOINTMENT_EXPORT_URL = reverse("service:appointment-export")
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    """Test the streamed slot and appointment exports"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "alfonso@test.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        other = get_user_model().objects.create_user("other@test.com", "testpass")
+        pediatrician = Pediatrician.objects.create(name="Test P")
+        time_start = timezone.now() + datetime.timedelta(days=1)
+        for index in range(5):
+            slot = AppointmentScheduling.objects.create(
+                pediatrician=pediatrician,
+                time_start=time_start + datetime.timedelta(minutes=30 * index),
+                time_finish=time_start + datetime.timedelta(minutes=30 * index + 30),
+                is_available=index > 1,
+            )
+            if index <= 1:
+                Appointment.objects.create(
+                    user=(self.user, other)[index], appointment_scheduling=slot
+                )
+
+    def content(self, res):
+        self.assertTrue(res.streaming)
+        return b"".join(res.streaming_content).decode()
+
+    def test_export_requires_staff(self):
+        """Test only staff can export"""
+        self.user.is_staff = False
+        self.user.save()
+
+        for url in (SLOT_EXPORT_URL, APPOINTMENT_EXPORT_URL):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_slot_export_json(self):
+        """Test every slot, booked ones too, is streamed as a JSON array"""
+        res = self.client.get(SLOT_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertIn('filename="slots.json"', res["Content-Disposition"])
+        slots = AppointmentScheduling.objects.order_by("time_start", "id")
+        expected = AppointmentSchedulingSerializer(slots, many=True).data
+        self.assertEqual(json.loads(self.content(res)), expected)
+
+    def test_slot_export_filters(self):
+        """Test the slot export takes the availability search parameters"""
+        other = Pediatrician.objects.create(name="Other P")
+
+        res = self.client.get(SLOT_EXPORT_URL, {"pediatrician": other.id})
+
+        self.assertEqual(json.loads(self.content(res)), [])
+
+    def test_appointment_export_ndjson(self):
+        """Test every user's appointments are streamed one per line"""
+        res = self.client.get(APPOINTMENT_EXPORT_URL, {"export_format": "ndjson"})
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        lines = self.content(res).splitlines()
+        expected = AppointmentSerializer(
+            Appointment.objects.order_by("id"), many=True
+        ).data
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_invalid_format_rejected(self):
+        """Test unknown export formats return 400"""
+        res = self.client.get(APPOINTMENT_EXPORT_URL, {"export_format": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
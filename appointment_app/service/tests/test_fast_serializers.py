@@ -0,0 +1,85 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from core.models import Appointment, AppointmentScheduling, Pediatrician, SlotListing
+from service.fast_serializers import (
+    AppointmentValuesSerializer,
+    SlotListingValuesSerializer,
+)
+from service.serializers import AppointmentSchedulingSerializer, AppointmentSerializer
+
+
+class ValuesSerializerTests(TestCase):
+    """Test the fast serializers render the same JSON as the DRF ones"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "testpass")
+        pediatricians = [
+            Pediatrician.objects.create(name="Test P", genre="M"),
+            Pediatrician.objects.create(name="Pediatra Ñoño", genre="F"),
+        ]
+        # Microseconds and a UTC midnight exercise the datetime formatting
+        start = datetime.datetime(
+            2030, 1, 7, 0, 0, 0, 123456, tzinfo=datetime.timezone.utc
+        )
+        for index in range(4):
+            time_start = start + datetime.timedelta(minutes=45 * index)
+            slot = AppointmentScheduling.objects.create(
+                pediatrician=pediatricians[index % 2],
+                time_start=time_start,
+                time_finish=time_start + datetime.timedelta(minutes=30),
+            )
+            if index % 2:
+                Appointment.objects.create(
+                    user=self.user,
+                    appointment_scheduling=slot,
+                    comments=f"Nota {index}",
+                )
+
+    def assertSameJSON(self, fast, expected):
+        self.assertEqual(
+            JSONRenderer().render(fast.data), JSONRenderer().render(expected.data)
+        )
+
+    def test_slot_listing_matches(self):
+        """Test listed slots render like AppointmentSchedulingSerializer"""
+        slots = AppointmentScheduling.objects.filter(is_available=True).order_by("id")
+        listing = SlotListing.objects.order_by("slot_id")
+
+        self.assertSameJSON(
+            SlotListingValuesSerializer(SlotListingValuesSerializer.values(listing)),
+            AppointmentSchedulingSerializer(slots, many=True),
+        )
+
+    def test_appointments_match(self):
+        """Test appointments render like AppointmentSerializer"""
+        appointments = Appointment.objects.order_by("id")
+
+        self.assertSameJSON(
+            AppointmentValuesSerializer(
+                AppointmentValuesSerializer.values(appointments)
+            ),
+            AppointmentSerializer(appointments, many=True),
+        )
+
+    def test_utc_matches(self):
+        """Test UTC datetimes get the same Z suffix"""
+        with timezone.override("UTC"):
+            appointments = Appointment.objects.order_by("id")
+            self.assertSameJSON(
+                AppointmentValuesSerializer(
+                    AppointmentValuesSerializer.values(appointments)
+                ),
+                AppointmentSerializer(appointments, many=True),
+            )
+
+    def test_values_fetch_only_plan_columns(self):
+        """Test the fast serializers read one joined query"""
+        queryset = AppointmentValuesSerializer.values(Appointment.objects.all())
+
+        with self.assertNumQueries(1):
+            data = AppointmentValuesSerializer(queryset).data
+
+        self.assertEqual(len(data), 2)
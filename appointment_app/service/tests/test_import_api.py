@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import AppointmentScheduling, Pediatrician
+
+IMPORT_URL = reverse("service:import")
+
+
+class ImportApiTests(TestCase):
+    """Test the staff CSV/NDJSON import endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "alfonso@test.com", "testpass", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def upload(self, kind, content, import_format="csv"):
+        return self.client.post(
+            IMPORT_URL,
+            {
+                "kind": kind,
+                "import_format": import_format,
+                "file": SimpleUploadedFile(f"{kind}.{import_format}", content),
+            },
+            format="multipart",
+        )
+
+    def test_import_requires_staff(self):
+        """Test only staff can import"""
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.upload("pediatricians", b"name\nAna\n")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_pediatricians(self):
+        """Test a CSV upload creates pediatricians and reports the rejects"""
+        res = self.upload("pediatricians", "﻿name,genre\nÑico,M\nEva,X\n".encode())
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(res.data["rejects"][0]["line"], 3)
+        self.assertTrue(Pediatrician.objects.filter(name="Ñico").exists())
+
+    def test_import_slots_ndjson(self):
+        """Test an NDJSON upload creates slots"""
+        pediatrician = Pediatrician.objects.create(name="Test P")
+        content = (
+            f'{{"pediatrician": {pediatrician.id}, '
+            '"time_start": "2030-01-07T09:00:00Z", '
+            '"time_finish": "2030-01-07T09:30:00Z"}\n'
+        )
+
+        res = self.upload("slots", content.encode(), "ndjson")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(AppointmentScheduling.objects.get().pediatrician, pediatrician)
+
+    def test_invalid_encoding_rejected(self):
+        """Test files that are not UTF-8 return 400"""
+        res = self.upload("pediatricians", "name\nÑico\n".encode("latin-1"))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_concurrent_overlap_rejected(self):
+        """Test a slot written by a concurrent import returns 400, not 500"""
+        with mock.patch("service.views.import_rows", side_effect=IntegrityError):
+            res = self.upload("slots", b"pediatrician,time_start,time_finish\n")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
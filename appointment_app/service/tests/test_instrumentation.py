@@ -0,0 +1,111 @@
+import datetime
+import itertools
+import json
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Appointment, AppointmentScheduling, Pediatrician
+from service.instrumentation import Profile, current_profile, timed
+
+APPOINTMENTS_URL = reverse("service:appointment-list")
+
+
+def timings(response):
+    """Return the Server-Timing header as a name to duration mapping"""
+    metrics = {}
+    for entry in response["Server-Timing"].split(", "):
+        name, duration = entry.split(";dur=")
+        metrics[name] = float(duration)
+    return metrics
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True)
+class RequestTimingTests(TestCase):
+    """Test the per-request query and timing instrumentation"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        pediatrician = Pediatrician.objects.create(name="Test P")
+        time_start = timezone.now() + datetime.timedelta(days=1)
+        slot = AppointmentScheduling.objects.create(
+            pediatrician=pediatrician,
+            time_start=time_start,
+            time_finish=time_start + datetime.timedelta(minutes=30),
+            is_available=False,
+        )
+        self.appointment = Appointment.objects.create(
+            user=self.user, appointment_scheduling=slot
+        )
+
+    def test_server_timing_header(self):
+        """Test db, view, serializer and total timings are reported"""
+        with self.assertLogs("service.instrumentation", "INFO"):
+            res = self.client.get(APPOINTMENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(timings(res)), {"db", "view", "serialize", "total"})
+
+    def test_serializer_method_timings(self):
+        """Test timed serializer methods get their own entries"""
+        url = reverse("service:appointment-detail", args=[self.appointment.id])
+        with self.assertLogs("service.instrumentation", "INFO"):
+            res = self.client.get(url)
+
+        self.assertIn("appointment_scheduling_data", timings(res))
+        self.assertIn("pediatrician_data", timings(res))
+
+    def test_log_line(self):
+        """Test each request logs its view and query count as JSON"""
+        with self.assertLogs("service.instrumentation", "INFO") as logs:
+            self.client.get(APPOINTMENTS_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "service.views.AppointmentViewSet.list")
+        self.assertEqual(record["queries"], 1)
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["over_budget"], [])
+
+    @override_settings(REQUEST_TIMING_QUERY_BUDGET=0)
+    def test_query_budget_flagged(self):
+        """Test requests over the query budget are logged as warnings"""
+        with self.assertLogs("service.instrumentation", "WARNING") as logs:
+            self.client.get(APPOINTMENTS_URL)
+
+        self.assertEqual(
+            json.loads(logs.records[0].getMessage())["over_budget"], ["queries"]
+        )
+
+    @override_settings(REQUEST_TIMING_ENABLED=False)
+    def test_disabled(self):
+        """Test nothing is reported when the instrumentation is off"""
+        res = self.client.get(APPOINTMENTS_URL)
+
+        self.assertNotIn("Server-Timing", res)
+
+    def test_nested_timings_counted_once(self):
+        """Test a timed function calling itself is measured once"""
+
+        @timed("outer")
+        def recurse(depth):
+            return recurse(depth - 1) if depth else None
+
+        profile = Profile()
+        token = current_profile.set(profile)
+        clock = itertools.count()
+        try:
+            with mock.patch(
+                "service.instrumentation.time.perf_counter", lambda: next(clock)
+            ):
+                recurse(3)
+        finally:
+            current_profile.reset(token)
+
+        self.assertEqual(profile.timings, {"outer": 1000})
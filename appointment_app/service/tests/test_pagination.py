@@ -0,0 +1,117 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import AppointmentScheduling, Pediatrician, Appointment
+from django.utils import timezone
+
+APPOINTMENTS_URL = reverse("service:appointment-list")
+APPOINTMENTSCHEDULE_URL = reverse("service:appointmentscheduling-list")
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of the service list endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        self.pediatrician = Pediatrician.objects.create(name="Test P")
+        self.start = timezone.now()
+
+    def create_slot(self, minutes, pediatrician=None):
+        time_start = self.start + datetime.timedelta(minutes=minutes)
+        return AppointmentScheduling.objects.create(
+            pediatrician=pediatrician or self.pediatrician,
+            time_start=time_start,
+            time_finish=time_start + datetime.timedelta(minutes=15),
+        )
+
+    def walk(self, url, params=None, direction="next"):
+        """Follow the cursor links from `url`, return the ids and SQL seen"""
+        ids = []
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                res = self.client.get(url, params)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                page = [item["id"] for item in res.data["results"]]
+                ids.extend(page if direction == "next" else reversed(page))
+                url, params = res.data[direction], None
+        return ids, [query["sql"] for query in queries]
+
+    def test_walk_slot_pages_forward_and_back(self):
+        """Test paging visits every slot once in time order, in both directions"""
+        # Equal start times of two pediatricians exercise the id tie-breaker
+        other = Pediatrician.objects.create(name="Other P")
+        slots = [
+            self.create_slot(index // 2 * 15, (self.pediatrician, other)[index % 2])
+            for index in range(7)
+        ]
+        expected = [slot.id for slot in slots]
+
+        ids, sql = self.walk(APPOINTMENTSCHEDULE_URL, {"page_size": 2})
+
+        self.assertEqual(ids, expected)
+        self.assertFalse(any("OFFSET" in query.upper() for query in sql))
+
+        last_page = self.client.get(
+            APPOINTMENTSCHEDULE_URL, {"page_size": 2, "date_from": slots[6].time_start}
+        )
+        self.assertIsNone(last_page.data["next"])
+        self.assertIsNone(last_page.data["previous"])
+
+    def test_walk_previous_links(self):
+        """Test previous links walk back over the same pages"""
+        expected = [self.create_slot(minutes * 15).id for minutes in range(5)]
+        res = self.client.get(APPOINTMENTSCHEDULE_URL, {"page_size": 2})
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+
+        ids, _ = self.walk(res.data["previous"], direction="previous")
+
+        self.assertEqual(list(reversed(ids)), expected[:4])
+
+    def test_pages_stable_under_inserts(self):
+        """Test rows inserted before the cursor do not shift later pages"""
+        expected = [self.create_slot(minutes * 15).id for minutes in range(1, 5)]
+
+        first = self.client.get(APPOINTMENTSCHEDULE_URL, {"page_size": 2})
+        self.create_slot(0)
+        second = self.client.get(first.data["next"])
+
+        ids = [item["id"] for item in first.data["results"] + second.data["results"]]
+        self.assertEqual(ids, expected)
+
+    def test_appointment_pages_newest_first(self):
+        """Test appointments are paged from the most recently created"""
+        slot = self.create_slot(0)
+        created = [
+            Appointment.objects.create(user=self.user, appointment_scheduling=slot)
+            for _ in range(5)
+        ]
+
+        ids, sql = self.walk(APPOINTMENTS_URL, {"page_size": 2})
+
+        self.assertEqual(ids, [appointment.id for appointment in reversed(created)])
+        self.assertFalse(any("OFFSET" in query.upper() for query in sql))
+
+    @override_settings(PAGINATION_PAGE_SIZE=2, PAGINATION_MAX_PAGE_SIZE=3)
+    def test_page_size_ceiling(self):
+        """Test the default page size and the page size ceiling"""
+        for minutes in range(5):
+            self.create_slot(minutes * 15)
+
+        default = self.client.get(APPOINTMENTSCHEDULE_URL)
+        capped = self.client.get(APPOINTMENTSCHEDULE_URL, {"page_size": 100})
+
+        self.assertEqual(len(default.data["results"]), 2)
+        self.assertEqual(len(capped.data["results"]), 3)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns 404"""
+        res = self.client.get(APPOINTMENTSCHEDULE_URL, {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,80 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import AppointmentScheduling, Pediatrician, Appointment
+from core.signals import slots_changed
+from django.conf import settings
+from django.utils import timezone
+
+APPOINTMENTS_URL = reverse("service:appointment-list")
+APPOINTMENTSCHEDULE_URL = reverse("service:appointmentscheduling-list")
+
+ROW_COUNTS = (1, 100, 10000)
+
+
+def sample_appointmentschedulings(pediatricians, count):
+    """Create and return `count` slots spread over the given pediatricians"""
+    start = timezone.now()
+    slots = []
+    for index in range(count):
+        time_start = start + datetime.timedelta(minutes=15 * index)
+        slots.append(
+            AppointmentScheduling(
+                pediatrician=pediatricians[index % len(pediatricians)],
+                time_start=time_start,
+                time_finish=time_start + datetime.timedelta(minutes=15),
+            )
+        )
+    AppointmentScheduling.objects.bulk_create(slots)
+    slots_changed.send(
+        sender=AppointmentScheduling, queryset=AppointmentScheduling.objects.all()
+    )
+    return AppointmentScheduling.objects.all()
+
+
+class ListQueryCountTests(TestCase):
+    """Test list endpoints issue a constant number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        self.pediatricians = [
+            Pediatrician.objects.create(name=f"Test P {index}") for index in range(5)
+        ]
+
+    def assertListQueries(self, url, num, rows):
+        page_size = settings.PAGINATION_MAX_PAGE_SIZE
+        with self.assertNumQueries(num):
+            res = self.client.get(url, {"page_size": page_size})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), min(rows, page_size))
+        return res
+
+    def test_appointment_scheduling_list_queries(self):
+        """Test listing slots runs one query regardless of row count"""
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                AppointmentScheduling.objects.all().delete()
+                sample_appointmentschedulings(self.pediatricians, rows)
+                res = self.assertListQueries(APPOINTMENTSCHEDULE_URL, 1, rows)
+                self.assertIn("name", res.data["results"][0]["pediatrician_data"])
+
+    def test_appointment_list_queries(self):
+        """Test listing appointments runs one query regardless of row count"""
+        for rows in ROW_COUNTS:
+            with self.subTest(rows=rows):
+                AppointmentScheduling.objects.all().delete()
+                slots = sample_appointmentschedulings(self.pediatricians, rows)
+                Appointment.objects.bulk_create(
+                    Appointment(user=self.user, appointment_scheduling=slot)
+                    for slot in slots
+                )
+                res = self.assertListQueries(APPOINTMENTS_URL, 1, rows)
+                self.assertIn(
+                    "pediatrician_data",
+                    res.data["results"][0]["appointment_scheduling_data"],
+                )
@@ -0,0 +1,127 @@
+import datetime
+import time
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from appointment_app.routers import PIN_COOKIE
+from core.models import AppointmentScheduling, Pediatrician
+from service import cache as availability_cache
+
+APPOINTMENTS_URL = reverse("service:appointment-list")
+APPOINTMENTSCHEDULE_URL = reverse("service:appointmentscheduling-list")
+
+
+@override_settings(DATABASE_REPLICAS=["stale_replica"], REPLICA_PIN_SECONDS=5)
+class ReadYourWritesTests(TestCase):
+    """Test clients read from the primary for a while after writing
+
+    The replica is a second connection to the test database, added by the
+    test settings, which sees none of the rows written by the test, so every
+    read it serves is empty.
+    """
+
+    databases = {"default", "stale_replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.client = self.client_for(self.user)
+        pediatrician = Pediatrician.objects.create(name="Test P")
+        time_start = timezone.now() + datetime.timedelta(days=1)
+        self.slots = [
+            AppointmentScheduling.objects.create(
+                pediatrician=pediatrician,
+                time_start=time_start + datetime.timedelta(minutes=30 * index),
+                time_finish=time_start + datetime.timedelta(minutes=30 * index + 30),
+            )
+            for index in range(2)
+        ]
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def listed_ids(self, client, url):
+        res = client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row["id"] for row in res.data["results"]]
+
+    def book(self, client, user, slot):
+        return client.post(
+            APPOINTMENTS_URL, {"user": user.id, "appointment_scheduling": slot.id}
+        )
+
+    def test_reads_routed_to_replica(self):
+        """Test listings read from the replica when the client did not write"""
+        self.assertEqual(self.listed_ids(self.client, APPOINTMENTSCHEDULE_URL), [])
+
+    def test_writer_sees_own_booking(self):
+        """Test a client that just booked lists its write from the primary"""
+        res = self.book(self.client, self.user, self.slots[0])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn(PIN_COOKIE, res.cookies)
+
+        self.assertEqual(
+            self.listed_ids(self.client, APPOINTMENTS_URL), [res.data["id"]]
+        )
+        self.assertEqual(
+            self.listed_ids(self.client, APPOINTMENTSCHEDULE_URL), [self.slots[1].id]
+        )
+
+    def test_writer_skips_cached_page(self):
+        """Test a pinned client is not served a page cached before its write"""
+        res = self.book(self.client, self.user, self.slots[0])
+        url = f"http://testserver{APPOINTMENTSCHEDULE_URL}"
+        availability_cache.set_page(
+            availability_cache.page_key(url),
+            {"count": 2, "next": None, "previous": None, "results": []},
+        )
+
+        self.assertEqual(
+            self.listed_ids(self.client, APPOINTMENTSCHEDULE_URL), [self.slots[1].id]
+        )
+        self.assertEqual(
+            self.listed_ids(self.client, APPOINTMENTS_URL), [res.data["id"]]
+        )
+
+    def test_token_clients_pinned_without_cookie(self):
+        """Test the pin follows the user when the client drops the cookie"""
+        res = self.book(self.client, self.user, self.slots[0])
+        self.client.cookies.clear()
+
+        self.assertEqual(
+            self.listed_ids(self.client, APPOINTMENTS_URL), [res.data["id"]]
+        )
+
+    def test_other_users_not_pinned(self):
+        """Test one user's write does not pin the other users"""
+        self.book(self.client, self.user, self.slots[0])
+        other = get_user_model().objects.create_user("other@test.com", "pass")
+
+        self.assertEqual(
+            self.listed_ids(self.client_for(other), APPOINTMENTSCHEDULE_URL), []
+        )
+
+    def test_pin_expires(self):
+        """Test reads go back to the replica after REPLICA_PIN_SECONDS"""
+        self.book(self.client, self.user, self.slots[0])
+
+        later = time.time() + 6
+        with mock.patch("appointment_app.routers.time.time", return_value=later):
+            self.assertEqual(self.listed_ids(self.client, APPOINTMENTS_URL), [])
+
+    def test_failed_writes_not_pinned(self):
+        """Test a rejected booking does not pin the client"""
+        AppointmentScheduling.objects.claim(self.slots[1].pk)
+
+        res = self.book(self.client, self.user, self.slots[1])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn(PIN_COOKIE, res.cookies)
+        self.assertEqual(self.listed_ids(self.client, APPOINTMENTSCHEDULE_URL), [])
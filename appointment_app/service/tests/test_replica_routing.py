@@ -0,0 +1,174 @@
+import datetime
+import time
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from appointment_app.routers import ReplicaRouter, replica_reads, use_replicas
+from core import metrics
+from core.connections import check_connections, mark_idle
+from core.models import AppointmentScheduling, Pediatrician
+from service import cache as availability_cache
+from service import conditional
+
+APPOINTMENTS_URL = reverse("service:appointment-list")
+APPOINTMENTSCHEDULE_URL = reverse("service:appointmentscheduling-list")
+AVAILABILITY_URL = reverse("service:availability")
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0", "replica_1"])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test reads only go to a replica inside replica_reads"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_primary_by_default(self):
+        """Test reads outside replica_reads are left to the primary"""
+        self.assertIsNone(self.router.db_for_read(AppointmentScheduling))
+
+    def test_replica_reads(self):
+        """Test reads inside replica_reads pick one of the replicas"""
+        with replica_reads():
+            self.assertIn(
+                self.router.db_for_read(AppointmentScheduling),
+                ["replica_0", "replica_1"],
+            )
+            self.assertIsNone(self.router.db_for_write(AppointmentScheduling))
+        self.assertIsNone(self.router.db_for_read(AppointmentScheduling))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Test nothing is routed when no replica is configured"""
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(AppointmentScheduling))
+
+    def test_replicas_not_migrated(self):
+        """Test migrations only run on the primary"""
+        self.assertTrue(self.router.allow_migrate("default", "core"))
+        self.assertFalse(self.router.allow_migrate("replica_0", "core"))
+
+
+class ReplicaViewTests(TestCase):
+    """Test which requests read from the replicas"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.client.force_authenticate(self.user)
+        pediatrician = Pediatrician.objects.create(name="Test P")
+        time_start = timezone.now() + datetime.timedelta(days=1)
+        self.slot = AppointmentScheduling.objects.create(
+            pediatrician=pediatrician,
+            time_start=time_start,
+            time_finish=time_start + datetime.timedelta(minutes=30),
+        )
+        self.reads = []
+
+    def request(self, method, url, data=None):
+        def db_for_read(router, model, **hints):
+            self.reads.append(use_replicas.get())
+
+        with mock.patch.object(ReplicaRouter, "db_for_read", db_for_read):
+            return getattr(self.client, method)(url, data)
+
+    def test_listings_read_from_replicas(self):
+        """Test the listings and the heatmap run their reads in replica_reads"""
+        for url in (APPOINTMENTSCHEDULE_URL, APPOINTMENTS_URL, AVAILABILITY_URL):
+            self.reads.clear()
+            res = self.request("get", url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIn(True, self.reads)
+
+    def test_booking_reads_from_primary(self):
+        """Test booking reads nothing from a replica"""
+        res = self.request(
+            "post",
+            APPOINTMENTS_URL,
+            {"user": self.user.id, "appointment_scheduling": self.slot.id},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(self.reads)
+        self.assertNotIn(True, self.reads)
+
+    @override_settings(DATABASE_REPLICAS=["replica_0"])
+    def test_replica_reads_not_cached(self):
+        """Test listings read from a replica are not stored in the caches"""
+        route_read = ReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            # Route as usual, which marks the request, then run on the primary
+            route_read(router, model, **hints)
+
+        cache.clear()
+        with mock.patch.object(ReplicaRouter, "db_for_read", db_for_read):
+            for _ in range(2):
+                self.client.get(APPOINTMENTSCHEDULE_URL)
+                self.client.get(APPOINTMENTS_URL)
+
+        stats = metrics.snapshot(*availability_cache.METRICS, *conditional.METRICS)
+        self.assertEqual(stats["availability_cache.hit"], 0)
+        self.assertEqual(stats["availability_cache.miss"], 2)
+        self.assertEqual(stats["user_cache.hit"], 0)
+        self.assertEqual(stats["user_cache.miss"], 2)
+
+
+class ConnectionHealthCheckTests(SimpleTestCase):
+    """Test broken persistent connections are closed at request start"""
+
+    def connection(self, usable, health_checks=True, idle=60):
+        connection = mock.Mock(in_atomic_block=False)
+        connection.idle_since = time.monotonic() - idle
+        connection.settings_dict = {"CONN_HEALTH_CHECKS": health_checks}
+        connection.is_usable.return_value = usable
+        return connection
+
+    def test_unusable_connections_closed(self):
+        """Test only open connections failing the ping are closed"""
+        broken = self.connection(usable=False)
+        healthy = self.connection(usable=True)
+        unchecked = self.connection(usable=False, health_checks=False)
+        connections = mock.Mock(**{"all.return_value": [broken, healthy, unchecked]})
+
+        with mock.patch("core.connections.NATIVE_HEALTH_CHECKS", False):
+            with mock.patch("core.connections.connections", connections):
+                check_connections()
+
+        broken.close.assert_called_once_with()
+        healthy.close.assert_not_called()
+        unchecked.is_usable.assert_not_called()
+        unchecked.close.assert_not_called()
+
+    @override_settings(DB_HEALTH_CHECK_IDLE=10)
+    def test_recently_used_connections_not_pinged(self):
+        """Test connections idle for less than the threshold are trusted"""
+        recent = self.connection(usable=False, idle=1)
+        idle = self.connection(usable=False, idle=60)
+        connections = mock.Mock(**{"all.return_value": [recent, idle]})
+
+        with mock.patch("core.connections.NATIVE_HEALTH_CHECKS", False):
+            with mock.patch("core.connections.connections", connections):
+                check_connections()
+
+        recent.is_usable.assert_not_called()
+        recent.close.assert_not_called()
+        idle.close.assert_called_once_with()
+
+    def test_mark_idle(self):
+        """Test the open connections are stamped when a request finishes"""
+        opened = self.connection(usable=True, idle=60)
+        closed = self.connection(usable=True, idle=60)
+        closed.connection = None
+        connections = mock.Mock(**{"all.return_value": [opened, closed]})
+
+        with mock.patch("core.connections.connections", connections):
+            mark_idle()
+
+        self.assertLess(time.monotonic() - opened.idle_since, 1)
+        self.assertGreater(time.monotonic() - closed.idle_since, 59)
@@ -0,0 +1,124 @@
+import datetime
+import threading
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Appointment, AppointmentScheduling, Pediatrician
+
+APPOINTMENTS_URL = reverse("service:appointment-list")
+
+WORKERS = 20
+
+
+def hold_url(slot_id):
+    return reverse("service:appointmentscheduling-hold", args=[slot_id])
+
+
+def create_slot():
+    time_start = timezone.now() + datetime.timedelta(days=1)
+    return AppointmentScheduling.objects.create(
+        pediatrician=Pediatrician.objects.create(name="Test P"),
+        time_start=time_start,
+        time_finish=time_start + datetime.timedelta(minutes=30),
+    )
+
+
+class SlotHoldApiTests(TestCase):
+    """Test holding a slot and booking it through the API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("alfonso@test.com", "pass")
+        self.client.force_authenticate(self.user)
+        self.slot = create_slot()
+
+    def book(self, client, user, **extra):
+        payload = {"user": user.id, "appointment_scheduling": self.slot.id}
+        return client.post(APPOINTMENTS_URL, dict(payload, **extra))
+
+    def test_hold_then_book(self):
+        """Test the holder books the slot with the hold token"""
+        res = self.client.post(hold_url(self.slot.id), {"seconds": 30})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.book(self.client, self.user, hold_token=res.data["hold_token"])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("hold_token", res.data)
+        self.assertEqual(Appointment.objects.get().user, self.user)
+
+    def test_held_slot_rejects_others(self):
+        """Test other clients can neither hold nor book a held slot"""
+        self.client.post(hold_url(self.slot.id))
+        other = get_user_model().objects.create_user("other@test.com", "pass")
+        client = APIClient()
+        client.force_authenticate(other)
+
+        res = client.post(hold_url(self.slot.id))
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        res = self.book(client, other)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_hold_missing_slot(self):
+        """Test holding an unknown slot returns 404"""
+        res = self.client.post(hold_url(self.slot.id + 1))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_hold_non_numeric_slot(self):
+        """Test holding a slot by a non-numeric id returns 404"""
+        res = self.client.post(hold_url("abc"))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_hold_too_long_rejected(self):
+        """Test holds longer than SLOT_HOLD_MAX_SECONDS return 400"""
+        res = self.client.post(hold_url(self.slot.id), {"seconds": 100000})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SlotHoldContentionTests(TransactionTestCase):
+    """Test concurrent clients holding the same slot"""
+
+    def test_only_one_hold_wins(self):
+        """Test one of many concurrent holds wins and books the slot"""
+        slot = create_slot()
+        users = [
+            get_user_model().objects.create_user(f"user{index}@test.com", "pass")
+            for index in range(WORKERS)
+        ]
+        barrier = threading.Barrier(WORKERS)
+        results = []
+
+        def hold_and_book(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                res = client.post(hold_url(slot.id))
+                if res.status_code == status.HTTP_201_CREATED:
+                    res = client.post(
+                        APPOINTMENTS_URL,
+                        {
+                            "user": user.id,
+                            "appointment_scheduling": slot.id,
+                            "hold_token": res.data["hold_token"],
+                        },
+                    )
+                results.append(res.status_code)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=hold_and_book, args=(u,)) for u in users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(results.count(status.HTTP_201_CREATED), 1)
+        self.assertEqual(results.count(status.HTTP_409_CONFLICT), WORKERS - 1)
+        self.assertEqual(Appointment.objects.count(), 1)
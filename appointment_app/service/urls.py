@@ -1,11 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     CreateUserView,
     CreateTokenView,
+    AvailabilityView,
+    FirstFreeSlotView,
+    ImportView,
     AppointmentSchedulingViewSet,
     AppointmentViewSet,
     ManageUserView,
+    MetricsView,
 )
 
 app_name = "service"
@@ -19,4 +24,22 @@ urlpatterns = [
     path("user/create/", CreateUserView.as_view(), name="create"),
     path("user/token/", CreateTokenView.as_view(), name="token"),
     path("user/me/", ManageUserView.as_view(), name="me"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("import/", ImportView.as_view(), name="import"),
+    path("availability/", AvailabilityView.as_view(), name="availability"),
+    path(
+        "availability/first-free/",
+        FirstFreeSlotView.as_view(),
+        name="availability-first-free",
+    ),
+    path(
+        "async/appointmentscheduling/",
+        async_views.appointment_scheduling_list,
+        name="async-appointmentscheduling-list",
+    ),
+    path(
+        "async/appointment/",
+        async_views.appointment_list,
+        name="async-appointment-list",
+    ),
 ]
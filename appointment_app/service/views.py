@@ -1,18 +1,67 @@
-from rest_framework import generics
+import codecs
+import datetime
+from django.db import IntegrityError, transaction
+from django.http import Http404
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import generics, status
+from rest_framework.generics import get_object_or_404
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
 from .serializers import UserSerializers, AuthTokenSerializers
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.views import APIView
 from rest_framework import viewsets
-from core.models import AppointmentScheduling, Appointment
-from rest_framework.authentication import TokenAuthentication
-from .serializers import AppointmentSchedulingSerializer, AppointmentSerializer
+from appointment_app.routers import primary_pinned, read_from_replica, replica_reads
+from core import metrics
+from core.mail import METRICS as EMAIL_METRICS
+from core.models import (
+    BUCKET_MINUTES,
+    HOLD_METRICS,
+    AppointmentScheduling,
+    Appointment,
+    ArchivedAppointment,
+    AvailabilityBitmap,
+    SlotListing,
+    refresh_bitmaps_on_commit,
+)
+from core.imports import import_rows
+from core.scheduling import book_slots, cancel_day, create_slots, generate_slots
+from .authentication import CachedTokenAuthentication
+from .serializers import (
+    AppointmentSchedulingSerializer,
+    AppointmentSchedulingSearchSerializer,
+    AppointmentSchedulingGenerateSerializer,
+    AppointmentSchedulingExportSerializer,
+    AppointmentSchedulingHoldSerializer,
+    AppointmentRescheduleSerializer,
+    AppointmentSerializer,
+    AvailabilitySearchSerializer,
+    BulkAppointmentSerializer,
+    CancelDaySerializer,
+    FirstFreeSlotSerializer,
+    ExportSerializer,
+    ImportSerializer,
+)
+from .fast_serializers import (
+    AppointmentSchedulingValuesSerializer,
+    AppointmentValuesSerializer,
+    SlotListingValuesSerializer,
+)
+from .exports import export_response
+from .conditional import METRICS as USER_CACHE_METRICS, conditional
+from .exceptions import SlotHeld, SlotNotAvailable, SlotOverlap
+from .pagination import AppointmentPagination, AppointmentSchedulingPagination
+from . import cache
 
 
 class ModelViewSet(viewsets.ModelViewSet):
-    """ Enable the default Django model permission backend"""
+    """Enable the default Django model permission backend"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
 
@@ -20,12 +69,16 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
 
     serializer_class = UserSerializers
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
         return self.request.user
 
+    @conditional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
@@ -40,34 +93,484 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
+class MetricsView(APIView):
+    """Expose delivery and cache counters to staff monitoring"""
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsAdminUser)
+
+    def get(self, request):
+        return Response(
+            metrics.snapshot(
+                *EMAIL_METRICS, *cache.METRICS, *USER_CACHE_METRICS, *HOLD_METRICS
+            )
+        )
+
+
+class AvailabilityView(APIView):
+    """Calendar heatmap of the free half hours per pediatrician and day
+
+    Read from the availability bitmaps, one small row per pediatrician and
+    day with free slots, instead of the slots themselves.
+    """
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    @replica_reads()
+    def get(self, request):
+        search = AvailabilitySearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        date_from = search.validated_data["date_from"]
+        days = search.validated_data["days"]
+        bitmaps = search.filter_queryset(
+            AvailabilityBitmap.objects.filter(
+                day__gte=date_from, day__lt=date_from + datetime.timedelta(days=days)
+            ).exclude(bits=0)
+        ).order_by("pediatrician_id", "day")
+
+        results = {}
+        for pediatrician, name, genre, day, bits in bitmaps.values_list(
+            "pediatrician_id",
+            "pediatrician__name",
+            "pediatrician__genre",
+            "day",
+            "bits",
+        ):
+            if pediatrician not in results:
+                results[pediatrician] = {
+                    "pediatrician": pediatrician,
+                    "name": name,
+                    "genre": genre,
+                    "bitmaps": [0] * days,
+                }
+            results[pediatrician]["bitmaps"][(day - date_from).days] = bits
+        for result in results.values():
+            result["free_buckets"] = [
+                bin(bits).count("1") for bits in result["bitmaps"]
+            ]
+        return Response(
+            {
+                "date_from": date_from,
+                "days": days,
+                "bucket_minutes": BUCKET_MINUTES,
+                "results": list(results.values()),
+            }
+        )
+
+
+class FirstFreeSlotView(APIView):
+    """Earliest bookable slot, located through the availability bitmaps"""
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    @replica_reads()
+    def get(self, request):
+        search = FirstFreeSlotSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        after = timezone.localtime(search.validated_data.get("after") or timezone.now())
+        first_bucket = (after.hour * 60 + after.minute) // BUCKET_MINUTES
+        bitmaps = search.filter_queryset(
+            AvailabilityBitmap.objects.filter(day__gte=after.date())
+        ).order_by("day")
+
+        # The earliest set bit of the first day with one is the first bucket
+        # that can hold a free slot
+        found = None
+        for day, bits in bitmaps.values_list("day", "bits").iterator():
+            if found and day > found[0]:
+                break
+            if day == after.date():
+                bits &= ~((1 << first_bucket) - 1)
+            if bits:
+                bucket = (bits & -bits).bit_length() - 1
+                if found is None or bucket < found[1]:
+                    found = (day, bucket)
+        if found is None:
+            raise NotFound(_("There is no free slot"))
+
+        day, bucket = found
+        minutes = bucket * BUCKET_MINUTES
+        bucket_start = timezone.make_aware(
+            datetime.datetime.combine(day, datetime.time(minutes // 60, minutes % 60))
+        )
+        listings = search.filter_queryset(
+            SlotListing.objects.filter(time_start__gte=max(after, bucket_start)),
+            genre_field="pediatrician_genre",
+        ).order_by("time_start", "pk")
+        row = SlotListingValuesSerializer.values(listings).first()
+        if row is None:
+            raise NotFound(_("There is no free slot"))
+        return Response(SlotListingValuesSerializer([row]).data[0])
+
+
+class ImportView(APIView):
+    """Import an uploaded CSV or NDJSON file of pediatricians or slots"""
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsAdminUser)
+
+    def post(self, request):
+        serializer = ImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        rejects = []
+        try:
+            result = import_rows(
+                data["kind"],
+                codecs.iterdecode(data["file"], "utf-8-sig"),
+                data["import_format"],
+                reject=lambda line, row, error: rejects.append(
+                    {"line": line, "error": error}
+                ),
+            )
+        except UnicodeDecodeError:
+            raise ValidationError({"file": ["The file must be UTF-8 encoded"]})
+        except IntegrityError:
+            # The batches before it are kept, importing the file again
+            # rejects their rows as overlapping
+            raise ValidationError(
+                {"file": ["A slot overlaps one written during the import"]}
+            )
+        return Response(
+            {
+                "created": result.created,
+                "rejected": result.rejected,
+                "rows_per_second": round(result.rows_per_second),
+                "rejects": rejects,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class AppointmentSchedulingViewSet(ModelViewSet):
     """Manage Appointment Scheduling in the database"""
 
-    queryset = AppointmentScheduling.objects.all()
+    queryset = AppointmentScheduling.objects.select_related("pediatrician")
     serializer_class = AppointmentSchedulingSerializer
+    pagination_class = AppointmentSchedulingPagination
 
     def get_queryset(self):
         """Return Appointment Scheduling only available"""
-        return self.queryset.filter(is_available=True).order_by("-id")
+        if self.action == "list":
+            search = AppointmentSchedulingSearchSerializer(
+                data=self.request.query_params
+            )
+            search.is_valid(raise_exception=True)
+            return SlotListingValuesSerializer.values(
+                search.filter_queryset(
+                    SlotListing.objects.all(), genre_field="pediatrician_genre"
+                )
+            )
+        return self.queryset.filter(is_available=True).order_by("time_start", "id")
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return SlotListingValuesSerializer
+        return super().get_serializer_class()
+
+    @replica_reads()
+    def list(self, request, *args, **kwargs):
+        """List available slots through the availability cache
+
+        Clients pinned to the primary skip the cache, and pages read from a
+        replica are not cached.
+        """
+        key = cache.page_key(request.build_absolute_uri())
+        data = None if primary_pinned() else cache.get_page(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if not read_from_replica():
+            data = dict(response.data, results=list(response.data["results"]))
+            cache.set_page(key, data)
+        return response
+
+    def perform_create(self, serializer):
+        """Create a slot, a concurrent overlapping insert loses with 409"""
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise SlotOverlap()
+
+    def perform_update(self, serializer):
+        slot = serializer.instance
+        previous = {(slot.pediatrician_id, timezone.localdate(slot.time_start))}
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise SlotOverlap()
+        # post_save only refreshes the day a moved slot now starts on
+        refresh_bitmaps_on_commit(
+            lambda: AvailabilityBitmap.objects.refresh_days(previous)
+        )
+
+    @action(
+        detail=True,
+        methods=["post"],
+        serializer_class=AppointmentSchedulingHoldSerializer,
+    )
+    def hold(self, request, pk=None):
+        """Hold an available slot for the user while they complete the booking"""
+        # The hold is a single update on the raw pk, without get_object
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        seconds = serializer.validated_data["seconds"]
+        hold = AppointmentScheduling.objects.hold(pk, request.user, seconds)
+        if hold is None:
+            # Only the losing path pays for telling missing from taken
+            if not AppointmentScheduling.objects.filter(pk=pk).exists():
+                raise Http404
+            raise SlotHeld()
+        hold_token, held_until = hold
+        return Response(
+            {"hold_token": hold_token, "held_until": held_until},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=(IsAuthenticated, IsAdminUser),
+        serializer_class=AppointmentSchedulingGenerateSerializer,
+    )
+    def bulk(self, request):
+        """Create a pediatrician's slots from a weekly recurrence"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+        pediatrician = data.pop("pediatrician")
+        try:
+            result = create_slots(pediatrician, generate_slots(**data))
+        except IntegrityError:
+            raise SlotOverlap()
+        return Response(
+            {
+                "created": result.created,
+                "skipped": result.skipped,
+                "rows_per_second": round(result.rows_per_second),
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="cancel-day",
+        permission_classes=(IsAuthenticated, IsAdminUser),
+        serializer_class=CancelDaySerializer,
+    )
+    def cancel_day(self, request):
+        """Cancel every appointment of a pediatrician's day and close its slots"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = cancel_day(
+            serializer.validated_data["pediatrician"],
+            serializer.validated_data["date"],
+        )
+        return Response({"appointments": result.appointments, "slots": result.slots})
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated, IsAdminUser),
+        serializer_class=AppointmentSchedulingExportSerializer,
+    )
+    def export(self, request):
+        """Stream the whole slot calendar, booked slots included"""
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        queryset = serializer.filter_queryset(
+            AppointmentScheduling.objects.order_by("time_start", "id")
+        )
+        return export_response(
+            queryset,
+            AppointmentSchedulingValuesSerializer,
+            serializer.validated_data["export_format"],
+            "slots",
+        )
 
 
 class AppointmentViewSet(ModelViewSet):
     """Manage Appointment in the database"""
 
-    queryset = Appointment.objects.all()
+    queryset = Appointment.objects.select_related(
+        "appointment_scheduling__pediatrician"
+    )
     serializer_class = AppointmentSerializer
+    pagination_class = AppointmentPagination
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        return self.queryset.filter(user=self.request.user).order_by("-id")
+        queryset = self.queryset.filter(user=self.request.user).order_by(
+            "-created", "-id"
+        )
+        if self.action == "list":
+            return AppointmentValuesSerializer.values(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return AppointmentValuesSerializer
+        return super().get_serializer_class()
+
+    @conditional
+    @replica_reads()
+    def list(self, request, *args, **kwargs):
+        """List the user's appointments, from a replica when there are some"""
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        """Create a new Appointment"""
-        serializer_data = self.get_serializer(data=self.request.data)
-        serializer_data.is_valid()
-        appointment_scheduling = serializer_data.validated_data[
-            "appointment_scheduling"
-        ]
-        appointment_scheduling.is_available = False
-        appointment_scheduling.save()
-        serializer.save()
+        """Claim the slot and create the Appointment in one transaction
+
+        A slot held by another client can not be claimed until the hold
+        expires, the holder books it by passing the `hold_token`.
+        """
+        appointment_scheduling = serializer.validated_data["appointment_scheduling"]
+        hold_token = serializer.validated_data.pop("hold_token", None)
+        with transaction.atomic():
+            if not AppointmentScheduling.objects.claim(
+                appointment_scheduling.pk,
+                self.request.user,
+                hold_token,
+                slot=appointment_scheduling,
+            ):
+                raise SlotNotAvailable()
+            appointment_scheduling.is_available = False
+            serializer.save()
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return the appointment, from the archive once its slot is archived"""
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = AppointmentValuesSerializer.values(
+                ArchivedAppointment.objects.filter(user=request.user)
+            )
+            row = get_object_or_404(archived, pk=kwargs["pk"])
+            return Response(AppointmentValuesSerializer([row]).data[0])
+
+    @action(detail=False)
+    @conditional
+    @replica_reads()
+    def history(self, request):
+        """List the user's archived appointments, newest first"""
+        queryset = AppointmentValuesSerializer.values(
+            ArchivedAppointment.objects.filter(user=request.user)
+        )
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(AppointmentValuesSerializer(page).data)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        serializer_class=BulkAppointmentSerializer,
+    )
+    def bulk(self, request):
+        """Book several slots in one request, with one confirmation email"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        result = book_slots(
+            request.user,
+            [
+                (
+                    item["appointment_scheduling"],
+                    item["comments"],
+                    item.get("hold_token"),
+                )
+                for item in data["appointments"]
+            ],
+            all_or_nothing=data["mode"] == "all",
+        )
+        if not result.booked:
+            # Raising SlotNotAvailable would turn the rejected ids into strings
+            return Response(
+                {
+                    "detail": SlotNotAvailable.default_detail,
+                    "rejected": result.rejected,
+                },
+                status=SlotNotAvailable.status_code,
+            )
+        appointments = AppointmentValuesSerializer.values(
+            Appointment.objects.filter(
+                user=request.user, appointment_scheduling__in=result.booked
+            ).order_by("id")
+        )
+        return Response(
+            {
+                "appointments": AppointmentValuesSerializer(appointments).data,
+                "rejected": result.rejected,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    def perform_destroy(self, instance):
+        """Delete the Appointment and release its slot in one transaction"""
+        with transaction.atomic():
+            instance.delete()
+            AppointmentScheduling.objects.release(instance.appointment_scheduling_id)
+
+    @action(detail=True, methods=["post"])
+    def cancel(self, request, pk=None):
+        """Cancel the appointment, its slot can be booked again"""
+        self.perform_destroy(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=True,
+        methods=["post"],
+        serializer_class=AppointmentRescheduleSerializer,
+    )
+    def reschedule(self, request, pk=None):
+        """Move the appointment to another slot and release the old one
+
+        The new slot is claimed like a booking, so a concurrent booking or
+        another client's hold wins with 409 and the appointment is unchanged.
+        """
+        appointment = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        slot = serializer.validated_data["appointment_scheduling"]
+        with transaction.atomic():
+            # Concurrent reschedules of the appointment wait for each other
+            appointment = Appointment.objects.select_for_update().get(pk=appointment.pk)
+            previous = appointment.appointment_scheduling_id
+            if slot.pk == previous:
+                raise ValidationError(
+                    {"appointment_scheduling": ["The appointment is already there"]}
+                )
+            if not AppointmentScheduling.objects.claim(
+                slot.pk,
+                request.user,
+                serializer.validated_data.get("hold_token"),
+                slot=slot,
+            ):
+                raise SlotNotAvailable()
+            slot.is_available = False
+            appointment.appointment_scheduling = slot
+            appointment.save(update_fields=["appointment_scheduling", "updated"])
+            AppointmentScheduling.objects.release(previous)
+        return Response(AppointmentSerializer(appointment).data)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated, IsAdminUser),
+        serializer_class=ExportSerializer,
+    )
+    def export(self, request):
+        """Stream the appointment history of every user"""
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return export_response(
+            Appointment.objects.order_by("id"),
+            AppointmentValuesSerializer,
+            serializer.validated_data["export_format"],
+            "appointments",
+        )